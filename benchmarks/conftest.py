@@ -0,0 +1,100 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Synthetic workloads and allocation tracking shared by the benchmarks."""
+import json
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+
+def flat_scalars(n: int) -> List[str]:
+    """Generate ``n`` flat hyperparameters of mixed scalar types."""
+    values = ["7", "0.25", "1e-3", "True", "None", "xavier"]
+    cli_args: List[str] = []
+    for i in range(n):
+        cli_args.extend([f"--param_{i}", values[i % len(values)]])
+    return cli_args
+
+
+def json_blobs(n: int) -> List[str]:
+    """Generate ``n`` hyperparameters whose values are JSON documents."""
+    blob = json.dumps({"seq": list(range(16)), "nested": {"lr": 0.1, "names": ["a", "b", "c"]}})
+    cli_args: List[str] = []
+    for i in range(n):
+        cli_args.extend([f"--blob_{i}", blob])
+    return cli_args
+
+
+def deep_classes(depth: int) -> List[str]:
+    """Generate one ``smepu.list`` nested ``depth`` levels deep, with a scalar at the innermost level."""
+    cli_args: List[str] = []
+    key = "root"
+    for _ in range(depth):
+        cli_args.extend([f"--{key}.__class__", "smepu.list"])
+        key = f"{key}.0"
+    cli_args.extend([f"--{key}", "1"])
+    return cli_args
+
+
+def wide_classes(n: int) -> List[str]:
+    """Generate a ``smepu.list`` of ``n`` ``smepu.list`` members, each with two positional arguments.
+
+    Mimics long callback lists: ``3n + 1`` dotted args in total.
+    """
+    cli_args = ["--callbacks.__class__", "smepu.list"]
+    for i in range(n):
+        cli_args.extend(
+            [
+                f"--callbacks.{i}.__class__",
+                "smepu.list",
+                f"--callbacks.{i}.0",
+                str(i),
+                f"--callbacks.{i}.1",
+                f"name_{i}",
+            ]
+        )
+    return cli_args
+
+
+WORKLOADS: Dict[str, List[str]] = {
+    "flat-10": flat_scalars(10),
+    "flat-1000": flat_scalars(1000),
+    "json-100": json_blobs(100),
+    "deep-50": deep_classes(50),
+    "wide-1000": wide_classes(1000),
+}
+
+
+@pytest.fixture(params=list(WORKLOADS), ids=list(WORKLOADS))
+def workload(request) -> List[str]:
+    """Parametrize a benchmark over every synthetic workload."""
+    return WORKLOADS[request.param]
+
+
+@pytest.fixture
+def flat_1000() -> List[str]:
+    """Provide the ``flat-1000`` workload alone, for benchmarks that are not parametrized over all workloads."""
+    return WORKLOADS["flat-1000"]
+
+
+@pytest.fixture
+def track_allocations(benchmark) -> Callable[..., Any]:
+    """Run a callable once under ``tracemalloc`` and record its peak & retained bytes into the benchmark report.
+
+    Kept out of the timed rounds so that tracing overhead does not skew throughput numbers.
+    """
+
+    def track(f: Callable[..., Any], *args, **kwargs) -> Any:
+        tracemalloc.start()
+        try:
+            retval = f(*args, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["alloc_peak_bytes"] = peak
+        benchmark.extra_info["alloc_retained_bytes"] = current
+        return retval
+
+    return track
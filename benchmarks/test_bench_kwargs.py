@@ -0,0 +1,84 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Per-stage benchmarks of the hyperparameter parsing pipeline.
+
+Each stage is timed on its own, with the inputs of that stage pre-computed outside the timed region.
+"""
+from smepu._gluonts_core_serde import decode
+from smepu.argparse import _round_1, _round_2, _TrieNode, from_hyperparameters_json, to_kwargs
+
+import inspect
+import json
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+def _lowered(args_round_1):
+    """Lower the dotted args to gluonts-style dictionaries, without decoding them."""
+    _, root = _TrieNode.build(args_round_1)
+    return {k: node.to_ir(k) for k, node in root.children.items()}
+
+
+def test_to_kwargs(benchmark, workload, track_allocations):
+    """End-to-end: cli args to kwargs."""
+    track_allocations(to_kwargs, workload)
+    benchmark(to_kwargs, workload)
+
+
+def test_round_1(benchmark, workload, track_allocations):
+    """Tokenize cli args and infer scalar dtypes."""
+    track_allocations(_round_1, workload)
+    benchmark(_round_1, workload)
+
+
+def test_round_2(benchmark, workload, track_allocations):
+    """Lower dotted ``__class__`` args, then decode them."""
+    args_round_1 = _round_1(workload)
+    track_allocations(_round_2, args_round_1)
+    benchmark(_round_2, args_round_1)
+
+
+def test_lower(benchmark, workload, track_allocations):
+    """Build the trie of dotted args, and convert it to gluonts-style dictionaries."""
+    args_round_1 = _round_1(workload)
+    track_allocations(_lowered, args_round_1)
+    benchmark(_lowered, args_round_1)
+
+
+def test_decode(benchmark, workload, track_allocations):
+    """Instantiate objects from their gluonts-style dictionaries."""
+    klass_dicts = _lowered(_round_1(workload))
+    track_allocations(decode, klass_dicts)
+    benchmark(decode, klass_dicts)
+
+
+def test_to_kwargs_target(benchmark, flat_1000, track_allocations):
+    """End-to-end: cli args to kwargs of a target whose parameters are all type-annotated."""
+    cli_args = flat_1000
+    target = _typed_callable(cli_args[::2], str)
+    track_allocations(to_kwargs, cli_args, target=target)
+    benchmark(to_kwargs, cli_args, target=target)
+
+
+def _typed_callable(cli_keys, annotation):
+    """Create a callable whose signature has a keyword argument of type ``annotation`` for every cli key."""
+
+    def f(**kwargs):
+        pass
+
+    f.__signature__ = inspect.Signature(  # type: ignore
+        [inspect.Parameter(k[2:], inspect.Parameter.KEYWORD_ONLY, annotation=annotation) for k in cli_keys]
+    )
+    return f
+
+
+def test_from_hyperparameters_json(benchmark, workload, track_allocations, tmp_path):
+    """End-to-end: SageMaker-style (i.e., JSON-encoded values) hyperparameters.json to kwargs."""
+    path = tmp_path / "hyperparameters.json"
+    hps = {k[2:]: json.dumps(v) for k, v in zip(workload[::2], workload[1::2])}
+    path.write_text(json.dumps(hps))
+    track_allocations(from_hyperparameters_json, path)
+    benchmark(from_hyperparameters_json, path)
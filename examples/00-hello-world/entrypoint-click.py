@@ -40,12 +40,13 @@ def main(train_args: Tuple[str, ...], **my_kwargs) -> None:
     logger.info("SageMaker matters: %s", my_kwargs)
     logger.info("train_args: %s", train_args)
 
-    # Convert cli args / hyperparameters to the estimator's kwargs
-    kwargs: Dict[str, Any] = smepu.argparse.to_kwargs(train_args)
-    logger.info("kwargs: %s", kwargs)
-
     # Estimator is an instance of "algo" class.
     klass: Any = locate(my_kwargs["algo"])
+
+    # Convert cli args / hyperparameters to the estimator's kwargs, following the type annotations of the estimator's
+    # __init__().
+    kwargs: Dict[str, Any] = smepu.argparse.to_kwargs(train_args, target=klass)
+    logger.info("kwargs: %s", kwargs)
     estimator = klass(**kwargs)
     logger.info("%s", estimator)
 
@@ -25,11 +25,11 @@ def main(cfg: Dict[str, Any], train_args: List[str]) -> None:
     logger.info("cfg: %s", cfg)
     logger.info("train_args: %s", train_args)
 
-    # Convert cli args / hyperparameters to kwargs
-    kwargs: Dict[str, Any] = smepu.argparse.to_kwargs(train_args)
-
     # Estimator is an instance of "algo" class.
     klass: Any = locate(cfg["algo"])
+
+    # Convert cli args / hyperparameters to kwargs, following the type annotations of the estimator's __init__().
+    kwargs: Dict[str, Any] = smepu.argparse.to_kwargs(train_args, target=klass)
     estimator = klass(**kwargs)
     logger.info("%s", estimator)
 
@@ -0,0 +1,163 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""End-to-end benchmark of train.py over synthetic datasets.
+
+Each benchmark run calls `train.main2()` in a fresh process, and records the elapsed time of each stage (load, fit,
+metrics, save) and the peak RSS of that process. All runs are written to a JSON report.
+"""
+import smepu
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from pydoc import locate
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = smepu.setup_opinionated_logger(__name__)
+
+STAGES = ("load", "fit", "metrics", "save")
+
+
+def generate_data(path: Path, rows: int, features: int, centers: int = 3, seed: int = 0) -> Path:
+    """Generate a synthetic train channel that looks like `refdata/dummy-input.csv`, but of the requested size.
+
+    The dataset is gaussian blobs, and is reused when the channel already exists.
+
+    Args:
+        path (Path): parent directory of the generated channels.
+        rows (int): number of records.
+        features (int): number of features.
+        centers (int, optional): number of blobs. Defaults to 3.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        Path: the train channel directory.
+    """
+    channel = path / f"rows{rows}-features{features}-centers{centers}-seed{seed}"
+    fname = channel / "input.csv"
+    if fname.exists():
+        return channel
+
+    logger.info("Generate %s", fname)
+    rng = np.random.default_rng(seed)
+    means = rng.uniform(0, 5 * centers, size=(centers, features))
+    X = means[rng.integers(0, centers, size=rows)] + rng.standard_normal((rows, features))
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(1, features + 1)])
+    df.insert(0, "id", [f"{i:0{len(str(rows))}d}" for i in range(rows)])
+
+    smepu.mkdir(channel)
+    df.to_csv(fname, index=False)
+    return channel
+
+
+def run(train_channel: Path, workdir: Path, algo: str, est_kwargs: Dict[str, Any], sweep_width: int) -> Dict[str, Any]:
+    """Run `train.main2()` once, and return the stage timings and peak RSS of the current process.
+
+    Meant to be called in a fresh process, so that the peak RSS is of this run only.
+    """
+    import train
+
+    smepu.profiling.enable(at_exit=False)
+
+    model_dir = smepu.mkdir(workdir / "model")
+    output_data_dir = smepu.mkdir(workdir / "output")
+    start = time.perf_counter()
+    train.main2(
+        train_channel,
+        model_dir,
+        output_data_dir,
+        locate(algo),
+        est_kwargs,
+        sweep=True,
+        sweep_start=2,
+        sweep_end=1 + sweep_width,
+    )
+    total = time.perf_counter() - start
+    stats = smepu.profiling.summary()
+    timings = {stage: stats[stage]["total_s"] if stage in stats else 0.0 for stage in STAGES}
+
+    return {"timings": timings, "total": total, "peak_rss_bytes": peak_rss()}
+
+
+def peak_rss() -> int:
+    """Return the peak RSS of the current process, in bytes."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def main(args: argparse.Namespace, hyperparams: List[str]) -> None:
+    """Run the benchmark grid, then write the report."""
+    est_kwargs = smepu.argparse.to_kwargs(hyperparams)
+    data_dir = smepu.mkdir(args.workdir / "data")
+    ctx = get_context("spawn")
+
+    results = []
+    grid = itertools.product(args.rows, args.features, args.algo, args.sweep_width, range(args.repeat))
+    for rows, features, algo, sweep_width, repeat in grid:
+        train_channel = generate_data(data_dir, rows, features)
+        config = {"rows": rows, "features": features, "algo": algo, "sweep_width": sweep_width, "repeat": repeat}
+        logger.info("Run %s", config)
+
+        workdir = args.workdir / "runs" / "-".join(str(v) for v in config.values())
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            result = executor.submit(run, train_channel, workdir, algo, est_kwargs, sweep_width).result()
+        results.append({**config, **result})
+        logger.info(
+            "total=%.3fs %s peak_rss=%.1fMiB",
+            result["total"],
+            " ".join(f"{k}={v:.3f}s" for k, v in result["timings"].items()),
+            result["peak_rss_bytes"] / 2**20,
+        )
+
+    report = {
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": cpu_count()},
+        "hyperparams": hyperparams,
+        "results": results,
+    }
+    smepu.mkdir(args.report.parent)
+    with args.report.open("w") as f:
+        json.dump(report, f, indent=2)
+    logger.info("Report written to %s", args.report)
+
+
+def cpu_count() -> int:
+    """Return the number of CPUs usable by this process."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))  # type: ignore
+    return os.cpu_count() or 1
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the cli args of this benchmark, whose multi-valued args are crossed into configurations."""
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000], help="Number of records")
+    parser.add_argument("--features", type=int, nargs="+", default=[4], help="Number of features")
+    parser.add_argument("--algo", type=str, nargs="+", default=["sklearn.cluster.KMeans"], help="Estimator classes")
+    parser.add_argument("--sweep-width", type=int, nargs="+", default=[3], help="Number of n_clusters to sweep")
+    add_output_argument(parser, Path("/tmp/bench-cluster"))
+
+
+def add_output_argument(parser: argparse.ArgumentParser, workdir: Path, repeat: int = 1) -> None:
+    """Add the cli args that all benchmarks share: repetitions, the data & output dir, and the JSON report."""
+    parser.add_argument("--repeat", type=int, default=repeat, help="Repeat each configuration this many times")
+    parser.add_argument("--workdir", type=Path, default=workdir, help="Data & output dir")
+    parser.add_argument("--report", type=Path, default=workdir / "report.json", help="JSON report")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_argument(parser)
+    args, hyperparams = parser.parse_known_args()
+    main(args, hyperparams)
@@ -0,0 +1,84 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Throughput of concurrent train.py trials, with vs without pinning each worker to its own cpus.
+
+Each configuration runs the same batch of trials (one `n_clusters` each) with `smepu.forkserver.ForkServer`, first with
+unpinned workers, then with workers pinned to disjoint cpu sets within a NUMA node. All runs are written to a JSON
+report.
+"""
+import smepu
+from smepu.forkserver import ForkServer, Run
+
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench import add_output_argument, generate_data
+
+logger = smepu.setup_opinionated_logger(__name__)
+
+TRAIN_PY = str(Path(__file__).resolve().parent / "train.py")
+
+
+def run(server: ForkServer, runs: List[Run], max_workers: int, pin_workers: bool) -> Dict[str, Any]:
+    """Run a batch of trials, and return its throughput."""
+    start = time.perf_counter()
+    results = server.run_many(TRAIN_PY, runs, max_workers, pin_workers=pin_workers)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if r.exit_code != 0)
+    if failed:
+        logger.warning("%d trials failed, e.g.:\n%s", failed, next(r.output for r in results if r.exit_code != 0))
+    return {"elapsed": elapsed, "trials_per_s": len(runs) / elapsed, "failed": failed}
+
+
+def main(args: argparse.Namespace, hyperparams: List[str]) -> None:
+    """Run unpinned vs pinned batches, then write the report."""
+    train_channel = generate_data(smepu.mkdir(args.workdir / "data"), args.rows, args.features)
+    runs = []
+    for i in range(args.trials):
+        trial_dir = args.workdir / "trials" / f"trial-{i:04d}"
+        env = {"SM_MODEL_DIR": str(trial_dir / "model"), "SM_OUTPUT_DATA_DIR": str(trial_dir / "output")}
+        runs.append(Run(["--train", str(train_channel), "--n_clusters", str(2 + i % 8), *hyperparams], env))
+
+    server = ForkServer(preload=["pandas", "sklearn.cluster", "sklearn.metrics"])
+    nodes = smepu.threads.numa_nodes()
+    max_workers = args.max_workers or len(nodes)
+    logger.info("NUMA nodes: %s; %d workers", nodes, max_workers)
+
+    results = []
+    for repeat in range(args.repeat):
+        for pin_workers in (False, True):
+            result = run(server, runs, max_workers, pin_workers)
+            results.append({"pin_workers": pin_workers, "repeat": repeat, **result})
+            logger.info("pin_workers=%s: %.2f trials/s", pin_workers, result["trials_per_s"])
+
+    report = {
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "numa_nodes": nodes},
+        "config": {k: str(v) for k, v in vars(args).items()},
+        "hyperparams": hyperparams,
+        "results": results,
+    }
+    smepu.mkdir(args.report.parent)
+    with args.report.open("w") as f:
+        json.dump(report, f, indent=2)
+    logger.info("Report written to %s", args.report)
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the cli args of this benchmark."""
+    parser.add_argument("--rows", type=int, default=20_000, help="Number of records")
+    parser.add_argument("--features", type=int, default=32, help="Number of features")
+    parser.add_argument("--trials", type=int, default=32, help="Number of trials per batch")
+    parser.add_argument("--max-workers", type=int, default=None, help="Concurrent trials (default=NUMA nodes)")
+    add_output_argument(parser, Path("/tmp/bench-placement"), repeat=3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_argument(parser)
+    args, hyperparams = parser.parse_known_args()
+    main(args, hyperparams)
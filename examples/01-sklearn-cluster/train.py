@@ -12,21 +12,64 @@
 # The 1st save may put smepu after tqdm (or tqdm-dependant modules), and it
 # takes the 2nd (or possibly more) save to rearrange smepu to the top.
 import smepu
+from smepu.io import recordio
 
 import inspect
+import json
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydoc import locate
-from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Type, cast
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, Union, cast
 
 import joblib
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from pandas.api.types import union_categoricals
+from sklearn import config_context, get_config
 from sklearn.base import ClusterMixin
-from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_samples, silhouette_score
+from sklearn.datasets import load_svmlight_file
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_samples
+from threadpoolctl import threadpool_info, threadpool_limits
 
 # Setup logger must be done in the entrypoint script.
 logger = smepu.setup_opinionated_logger(__name__)
 
+# Registry of cluster metrics, see register_metric(). Names of metrics are in the order they are registered.
+METRICS: Dict[str, Callable[[ClusterMixin, Any, np.ndarray], Any]] = {}
+
+# Whether a higher value is better, for each registered metric.
+METRIC_GREATER_IS_BETTER: Dict[str, bool] = {}
+
+SWEEP_MODES = ("full", "halving", "adaptive", "subsample")
+SUBSAMPLE_METHODS = ("uniform", "coreset")
+ID_DTYPES = ("str", "category", "bytes")
+SPARSE_SUFFIXES = (".libsvm", ".svmlight", ".svm", ".npz")
+
+
+class SparseData:
+    """Record ids and their features as a CSR matrix, i.e., the sparse counterpart of a dataframe from `load_data()`."""
+
+    def __init__(self, ids: pd.Series, X: sp.csr_matrix) -> None:
+        """Create a sparse dataset.
+
+        Args:
+            ids (pd.Series): record ids.
+            X (sp.csr_matrix): features, one row per record.
+        """
+        self.ids = ids
+        self.X = X
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return self.X.shape[0]
+
+
+# Input data: either a dataframe of ids and dense features, or sparse data.
+Data = Union[pd.DataFrame, SparseData]
+
 
 class Output:
     """An output writer to save an estimator and its output to filesystems.
@@ -65,7 +108,7 @@ class Output:
                 Defaults to None.
         """
         fname = "labels.csv" if metadata is None else f"labels-{metadata}.csv"
-        labels.to_csv(self.output_data_dir / fname, index=False)
+        decode_bytes(labels).to_csv(self.output_data_dir / fname, index=False)
 
     def save_metrics(
         self, metrics: Sequence[Mapping[str, Any]], metadata: Optional[Mapping[str, Sequence[Any]]] = None
@@ -83,6 +126,19 @@ class Output:
             df = pd.concat([header, df], axis=1)
         df.to_csv(self.output_data_dir / "metrics.csv", index=False, header=True)
 
+    def save_comparison(self, sub_metrics: Mapping[str, Any], full_metrics: Mapping[str, Any]) -> None:
+        """Save the metrics of the same estimator fitted on a subsample vs on the full data, to `comparison.csv`.
+
+        Args:
+            sub_metrics (Mapping[str, Any]): metrics of the fit on a subsample.
+            full_metrics (Mapping[str, Any]): metrics of the fit on the full data.
+        """
+        df = pd.DataFrame({"subsample": sub_metrics, "full": full_metrics}, dtype=float)
+        df["rel_diff"] = (df["subsample"] - df["full"]) / df["full"].abs()
+        df.index.name = "metric"
+        logger.info("Subsample vs full-data metrics:\n%s", df)
+        df.to_csv(self.output_data_dir / "comparison.csv", header=True)
+
 
 class MultiOutput(Output):
     """An output writer to save multiple estimators and their output to filesystems.
@@ -113,7 +169,7 @@ class MultiOutput(Output):
             metadata (Any): Mandatory metadata that denotes the `n_clusters` hyperparameter used to
                 generate the cluster dataframe.
         """
-        df = labels.copy()
+        df = decode_bytes(labels)
         df.insert(0, "n_clusters", metadata)
         if self.header:
             df.to_csv(self.opath, mode="w", index=False)
@@ -140,14 +196,30 @@ def main(cfg: Mapping[str, Any], hyperparams: Sequence[str]) -> None:
     # n_clusters is requested but estimator's __init__() does not accept kwarg
     # `n_clusters`.
     main2(
-        cfg["train"],
-        cfg["model_dir"],
-        cfg["output_data_dir"],
-        klass,
-        est_kwargs,
-        cfg["sweep"],
-        cfg["sweep_start"],
-        cfg["sweep_end"],
+        train_channel=cfg["train"],
+        model_dir=cfg["model_dir"],
+        output_data_dir=cfg["output_data_dir"],
+        est_klass=klass,
+        est_kwargs=est_kwargs,
+        sweep=cfg["sweep"],
+        sweep_start=cfg["sweep_start"],
+        sweep_end=cfg["sweep_end"],
+        sweep_mode=cfg["sweep_mode"],
+        sweep_metric=cfg["sweep_metric"],
+        halving_eta=cfg["halving_eta"],
+        halving_min_samples=cfg["halving_min_samples"],
+        adaptive_coarse_points=cfg["adaptive_coarse_points"],
+        subsample_size=cfg["subsample_size"],
+        subsample_method=cfg["subsample_method"],
+        checkpoint_dir=cfg["checkpoint_dir"],
+        cache_dir=cfg["cache_dir"],
+        cache_max_bytes=cfg["cache_max_bytes"],
+        cache_fingerprint=cfg["cache_fingerprint"],
+        feature_dtype=cfg["feature_dtype"] or ("float32" if cfg["memory_optimized"] else "float64"),
+        id_dtype=cfg["id_dtype"] or ("bytes" if cfg["memory_optimized"] else "str"),
+        dtype_schema=cfg["dtype_schema"],
+        metrics=select_metrics(cfg["metrics"], cfg["skip_metrics"]),
+        metric_workers=cfg["metric_workers"],
     )
 
 
@@ -160,75 +232,763 @@ def main2(
     sweep: bool = False,
     sweep_start: int = 2,
     sweep_end: int = 4,
+    sweep_mode: str = "full",
+    sweep_metric: str = "silhouette_score",
+    halving_eta: int = 3,
+    halving_min_samples: int = 100,
+    adaptive_coarse_points: int = 8,
+    subsample_size: int = 10_000,
+    subsample_method: str = "uniform",
+    checkpoint_dir: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    cache_max_bytes: Optional[int] = None,
+    cache_fingerprint: str = "sampled",
+    feature_dtype: str = "float64",
+    id_dtype: str = "str",
+    dtype_schema: Optional[Mapping[str, str]] = None,
+    metrics: Optional[Sequence[str]] = None,
+    metric_workers: Optional[int] = None,
 ) -> None:
     # Setup output writer specifically for single run vs sweeping runs.
     writer_cls = Output if not sweep else MultiOutput
     writer = writer_cls(model_dir, output_data_dir)
 
     # Load, fit_predict, save.
-    df = load_data(train_channel)
+    df = load_data(train_channel, feature_dtype, id_dtype, dtype_schema)
+    dtypes = df.dtypes.astype(str).tolist() if isinstance(df, pd.DataFrame) else ["csr", str(df.X.dtype), df.X.shape[1]]
+
+    metric_engine = MetricEngine(metrics, metric_workers)
 
     # Figure-out what trials to carry out.
     if not sweep:
         trials: List[Optional[int]] = [None]  # Type annotate to keep mypy happy
         metric_metadata: Optional[Dict[str, Any]] = None
     else:
-        if not (0 < sweep_start <= sweep_end):
-            raise ValueError(f"Invalid sweep range: {[sweep_start, sweep_end]}")
-
+        check_sweep_args(sweep_start, sweep_end, sweep_mode, sweep_metric, metric_engine.names)
         trials = [i for i in range(sweep_start, sweep_end + 1)]
         metric_metadata = {"n_clusters": trials}
 
-    metric_set = []
-    for n_clusters in trials:
-        estimator, labels, metrics = fit_predict(df, est_klass, est_kwargs, n_clusters)
-        writer.save_model(estimator, n_clusters)
-        writer.save_labels(labels, n_clusters)
+    # Identify the data by content, because the channel path is the same for any data on SageMaker.
+    checkpoint = sweep and checkpoint_dir is not None
+    data_fingerprint = fingerprint_data(train_channel, cache_fingerprint, dtypes) if checkpoint or cache_dir else None
+
+    # Resume the full fits of an interrupted sweep (e.g., managed spot training) from their checkpoints.
+    manifest: Optional[smepu.checkpoint.Manifest] = None
+    if checkpoint:
+        config = {
+            "train": train_channel,
+            "data": data_fingerprint,
+            "dtypes": dtypes,
+            "algo": est_klass,
+            "est_kwargs": est_kwargs,
+            "sweep_mode": sweep_mode,
+            "metrics": metric_engine.names,
+        }
+        manifest = smepu.checkpoint.Manifest(checkpoint_dir, config)
+
+    # Reuse the results of previous jobs on the same data with the same estimator.
+    cache = open_cache(cache_dir, cache_max_bytes, data_fingerprint)
+
+    # Partial fits on subsamples, to shortlist the trials that deserve a full fit.
+    partial_fits: List[Tuple[int, int, Dict[str, Any]]] = []
+    if sweep and sweep_mode == "halving":
+        trials, partial_fits = successive_halving(
+            df,
+            est_klass,
+            est_kwargs,
+            cast(List[int], trials),
+            sweep_metric,
+            halving_eta,
+            halving_min_samples,
+            metrics=metric_engine,
+        )
+    elif sweep and sweep_mode == "subsample":
+        trials, partial_fits = subsample_sweep(
+            df,
+            est_klass,
+            est_kwargs,
+            cast(List[int], trials),
+            sweep_metric,
+            subsample_size,
+            subsample_method,
+            metric_engine,
+        )
+    if partial_fits:
+        metric_metadata = {
+            "n_clusters": [n for n, _, _ in partial_fits] + trials,
+            "n_samples": [n for _, n, _ in partial_fits] + [len(df)] * len(trials),
+        }
+
+    metric_set = [metrics for _, _, metrics in partial_fits]
+
+    def run_trial(n_clusters: Optional[int]) -> Dict[str, Any]:
+        estimator, labels, metrics = fit_predict_or_reuse(
+            df, est_klass, est_kwargs, n_clusters, manifest, cache, data_fingerprint or "", metric_engine
+        )
+        with smepu.profiling.stage("save"):
+            writer.save_model(estimator, n_clusters)
+            writer.save_labels(labels, n_clusters)
         metric_set.append(metrics)
-    writer.save_metrics(metric_set, metric_metadata)
+        return metrics
+
+    if sweep and sweep_mode == "adaptive":
+        visited = adaptive_search(
+            sweep_start,
+            sweep_end,
+            lambda n_clusters: run_trial(n_clusters)[sweep_metric],
+            METRIC_GREATER_IS_BETTER[sweep_metric],
+            adaptive_coarse_points,
+        )
+        metric_metadata = {"n_clusters": visited}
+    else:
+        for n_clusters in trials:
+            run_trial(n_clusters)
+
+    if sweep and sweep_mode == "subsample":
+        # Can we trust the shortcut? Compare the winner on the subsample vs on the full data.
+        winner = trials[0]
+        sub_metrics = next(metrics for n, _, metrics in partial_fits if n == winner)
+        with smepu.profiling.stage("save"):
+            writer.save_comparison(sub_metrics, metric_set[-1])
+
+    with smepu.profiling.stage("save"):
+        writer.save_metrics(metric_set, metric_metadata)
+
+
+def fingerprint_data(train_channel: Path, mode: str, dtypes: List[Any]) -> Optional[str]:
+    """Fingerprint the training data, i.e., the content of the channel and the dtypes it is loaded with.
+
+    A Pipe mode channel is a FIFO (`<channel>_0`, without a `<channel>` dir), whose content is gone once loaded, hence
+    has no fingerprint.
+
+    Returns:
+        Optional[str]: the fingerprint, or None when the channel is not a regular file or dir.
+    """
+    if not (train_channel.is_file() or train_channel.is_dir()):
+        logger.warning("Cannot fingerprint %s (not a regular file or dir, e.g., Pipe mode)", train_channel)
+        return None
+    # The same files loaded with different dtypes are different data.
+    return smepu.cache.ResultCache.key(smepu.io.fingerprint(train_channel, mode), dtypes)
+
+
+def open_cache(
+    cache_dir: Optional[Path], max_bytes: Optional[int], data_fingerprint: Optional[str]
+) -> Optional[smepu.cache.ResultCache]:
+    """Open the result cache, unless disabled or the data has no fingerprint to key the results with."""
+    if cache_dir is None:
+        return None
+    if data_fingerprint is None:
+        logger.warning("Skip the cache, because the training data has no fingerprint")
+        return None
+    return smepu.cache.ResultCache(cache_dir, max_bytes)
+
+
+def subsample(
+    df: Data, size: int, method: str = "uniform", random_state: int = 0
+) -> Tuple[pd.DataFrame, Optional[np.ndarray]]:
+    """Draw a subsample of `size` records, to sweep on instead of the full data.
+
+    The "uniform" method samples records uniformly without replacement. The "coreset" method draws a lightweight
+    coreset (Bachem et al., KDD 2018), which samples records by their squared distance to the data mean (i.e., far-away
+    records are more likely to be sampled), and weighs them by their inverse sampling probability, so that weighted
+    fits approximate those on the full data.
+
+    Args:
+        df (Data): input dataframe, or sparse data.
+        size (int): Number of records. When not smaller than `df`, return `df` as-is.
+        method (str, optional): "uniform" or "coreset". Defaults to "uniform".
+        random_state (int, optional): Seed of the subsample. Defaults to 0.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[np.ndarray]]: (subsample, sample weights or None)
+    """
+    if method not in SUBSAMPLE_METHODS:
+        raise ValueError(f"Invalid subsample method: {method}; must be one of {SUBSAMPLE_METHODS}")
+    if size >= len(df):
+        logger.warning("Subsample size %d is not smaller than the data (%d records), use the full data", size, len(df))
+        return df, None
+    if method == "uniform":
+        return sample_rows(df, size, random_state), None
+
+    X = features(df)
+    if sp.issparse(X):
+        # ||x - mean||^2 without densifying X.
+        mean = np.asarray(X.mean(axis=0), dtype=float).ravel()
+        dist = np.asarray(X.multiply(X).sum(axis=1), dtype=float).ravel() - 2 * (X @ mean) + mean @ mean
+        dist = np.maximum(dist, 0)
+    else:
+        dist = squared_distances_to_mean(X)
+    q = 0.5 / len(df) + (0.5 * dist / dist.sum() if dist.sum() > 0 else 0.5 / len(df))
+    idx = np.random.default_rng(random_state).choice(len(df), size=size, replace=True, p=q)
+    return take_rows(df, idx), 1.0 / (size * q[idx])
+
+
+def squared_distances_to_mean(X: pd.DataFrame) -> np.ndarray:
+    """Return the squared distance of each row to the mean row, a chunk of rows at a time in their native dtype.
+
+    Each chunk fits in a quarter of the memory budget (see `smepu.resources.chunk_size()`), hence this never makes a
+    full float64 copy of the features. Distances are accumulated in float64.
+    """
+    mean = X.mean(axis=0).to_numpy()
+    itemsize = max(np.dtype(dtype).itemsize for dtype in X.dtypes) if X.shape[1] else 1
+    # A chunk, and its difference to the mean.
+    chunksize = smepu.resources.chunk_size(2 * X.shape[1] * itemsize) or len(X)
+    dist = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), chunksize):
+        chunk = X.iloc[start : start + chunksize].to_numpy()
+        diff = chunk - mean.astype(np.result_type(chunk.dtype, np.float32), copy=False)
+        dist[start : start + chunksize] = np.square(diff).sum(axis=1, dtype=np.float64)
+    return dist
+
+
+def features(df: Data) -> Union[pd.DataFrame, sp.csr_matrix]:
+    """Return the features of the input data, i.e., all columns but the id of a dataframe, or the sparse matrix."""
+    return df.iloc[:, 1:] if isinstance(df, pd.DataFrame) else df.X
+
+
+def take_rows(df: Data, idx: np.ndarray) -> Data:
+    """Return the records at positions `idx`, re-indexed from 0."""
+    if isinstance(df, pd.DataFrame):
+        return df.iloc[idx].reset_index(drop=True)
+    return SparseData(df.ids.iloc[idx].reset_index(drop=True), df.X[idx])
+
+
+def sample_rows(df: Data, n: int, random_state: int = 0) -> Data:
+    """Return `n` records sampled uniformly without replacement, re-indexed from 0."""
+    if isinstance(df, pd.DataFrame):
+        return df.sample(n=n, random_state=random_state).reset_index(drop=True)
+    return take_rows(df, np.random.RandomState(random_state).choice(len(df), size=n, replace=False))
+
+
+def fit_predict_or_reuse(
+    df: Data,
+    est_klass: Type[ClusterMixin],
+    est_kwargs: Dict[str, Any],
+    n_clusters: Optional[int],
+    manifest: Optional[smepu.checkpoint.Manifest] = None,
+    cache: Optional[smepu.cache.ResultCache] = None,
+    data_fingerprint: str = "",
+    metrics: Optional["MetricEngine"] = None,
+) -> Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]:
+    """Restore a trial from the checkpoint manifest or the result cache, else ``fit_predict()`` then save it to both.
+
+    Args:
+        df (Data): input dataframe, or sparse data.
+        est_klass (Type[ClusterMixin]): estimator class.
+        est_kwargs (Dict[str, Any]): estimator kwargs.
+        n_clusters (Optional[int]): number of clusters.
+        manifest (Optional[smepu.checkpoint.Manifest]): checkpoint manifest of this job. Defaults to None.
+        cache (Optional[smepu.cache.ResultCache]): result cache shared across jobs. Defaults to None.
+        data_fingerprint (str): fingerprint of the data, part of the cache key. Defaults to "".
+        metrics (Optional[MetricEngine]): metrics to compute, part of the cache key. Defaults to None, which means all
+            registered metrics.
+
+    Returns:
+        Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]: (estimator, cluster labels, metrics)
+    """
+    key = f"n_clusters-{n_clusters}"
+    if manifest is not None and key in manifest:
+        logger.info("Restore n_clusters=%s from checkpoint", n_clusters)
+        return load_trial(manifest.trial_dir(key))
+
+    cache_key, entry = "", None
+    if cache is not None:
+        # The effective kwargs, hence a sweep and a single run that end-up with the same estimator share an entry.
+        kwargs = dict(est_kwargs)
+        if n_clusters is not None:
+            kwargs[get_ncluster_kwarg(est_klass)] = n_clusters
+        metric_names = (metrics or MetricEngine()).names
+        cache_key = cache.key(
+            data_fingerprint, f"{est_klass.__module__}.{est_klass.__qualname__}", kwargs, metric_names
+        )
+        entry = cache.get(cache_key)
+
+    if entry is not None:
+        logger.info("Reuse cached n_clusters=%s from %s", n_clusters, entry)
+        estimator, labels, cluster_metric = load_trial(entry)
+    else:
+        estimator, labels, cluster_metric = fit_predict(df, est_klass, est_kwargs, n_clusters, metrics=metrics)
+        if cache is not None:
+            with cache.put(cache_key) as tmp_dir:
+                save_trial(tmp_dir, estimator, labels, cluster_metric)
+
+    if manifest is not None:
+        save_trial(manifest.trial_dir(key), estimator, labels, cluster_metric)
+        manifest.commit(key, cluster_metric)
+    return estimator, labels, cluster_metric
+
 
+@smepu.profiling.stage("checkpoint")
+def save_trial(trial_dir: Path, estimator: ClusterMixin, labels: pd.DataFrame, metrics: Dict[str, Any]) -> None:
+    """Save the estimator, cluster labels, and metrics of a trial to `trial_dir`, to restore with `load_trial()`.
 
-def load_data(path: Path) -> pd.DataFrame:
+    Args:
+        trial_dir (Path): directory to save to.
+        estimator (ClusterMixin): fitted estimator.
+        labels (pd.DataFrame): cluster labels.
+        metrics (Dict[str, Any]): cluster metrics.
+    """
+    joblib.dump(estimator, trial_dir / "model.joblib")
+    labels.to_pickle(trial_dir / "labels.pkl")
+    (trial_dir / "metrics.json").write_text(json.dumps(metrics, default=float))
+
+
+@smepu.profiling.stage("checkpoint")
+def load_trial(trial_dir: Path) -> Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]:
+    """Load a trial saved by `save_trial()`.
+
+    Args:
+        trial_dir (Path): directory to load from.
+
+    Returns:
+        Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]: (estimator, cluster labels, metrics)
+    """
+    metrics = json.loads((trial_dir / "metrics.json").read_text())
+    return joblib.load(trial_dir / "model.joblib"), pd.read_pickle(trial_dir / "labels.pkl"), metrics
+
+
+def check_sweep_args(
+    sweep_start: int, sweep_end: int, sweep_mode: str, sweep_metric: str, metric_names: Optional[Sequence[str]] = None
+) -> None:
+    """Raise ValueError on invalid sweep args, including a sweep metric that ranks n_clusters but is not computed."""
+    if not (0 < sweep_start <= sweep_end):
+        raise ValueError(f"Invalid sweep range: {[sweep_start, sweep_end]}")
+
+    if sweep_mode not in SWEEP_MODES:
+        raise ValueError(f"Invalid sweep mode: {sweep_mode}; must be one of {SWEEP_MODES}")
+
+    if sweep_metric not in METRIC_GREATER_IS_BETTER:
+        raise ValueError(f"Invalid sweep metric: {sweep_metric}; must be one of {list(METRIC_GREATER_IS_BETTER)}")
+
+    # The full mode does not rank n_clusters.
+    if sweep_mode != "full" and metric_names is not None and sweep_metric not in metric_names:
+        raise ValueError(f"Sweep metric {sweep_metric} is not computed; must be one of {list(metric_names)}")
+
+
+def subsample_sweep(
+    df: Data,
+    est_klass: Type,
+    est_kwargs: Dict[str, Any],
+    candidates: List[int],
+    metric: str = "silhouette_score",
+    size: int = 10_000,
+    method: str = "uniform",
+    metrics: Optional["MetricEngine"] = None,
+) -> Tuple[List[int], List[Tuple[int, int, Dict[str, Any]]]]:
+    """Fit all `n_clusters` candidates on one subsample, and pick the best one to be fitted on the full data.
+
+    Args:
+        df (Data): input dataframe, or sparse data.
+        est_klass (Type): estimator class.
+        est_kwargs (Dict[str, Any]): estimator hyperparameters.
+        candidates (List[int]): candidate `n_clusters`.
+        metric (str, optional): Metric to rank candidates. Defaults to "silhouette_score".
+        size (int, optional): Subsample size. Defaults to 10_000.
+        method (str, optional): Subsample method, see `subsample()`. Defaults to "uniform".
+        metrics (MetricEngine, optional): Metrics to compute. Defaults to None, which means all registered metrics.
+
+    Returns:
+        Tuple[List[int], List[Tuple[int, int, Dict[str, Any]]]]: ([winner], [(n_clusters, n_samples, metrics), ...]
+        of every fit on the subsample)
+    """
+    sub_df, sample_weight = subsample(df, size, method)
+    partial_fits = []
+    for n_clusters in candidates:
+        _, _, cluster_metric = fit_predict(sub_df, est_klass, est_kwargs, n_clusters, sample_weight, metrics)
+        partial_fits.append((n_clusters, len(sub_df), cluster_metric))
+
+    greater_is_better = METRIC_GREATER_IS_BETTER[metric]
+    winner, _, _ = min(partial_fits, key=lambda fit: rank_key(fit[2][metric], greater_is_better))
+    logger.info("Subsample sweep on %d samples: best n_clusters=%d by %s", len(sub_df), winner, metric)
+    return [winner], partial_fits
+
+
+def successive_halving(
+    df: Data,
+    est_klass: Type,
+    est_kwargs: Dict[str, Any],
+    candidates: List[int],
+    metric: str = "silhouette_score",
+    eta: int = 3,
+    min_samples: int = 100,
+    random_state: int = 0,
+    metrics: Optional["MetricEngine"] = None,
+) -> Tuple[List[int], List[Tuple[int, int, Dict[str, Any]]]]:
+    """Shortlist `n_clusters` candidates by fitting them on increasingly larger subsamples.
+
+    Each rung fits the surviving candidates on a subsample, ranks them by `metric`, then promotes the top `1/eta` of
+    them to the next rung, whose subsample is `eta` times larger. Rungs stop short of the full data, hence the
+    survivors still need their full fits.
+
+    Args:
+        df (Data): input dataframe, or sparse data.
+        est_klass (Type): estimator class.
+        est_kwargs (Dict[str, Any]): estimator hyperparameters.
+        candidates (List[int]): candidate `n_clusters`.
+        metric (str, optional): Metric to rank candidates. Defaults to "silhouette_score".
+        eta (int, optional): Keep the top `1/eta` candidates of each rung. Defaults to 3.
+        min_samples (int, optional): Minimum subsample size. Defaults to 100.
+        random_state (int, optional): Seed of the subsamples. Defaults to 0.
+        metrics (MetricEngine, optional): Metrics to compute. Defaults to None, which means all registered metrics.
+
+    Returns:
+        Tuple[List[int], List[Tuple[int, int, Dict[str, Any]]]]: (survivors, [(n_clusters, n_samples, metrics), ...]
+        of every partial fit)
+    """
+    if metric not in METRIC_GREATER_IS_BETTER:
+        raise ValueError(f"Invalid metric: {metric}; must be one of {list(METRIC_GREATER_IS_BETTER)}")
+    if eta < 2:
+        raise ValueError(f"Invalid eta: {eta}; must be at least 2")
+
+    greater_is_better = METRIC_GREATER_IS_BETTER[metric]
+    survivors = list(candidates)
+    partial_fits: List[Tuple[int, int, Dict[str, Any]]] = []
+    n_rungs = math.ceil(math.log(len(survivors), eta)) if len(survivors) > 1 else 0
+    for rung in range(n_rungs):
+        # At least 10 samples per cluster, for the metrics to be meaningful.
+        n_samples = max(len(df) // eta ** (n_rungs - rung), min_samples, 10 * max(survivors))
+        if n_samples >= len(df):
+            break
+
+        subsample = sample_rows(df, n_samples, random_state)
+        scores = []
+        for n_clusters in survivors:
+            _, _, cluster_metric = fit_predict(subsample, est_klass, est_kwargs, n_clusters, metrics=metrics)
+            partial_fits.append((n_clusters, n_samples, cluster_metric))
+            scores.append((cluster_metric[metric], n_clusters))
+
+        n_keep = max(1, math.ceil(len(survivors) / eta))
+        ranked = sorted(scores, key=lambda score: rank_key(score[0], greater_is_better))
+        survivors = sorted(n_clusters for _, n_clusters in ranked[:n_keep])
+        logger.info("Halving rung %d on %d samples: promote n_clusters=%s", rung, n_samples, survivors)
+
+    return survivors, partial_fits
+
+
+def adaptive_search(
+    start: int,
+    end: int,
+    score: Callable[[int], Optional[float]],
+    greater_is_better: bool = True,
+    coarse_points: int = 8,
+) -> List[int]:
+    """Search `n_clusters` in `[start, end]` for the best score, without evaluating every integer in the range.
+
+    First, evaluate a coarse, log-spaced grid. Then, repeatedly evaluate the midpoints between the best `n_clusters`
+    so far and its nearest evaluated neighbors, until those neighbors are adjacent integers. This finds the best
+    `n_clusters` in `O(coarse_points + log(end - start))` evaluations, assuming the score is unimodal around the best
+    point of the coarse grid.
+
+    Args:
+        start (int): Smallest `n_clusters`.
+        end (int): Largest `n_clusters`.
+        score (Callable[[int], Optional[float]]): Evaluate an `n_clusters`. None means worst.
+        greater_is_better (bool, optional): Whether a higher score is better. Defaults to True.
+        coarse_points (int, optional): Number of points in the coarse grid. Defaults to 8.
+
+    Returns:
+        List[int]: the evaluated `n_clusters`, in the order of evaluation.
+    """
+    scores: Dict[int, Optional[float]] = {}
+
+    def visit(n_clusters: int) -> None:
+        scores[n_clusters] = score(n_clusters)
+
+    num = min(max(coarse_points, 2), end - start + 1)
+    for n_clusters in sorted(set(np.geomspace(start, end, num=num).round().astype(int).tolist())):
+        visit(n_clusters)
+
+    while True:
+        best = min(scores, key=lambda n: rank_key(scores[n], greater_is_better))
+        visited = sorted(scores)
+        i = visited.index(best)
+        neighbors = visited[max(i - 1, 0) : i + 2]
+        midpoints = [(best + n) // 2 for n in neighbors if abs(best - n) > 1]
+        if not midpoints:
+            break
+        logger.info("Adaptive search: best n_clusters=%d so far, refine at %s", best, midpoints)
+        for n_clusters in midpoints:
+            visit(n_clusters)
+
+    return list(scores)
+
+
+def rank_key(score: Optional[float], greater_is_better: bool) -> Tuple[bool, float]:
+    """Sort key to rank scores from best to worst, where a missing score (e.g., aic of kmeans) ranks last."""
+    if score is None:
+        return (True, 0.0)
+    return (False, -score if greater_is_better else score)
+
+
+@smepu.profiling.stage("load")
+def load_data(
+    path: Path,
+    feature_dtype: str = "float64",
+    id_dtype: str = "str",
+    dtype_schema: Optional[Mapping[str, str]] = None,
+) -> Data:
     """Load all files under `path`, but skip hidden files which start with a `.`.
 
-    Files can end in any extension that `pd.read_csv()` accept, thus compressed csv allowed.
+    Files can end in any extension that `pd.read_csv()` accept, thus compressed csv allowed. When any file is sparse
+    (i.e., with a suffix in `SPARSE_SUFFIXES`), all files must be, and are loaded by `load_sparse()` instead. Likewise,
+    RecordIO-protobuf channels (File or Pipe mode) are loaded by `load_recordio()`.
 
     Args:
         path (Path): directory of files to load.
+        feature_dtype (str, optional): dtype of the feature columns. Defaults to "float64".
+        id_dtype (str, optional): "str", "category" (for repeated ids), or "bytes" (utf-8, fixed width). Defaults to
+            "str".
+        dtype_schema (Mapping[str, str], optional): dtype of individual feature columns, by name, which overrides
+            `feature_dtype`. Defaults to None.
 
     Returns:
-        pd.DataFrame: dataframe of loaded input files.
+        Data: dataframe of loaded input files, or sparse data.
     """
-    # Load all input files into a single dataframe.
-    dfs = []
-    for fpath in path.resolve().glob("**/*"):
-        df = pd.read_csv(fpath, dtype={0: str}, low_memory=False)
-        dfs.append(df)
+    if id_dtype not in ID_DTYPES:
+        raise ValueError(f"Invalid id dtype: {id_dtype}; must be one of {ID_DTYPES}")
+
+    fpaths = list(path.resolve().glob("**/*"))
+    if any(fpath.suffix in SPARSE_SUFFIXES for fpath in fpaths):
+        return load_sparse(fpaths, feature_dtype)
+    if is_recordio_channel(path, fpaths):
+        return load_recordio(path, feature_dtype)
+
+    # Load all input files into a single dataframe. Read in chunks sized to the memory budget, to bound the peak memory
+    # of the csv parser, and to fail early (instead of being OOM-killed) when the data cannot fit.
+    budget = smepu.resources.memory_budget()
+    ids, dfs, nbytes = [], [], 0
+    for fpath in fpaths:
+        for df in read_csv_chunks(fpath, budget, feature_dtype=feature_dtype, dtype_schema=dtype_schema):
+            # Convert the id column chunk by chunk, to never hold all ids as Python strings at once.
+            id_col = convert_ids(df.pop(df.columns[0]), id_dtype)
+            nbytes += df.memory_usage(deep=True).sum() + id_col.memory_usage(deep=True)
+            if budget is not None and nbytes > budget:
+                raise MemoryError(f"Input data exceeds the memory budget of {budget / 2**20:.1f}MiB")
+            ids.append(id_col)
+            dfs.append(df)
     df = pd.concat(dfs)
     df.reset_index(drop=True, inplace=True)
 
+    df.insert(0, ids[0].name, concat_ids(ids, id_dtype))
+    del ids, dfs
+
     # Treat null values in the dataframe.
     if df.isna().values.any():
         logger.warn('NA detected in input. To convert NA strings to "" and NA numbers to 0.0')
         raise ValueError("Please implement your custom handling for missing value.")
 
+    report = memory_report(df)
+    saved = report["default_bytes"].sum() - report["bytes"].sum()
+    logger.info("Loaded %d records, %.1fMiB saved vs default dtypes:\n%s", len(df), saved / 2**20, report)
+    return df
+
+
+def is_recordio_channel(path: Path, fpaths: Sequence[Path]) -> bool:
+    """Whether a channel is a Pipe mode FIFO, or a dir of RecordIO files."""
+    if not path.exists():
+        return Path(f"{path}_0").is_fifo()
+    files = [fpath for fpath in fpaths if fpath.is_file()]
+    return bool(files) and all(recordio.is_recordio(fpath) for fpath in files)
+
+
+def load_recordio(path: Path, feature_dtype: str = "float64", batch_size: int = 4096) -> Data:
+    """Load a RecordIO-protobuf channel, i.e., the format of SageMaker built-in algorithms, in File or Pipe mode.
+
+    The record id is the label of a record, or else its row number. Dense features are named `f0`, `f1`, etc.
+
+    Args:
+        path (Path): channel dir.
+        feature_dtype (str, optional): dtype of the features. Defaults to "float64".
+        batch_size (int, optional): records to decode at a time. Defaults to 4096.
+
+    Returns:
+        Data: dataframe of ids and dense features, or sparse data.
+    """
+    budget = smepu.resources.memory_budget()
+    features, labels, nbytes = [], [], 0
+    for batch in recordio.read_batches(recordio.open_channel(path), batch_size):
+        X = batch.features.astype(feature_dtype, copy=False)
+        nbytes += X.data.nbytes + X.indices.nbytes + X.indptr.nbytes if sp.issparse(X) else X.nbytes
+        if budget is not None and nbytes > budget:
+            raise MemoryError(f"Input data exceeds the memory budget of {budget / 2**20:.1f}MiB")
+        features.append(X)
+        labels.append(batch.labels if batch.labels is not None else np.full(X.shape[0], np.nan))
+
+    id_ = np.concatenate(labels)
+    if np.isnan(id_).any():
+        id_ = np.arange(len(id_))
+    elif np.array_equal(id_, np.round(id_)):
+        id_ = id_.astype(np.int64)
+    logger.info("Loaded %d RecordIO records, %.1fMiB", len(id_), nbytes / 2**20)
+
+    if any(sp.issparse(X) for X in features):
+        n_features = max(X.shape[1] for X in features)
+        Xs = [sp.csr_matrix(X) for X in features]
+        for X in Xs:
+            X.resize((X.shape[0], n_features))
+        return SparseData(pd.Series(id_, name="id"), sp.vstack(Xs, format="csr"))
+
+    df = pd.DataFrame(np.concatenate(features), columns=[f"f{i}" for i in range(features[0].shape[1])])
+    df.insert(0, "id", id_)
     return df
 
 
+def convert_ids(ids: pd.Series, id_dtype: str) -> pd.Series:
+    """Convert a chunk of `str` ids to `id_dtype`, i.e., "str", "category", or "bytes"."""
+    if id_dtype == "bytes":
+        return pd.Series(np.char.encode(ids.to_numpy(dtype=str), "utf-8"), name=ids.name)
+    if id_dtype == "category":
+        return ids.astype("category")
+    return ids
+
+
+def concat_ids(ids: Sequence[pd.Series], id_dtype: str) -> Any:
+    """Concatenate chunks of ids converted by `convert_ids()`, preserving their dtype."""
+    # pd.concat() would turn fixed-width bytes and categories of different chunks into object.
+    if id_dtype == "bytes":
+        return np.concatenate([i.to_numpy() for i in ids])
+    if id_dtype == "category":
+        return union_categoricals([i.array for i in ids])
+    return pd.concat(ids, ignore_index=True)
+
+
+def load_sparse(fpaths: Sequence[Path], feature_dtype: str = "float64") -> SparseData:
+    """Load libsvm / svmlight files, and scipy.sparse `.npz` files, into one CSR matrix.
+
+    The record id of a libsvm record is its label (i.e., its first field), and of an `.npz` row is its row number in the
+    channel.
+
+    Args:
+        fpaths (Sequence[Path]): files to load, all with a suffix in `SPARSE_SUFFIXES`.
+        feature_dtype (str, optional): dtype of the features. Defaults to "float64".
+
+    Returns:
+        SparseData: record ids and their features.
+    """
+    budget = smepu.resources.memory_budget()
+    ids, Xs, nbytes = [], [], 0
+    for fpath in fpaths:
+        if fpath.suffix not in SPARSE_SUFFIXES:
+            raise ValueError(f"Cannot mix sparse and dense input files: {fpath}")
+        if fpath.suffix == ".npz":
+            X = sp.load_npz(fpath).tocsr().astype(feature_dtype)
+            id_ = np.arange(X.shape[0]) + sum(X.shape[0] for X in Xs)
+        else:
+            # Always zero-based, for consistent feature indices across files. One-based files only get an extra,
+            # all-zero feature 0, which changes no distance.
+            X, id_ = load_svmlight_file(str(fpath), dtype=feature_dtype, zero_based=True)
+        nbytes += X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+        if budget is not None and nbytes > budget:
+            raise MemoryError(f"Input data exceeds the memory budget of {budget / 2**20:.1f}MiB")
+        ids.append(id_)
+        Xs.append(X)
+
+    n_features = max(X.shape[1] for X in Xs)
+    for X in Xs:
+        X.resize((X.shape[0], n_features))
+    X = sp.vstack(Xs, format="csr")
+    id_ = np.concatenate(ids)
+    if np.array_equal(id_, np.round(id_)):
+        id_ = id_.astype(np.int64)
+
+    density = X.nnz / max(X.shape[0] * X.shape[1], 1)
+    dense_bytes = X.shape[0] * X.shape[1] * X.dtype.itemsize
+    logger.info(
+        "Loaded %d records x %d features as CSR, density %.2g%%, %.1fMiB (vs %.1fMiB dense)",
+        X.shape[0],
+        X.shape[1],
+        100 * density,
+        nbytes / 2**20,
+        dense_bytes / 2**20,
+    )
+    return SparseData(pd.Series(id_, name="id"), X)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Memory usage of each column, vs when loaded with the default dtypes (i.e., id as `str`, features as float64).
+
+    The default usage of a non-str id column is estimated, assuming CPython's ascii strings.
+
+    Args:
+        df (pd.DataFrame): dataframe returned by `load_data()`.
+
+    Returns:
+        pd.DataFrame: dtype, bytes, and default_bytes of each column.
+    """
+    ids = df.iloc[:, 0]
+    if ids.dtype.kind == "S":
+        str_bytes = int(np.char.str_len(ids.to_numpy()).sum()) + len(ids) * (sys.getsizeof("") + 8)
+    elif isinstance(ids.dtype, pd.CategoricalDtype):
+        lengths = ids.cat.categories.str.len().to_numpy()
+        counts = np.bincount(ids.cat.codes, minlength=len(lengths))
+        str_bytes = int(counts @ lengths) + len(ids) * (sys.getsizeof("") + 8)
+    else:
+        str_bytes = ids.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "bytes": df.memory_usage(deep=True, index=False),
+            "default_bytes": [str_bytes] + [len(df) * 8] * (df.shape[1] - 1),
+        }
+    )
+    report.index.name = "column"
+    return report
+
+
+def read_csv_chunks(
+    fpath: Path,
+    budget: Optional[int] = None,
+    sample_rows: int = 1_000,
+    feature_dtype: str = "float64",
+    dtype_schema: Optional[Mapping[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a csv file in chunks of as many rows as fit in a quarter of the memory budget.
+
+    Args:
+        fpath (Path): file to read. Can be compressed, as long as `pd.read_csv()` accepts it.
+        budget (int, optional): memory budget in bytes. Defaults to None, which means to read the whole file at once.
+        sample_rows (int, optional): number of rows to estimate the memory size of a row. Defaults to 1_000.
+        feature_dtype (str, optional): dtype of the feature columns. Defaults to "float64".
+        dtype_schema (Mapping[str, str], optional): dtype of individual feature columns, by name. Defaults to None.
+
+    Yields:
+        Iterator[pd.DataFrame]: chunks of the file.
+    """
+    # Parse straight to the target dtypes, instead of to float64 then downcast.
+    columns = pd.read_csv(fpath, nrows=0).columns
+    dtype = {columns[0]: str, **{c: feature_dtype for c in columns[1:]}, **(dtype_schema or {})}
+    kwargs: Dict[str, Any] = {"dtype": dtype, "low_memory": False}
+    if budget is None:
+        yield pd.read_csv(fpath, **kwargs)
+        return
+
+    sample = pd.read_csv(fpath, nrows=sample_rows, **kwargs)
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    chunksize = smepu.resources.chunk_size(bytes_per_row, budget=budget)
+    with pd.read_csv(fpath, chunksize=chunksize, **kwargs) as reader:
+        yield from reader
+
+
 def fit_predict(
-    df: pd.DataFrame,
+    df: Data,
     algo: Type,
     hyperparams: Dict[str, Any],
     override_n_clusters: Optional[int] = None,
+    sample_weight: Optional[np.ndarray] = None,
+    metrics: Optional["MetricEngine"] = None,
 ) -> Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]:
     """Cluster the dataframe.
 
     Args:
-        df (pd.DataFrame): input dataframe.
+        df (Data): input dataframe, or sparse data.
         algo (str): estimator classname.
         hyperparams (Sequence[str]): estimator hyperparameters.
         override_n_clusters (int, optional): If int, set `n_clusters` of the
             estimator. Defaults to None.
+        sample_weight (np.ndarray, optional): Weight of each record, ignored (with a warning) when the estimator's
+            `fit_predict()` does not accept `sample_weight`. Defaults to None.
+        metrics (MetricEngine, optional): Metrics to compute. Defaults to None, which means all registered metrics.
 
     Returns:
         Tuple[ClusterMixin, pd.DataFrame, Dict[str, Any]]: (estimator, cluster labels, metrics)
@@ -236,22 +996,249 @@ def fit_predict(
     estimator = create_estimator(algo, hyperparams, override_n_clusters)
     logger.info("estimator: %s", estimator)
 
-    X = df.iloc[:, 1:]
-    labels: np.ndarray = estimator.fit_predict(X)
-    cluster_metric = {
-        "calinski_harabasz_score": calinski_harabasz_score(X, labels),
-        "davies_bouldin_score": davies_bouldin_score(X, labels),
-        "silhouette_score": silhouette_score(X, labels),
-        "aic": try_metric(estimator, X, "aic"),
-        "bic": try_metric(estimator, X, "bic"),
-    }
+    X = features(df)
+    fit_kwargs = {}
+    if sample_weight is not None:
+        if "sample_weight" in inspect.signature(estimator.fit_predict).parameters:
+            fit_kwargs["sample_weight"] = sample_weight
+        else:
+            logger.warning("%s does not support sample_weight, fit unweighted", type(estimator).__name__)
+    with smepu.profiling.stage("fit"):
+        try:
+            labels: np.ndarray = estimator.fit_predict(X, **fit_kwargs)
+        except TypeError as e:
+            # sklearn raises TypeError on sparse input to dense-only estimators.
+            if not (sp.issparse(X) and "sparse" in str(e).lower()):
+                raise
+            X = densify(X, estimator)
+            labels = estimator.fit_predict(X, **fit_kwargs)
+    warn_upcast(estimator, X)
+    cluster_metric, per_record = (metrics or MetricEngine()).compute(estimator, X, labels)
     return (
         estimator,
-        dfify_clusters({"cluster_id": labels, "silhouette": silhouette_samples(X, labels)}, df),
+        dfify_clusters({"cluster_id": labels, **per_record}, df),
         cluster_metric,
     )
 
 
+def densify(X: sp.csr_matrix, estimator: ClusterMixin) -> np.ndarray:
+    """Densify sparse features for an estimator that does not support sparse input, when they fit in memory.
+
+    Args:
+        X (sp.csr_matrix): sparse features.
+        estimator (ClusterMixin): estimator that has rejected `X`.
+
+    Raises:
+        MemoryError: the dense features would exceed the memory budget.
+
+    Returns:
+        np.ndarray: dense features.
+    """
+    name = type(estimator).__name__
+    dense_bytes = X.shape[0] * X.shape[1] * X.dtype.itemsize
+    budget = smepu.resources.memory_budget()
+    if budget is not None and dense_bytes > budget:
+        raise MemoryError(
+            f"{name} does not support sparse input, and densified features need {dense_bytes / 2**20:.1f}MiB, "
+            f"but only {budget / 2**20:.1f}MiB is available. Use an estimator that supports sparse input, "
+            "e.g., KMeans or MiniBatchKMeans."
+        )
+    logger.warning("%s does not support sparse input, fit on densified features (%d bytes)", name, dense_bytes)
+    return X.toarray()
+
+
+def register_metric(name: str, greater_is_better: bool = True) -> Callable:
+    """Decorate `f(estimator, X, labels)` to register it as the cluster metric `name`.
+
+    `f` returns a score, or None when the metric does not apply (e.g., aic of kmeans). Alternatively, `f` returns the
+    score of each record, which is saved as a column of the cluster labels (named after the metric without its
+    "_score" suffix), and whose mean is the score.
+
+    Args:
+        name (str): metric name, i.e., its column in `metrics.csv`.
+        greater_is_better (bool, optional): Whether a higher score is better, to rank n_clusters. Defaults to True.
+
+    Returns:
+        Callable: the decorator, which returns `f` as-is.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        METRICS[name] = f
+        METRIC_GREATER_IS_BETTER[name] = greater_is_better
+        return f
+
+    return decorator
+
+
+class MetricEngine(object):
+    """Compute a selection of registered metrics concurrently on a thread pool.
+
+    Metrics are independent, and spend most of their time in numpy, scipy, or BLAS which release the GIL. While they
+    run concurrently, the workers share the threads of the BLAS / OpenMP thread pools (see `smepu.threads.configure()`),
+    i.e., workers x BLAS threads do not exceed the cpus that BLAS alone would use. Each metric is timed as a nested
+    stage of the `metrics` stage, e.g., `metrics/silhouette_score` in `profiling.json`.
+    """
+
+    def __init__(self, names: Optional[Sequence[str]] = None, max_workers: Optional[int] = None) -> None:
+        """Initialize a `MetricEngine` instance.
+
+        Args:
+            names (Optional[Sequence[str]], optional): Metrics to compute. A name that is not registered is imported
+                as a function (e.g., `mymodule.my_metric`) then registered, with `greater_is_better` from the
+                function's attribute of the same name (defaults to True). Defaults to None, which means all
+                registered metrics.
+            max_workers (Optional[int], optional): Threads to compute the metrics. Defaults to None, which means
+                one per metric, up to `smepu.threads.available_cpus()`.
+
+        Raises:
+            ValueError: a metric is neither registered nor importable.
+        """
+        self.names = list(METRICS) if names is None else [resolve_metric(name) for name in names]
+        self.max_workers = max_workers or min(max(len(self.names), 1), smepu.threads.available_cpus())
+
+    @smepu.profiling.stage("metrics")
+    def compute(
+        self, estimator: ClusterMixin, X: Any, labels: np.ndarray
+    ) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Compute cluster metrics of a fitted estimator.
+
+        Args:
+            estimator (ClusterMixin): fitted estimator.
+            X (Any): input features, as a dataframe, an array, or a sparse matrix.
+            labels (np.ndarray): cluster labels of `X`.
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, np.ndarray]]: (cluster metrics, per-record scores by column name)
+        """
+
+        def run(name: str) -> Any:
+            with smepu.profiling.stage(name):
+                return METRICS[name](estimator, X, labels)
+
+        n_workers = min(self.max_workers, len(self.names))
+        if n_workers > 1:
+            # BLAS thread pools are per process, not per thread, hence the workers share their threads.
+            blas_threads = max([pool["num_threads"] for pool in threadpool_info()] or [1])
+            with threadpool_limits(limits=smepu.threads.per_worker(n_workers, blas_threads)):
+                with ThreadPoolExecutor(n_workers) as executor:
+                    results = list(executor.map(smepu.profiling.propagate(run), self.names))
+        else:
+            results = [run(name) for name in self.names]
+
+        cluster_metric, per_record = {}, {}
+        for name, result in zip(self.names, results):
+            if isinstance(result, np.ndarray):
+                per_record[name[: -len("_score")] if name.endswith("_score") else name] = result
+                result = float(np.mean(result))
+            cluster_metric[name] = result
+        return cluster_metric, per_record
+
+
+def resolve_metric(name: str) -> str:
+    """Return `name` when it is a registered metric, else import it as a function and register it under `name`."""
+    if name in METRICS:
+        return name
+    f = locate(name)
+    if not callable(f):
+        raise ValueError(f"Unknown metric: {name}; must be one of {list(METRICS)}, or an importable function")
+    register_metric(name, getattr(f, "greater_is_better", True))(f)
+    return name
+
+
+def select_metrics(metrics: Optional[Sequence[str]], skip_metrics: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Names of the metrics to compute: `metrics` (defaults to all registered) minus `skip_metrics`, or None if all."""
+    if not skip_metrics:
+        return list(metrics) if metrics else None
+    return [name for name in (metrics or METRICS) if name not in skip_metrics]
+
+
+@register_metric("calinski_harabasz_score", greater_is_better=True)
+def calinski_harabasz(estimator: ClusterMixin, X: Any, labels: np.ndarray) -> float:
+    """Return the Calinski-Harabasz score of the clusters, also of sparse features."""
+    if sp.issparse(X):
+        return sparse_cluster_scores(X, labels)[0]
+    return calinski_harabasz_score(X, labels)
+
+
+@register_metric("davies_bouldin_score", greater_is_better=False)
+def davies_bouldin(estimator: ClusterMixin, X: Any, labels: np.ndarray) -> float:
+    """Return the Davies-Bouldin score of the clusters, also of sparse features."""
+    if sp.issparse(X):
+        return sparse_cluster_scores(X, labels)[1]
+    return davies_bouldin_score(X, labels)
+
+
+@register_metric("silhouette_score", greater_is_better=True)
+def silhouette(estimator: ClusterMixin, X: Any, labels: np.ndarray) -> np.ndarray:
+    """Silhouette of each record, whose mean is the same as silhouette_score(), without a 2nd O(n^2) pass."""
+    # Silhouette is O(n^2), computed by sklearn in chunks of pairwise distances whose size is bounded by the
+    # `working_memory` config (in MiB). Size the chunks to half the memory budget, instead of the fixed 1GiB default.
+    # The config is per thread, hence set in the metric's own thread.
+    budget = smepu.resources.memory_budget()
+    working_memory = max(budget // 2**21, 64) if budget is not None else get_config()["working_memory"]
+    with config_context(working_memory=working_memory):
+        return silhouette_samples(X, labels)
+
+
+@register_metric("aic", greater_is_better=False)
+def aic(estimator: ClusterMixin, X: Any, labels: np.ndarray) -> Optional[float]:
+    """Return the Akaike information criterion, or None when the estimator does not provide it (e.g., KMeans)."""
+    return try_metric(estimator, X, "aic")
+
+
+@register_metric("bic", greater_is_better=False)
+def bic(estimator: ClusterMixin, X: Any, labels: np.ndarray) -> Optional[float]:
+    """Return the Bayesian information criterion, or None when the estimator does not provide it (e.g., KMeans)."""
+    return try_metric(estimator, X, "bic")
+
+
+def sparse_cluster_scores(X: sp.csr_matrix, labels: np.ndarray, chunk_rows: int = 10_000) -> Tuple[float, float]:
+    """Calinski-Harabasz and Davies-Bouldin scores of sparse features, which sklearn computes only on dense arrays.
+
+    Only the centroids are dense. Distances to centroids are expanded as ||x||^2 - 2 x.c + ||c||^2, in chunks of rows.
+
+    Args:
+        X (sp.csr_matrix): input features.
+        labels (np.ndarray): cluster labels of `X`.
+        chunk_rows (int, optional): rows per chunk. Defaults to 10_000.
+
+    Returns:
+        Tuple[float, float]: (calinski_harabasz_score, davies_bouldin_score)
+    """
+    _, labels = np.unique(labels, return_inverse=True)
+    n, k = X.shape[0], labels.max() + 1
+    if not 1 < k < n:
+        raise ValueError(f"Number of labels is {k}. Valid values are 2 to n_samples - 1 (inclusive)")
+
+    X = X.astype(float)
+    counts = np.bincount(labels, minlength=k)
+    onehot = sp.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(k, n))
+    centroids = (onehot @ X).toarray() / counts[:, None]
+    centroid_sq = np.square(centroids).sum(axis=1)
+    x_sq = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+    mean = np.asarray(X.mean(axis=0)).ravel()
+
+    # Squared (for within-cluster dispersion) and plain (for Davies-Bouldin) distances of each record to its centroid.
+    sq_dist = np.empty(n)
+    for start in range(0, n, chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        dot = np.asarray(X[rows] @ centroids.T)[np.arange(len(x_sq[rows])), labels[rows]]
+        sq_dist[rows] = x_sq[rows] - 2 * dot + centroid_sq[labels[rows]]
+    sq_dist = np.maximum(sq_dist, 0)
+
+    within = sq_dist.sum()
+    between = (counts * np.square(centroids - mean).sum(axis=1)).sum()
+    calinski_harabasz = 1.0 if within == 0 else between * (n - k) / (within * (k - 1))
+
+    intra = np.bincount(labels, weights=np.sqrt(sq_dist), minlength=k) / counts
+    centroid_dist = np.sqrt(np.maximum(centroid_sq[:, None] - 2 * centroids @ centroids.T + centroid_sq[None, :], 0))
+    centroid_dist[centroid_dist == 0] = np.inf
+    np.fill_diagonal(centroid_dist, np.inf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        davies_bouldin = float(np.max((intra[:, None] + intra[None, :]) / centroid_dist, axis=1).mean())
+    return float(calinski_harabasz), davies_bouldin
+
+
 def try_metric(estimator: ClusterMixin, X: np.ndarray, name: str) -> Optional[float]:
     try:
         f = getattr(estimator, name)
@@ -273,7 +1260,8 @@ def parse_estimator_cli_args(
     Returns:
         ClusterMixin: clustering estimator.
     """
-    return cast(Type, locate(clsname)), smepu.argparse.to_kwargs(hyperparams)
+    klass = cast(Type, locate(clsname))
+    return klass, smepu.argparse.to_kwargs(hyperparams, target=klass)
 
 
 def create_estimator(
@@ -301,18 +1289,48 @@ def create_estimator(
     return estimator
 
 
-def dfify_clusters(cols: Dict[str, np.ndarray], df: pd.DataFrame) -> pd.DataFrame:
+def warn_upcast(estimator: ClusterMixin, X: Any) -> None:
+    """Warn when a fitted estimator has converted float32 (or narrower) features to a wider float.
+
+    Args:
+        estimator (ClusterMixin): fitted estimator.
+        X (Any): input features, as a dataframe, an array, or a sparse matrix.
+    """
+    dtype = np.result_type(*X.dtypes) if isinstance(X, pd.DataFrame) else X.dtype
+    for attr in ("cluster_centers_", "means_"):
+        fitted = getattr(estimator, attr, None)
+        if isinstance(fitted, np.ndarray) and fitted.dtype.itemsize > dtype.itemsize:
+            logger.warning("%s has upcast %s features to %s", type(estimator).__name__, dtype, fitted.dtype)
+            return
+
+
+def decode_bytes(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of `df`, where fixed-width bytes columns (see `load_data(id_dtype="bytes")`) are decoded to `str`.
+
+    Args:
+        df (pd.DataFrame): dataframe.
+
+    Returns:
+        pd.DataFrame: dataframe to write.
+    """
+    df = df.copy()
+    for col in df.columns[df.dtypes.map(lambda t: t.kind == "S")]:
+        df[col] = np.char.decode(df[col].to_numpy(), "utf-8")
+    return df
+
+
+def dfify_clusters(cols: Dict[str, np.ndarray], df: Data) -> pd.DataFrame:
     """Concatenate cluster ids with their input features.
 
     Args:
         cols (Dict[str, np.ndarray]): Columns to prepend to df.
-        df (pd.DataFrame): inputrecord ids and their features.
+        df (Data): inputrecord ids and their features, or sparse data whose features are omitted.
 
     Returns:
         pd.DataFrame: cluster labels with features.
     """
     sers = [pd.Series(a, name=c) for c, a in cols.items()]
-    retval = pd.concat([*sers, df], axis=1)
+    retval = pd.concat([*sers, df if isinstance(df, pd.DataFrame) else df.ids], axis=1)
     return retval
 
 
@@ -334,6 +1352,11 @@ def get_ncluster_kwarg(cls: Type) -> str:
         return ""
 
 
+def comma_separated(s: str) -> List[str]:
+    """Split a comma-separated cli arg into its non-empty, stripped items."""
+    return [x.strip() for x in s.split(",") if x.strip()]
+
+
 def add_argument(parser):
     parser.add_argument(
         "--algo",
@@ -342,6 +1365,50 @@ def add_argument(parser):
         default="sklearn.cluster.KMeans",
     )
 
+    group = parser.add_argument_group("data")
+    group.add_argument(
+        "--memory-optimized",
+        type=int,
+        default=0,
+        help="Shorthand for --feature-dtype float32 --id-dtype bytes",
+    )
+    group.add_argument("--feature-dtype", default=None, help="dtype of the feature columns (default=float64)")
+    group.add_argument(
+        "--id-dtype",
+        choices=ID_DTYPES,
+        default=None,
+        help="str: Python strings. category: for repeated ids. bytes: utf-8, fixed width. (default=str)",
+    )
+    group.add_argument(
+        "--dtype-schema",
+        type=json.loads,
+        default=None,
+        help='JSON dtype of individual feature columns, e.g., \'{"f1": "float32", "f2": "int8"}\'',
+    )
+
+    group = parser.add_argument_group("metrics")
+    group.add_argument(
+        "--metrics",
+        type=comma_separated,
+        default=None,
+        help=(
+            f"Comma-separated metrics to compute. Each is one of {list(METRICS)}, or the full name of a function "
+            "f(estimator, X, labels) -> score (default=all of the former)"
+        ),
+    )
+    group.add_argument(
+        "--skip-metrics",
+        type=comma_separated,
+        default=None,
+        help="Comma-separated metrics not to compute, e.g., silhouette_score which is O(n^2)",
+    )
+    group.add_argument(
+        "--metric-workers",
+        type=int,
+        default=None,
+        help="Threads to compute metrics concurrently; 1 computes them one after another (default=one per metric)",
+    )
+
     group = parser.add_argument_group("sweep")
     group.add_argument(
         "--sweep",
@@ -351,6 +1418,74 @@ def add_argument(parser):
     )
     group.add_argument("--sweep-start", type=int, help="Start n_clusters to search (defaults=2)", default=2)
     group.add_argument("--sweep-end", type=int, help="End n_clusters to search (defaults=4)", default=4)
+    group.add_argument(
+        "--sweep-mode",
+        choices=SWEEP_MODES,
+        default="full",
+        help=(
+            "full: fully fit every n_clusters. halving: successive halving on subsamples, then fully fit the best. "
+            "adaptive: coarse log-spaced n_clusters, then refine around the best. "
+            "subsample: sweep on a subsample, then fully fit the best."
+        ),
+    )
+    group.add_argument(
+        "--sweep-metric",
+        default="silhouette_score",
+        help=(
+            f"Metric to rank n_clusters in halving, adaptive, and subsample modes, one of {list(METRICS)} or a "
+            "--metrics function (default=silhouette_score)"
+        ),
+    )
+    group.add_argument("--halving-eta", type=int, help="Promote the top 1/eta of each rung (default=3)", default=3)
+    group.add_argument(
+        "--halving-min-samples", type=int, help="Minimum subsample size in halving mode (default=100)", default=100
+    )
+    group.add_argument(
+        "--adaptive-coarse-points",
+        type=int,
+        help="Number of log-spaced n_clusters to start the adaptive mode (default=8)",
+        default=8,
+    )
+    group.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=smepu.checkpoint.default_checkpoint_dir(),
+        help="Checkpoint each full fit of a sweep here, and resume from it (default=/opt/ml/checkpoints on SageMaker)",
+    )
+    group.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse the model, labels, and metrics of any n_clusters already fitted on the same data by a previous job",
+    )
+    group.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=None,
+        help="Evict the least-recently-used results once the cache exceeds this size (default=unbounded)",
+    )
+    group.add_argument(
+        "--cache-fingerprint",
+        choices=smepu.io.FINGERPRINT_MODES,
+        default="sampled",
+        help=(
+            "How to detect changes of the training channel, for checkpoints and the cache. stat: paths, sizes, and "
+            "mtimes of the files. sampled: paths, sizes, and sampled blocks of content. full: hash all content. "
+            "(default=sampled)"
+        ),
+    )
+    group.add_argument(
+        "--subsample-size",
+        type=int,
+        help="Number of records to sweep on in subsample mode (default=10000)",
+        default=10_000,
+    )
+    group.add_argument(
+        "--subsample-method",
+        choices=SUBSAMPLE_METHODS,
+        default="uniform",
+        help="uniform: uniform random records. coreset: lightweight coreset with sample weights. (default=uniform)",
+    )
 
 
 if __name__ == "__main__":
@@ -365,4 +1500,6 @@ if __name__ == "__main__":
         smepu.mkdir(args.model_dir)
         smepu.mkdir(args.output_data_dir)
 
+    # Log & write per-stage timings to the output data dir when this script exits.
+    smepu.profiling.enable(args.output_data_dir)
     main(vars(args), train_args)
@@ -18,8 +18,10 @@ required_packages: List[str] = []
 
 # Specific use case dependencies
 extras = {
-    "all": ["click"],
+    "all": ["click", "numpy", "scipy"],
     "click": ["click"],
+    "recordio": ["numpy", "scipy"],
+    "bench": ["pytest", "pytest-benchmark"],
 }
 
 setup(
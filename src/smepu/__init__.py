@@ -5,9 +5,16 @@
 import os
 
 from . import argparse  # noqa
+from . import cache  # noqa
+from . import checkpoint  # noqa
+from . import io  # noqa
+from . import profiling  # noqa
+from . import resources  # noqa
+from . import threads  # noqa
 from ._version import get_versions
 from .argparse import _list as list  # noqa
 from .argparse import _set as set  # noqa
+from .argparse import run_script  # noqa
 from .core import is_on_sagemaker, mkdir, pathify, setup_opinionated_logger  # noqa
 
 __version__ = get_versions()["version"]
@@ -64,3 +71,7 @@ if is_on_sagemaker():
     # Additional setting for spacy.train to make its log plain.
     print("SM_HOSTS: make plain spacy train.")
     os.environ["LOG_FRIENDLY"] = "1"
+
+    # Size BLAS / OpenMP thread pools to the cpu quota of the container, unless already set. Report what is in effect.
+    threads.configure()
+    print(f"SM_HOSTS: BLAS / OpenMP threads {', '.join(f'{k}={os.environ[k]}' for k in threads.ENV_VARS)}.")
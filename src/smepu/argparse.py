@@ -3,15 +3,29 @@
 
 """Placeholder."""
 import argparse
+import inspect
 import json
 import os
+import runpy
 import sys
+import types
 import warnings
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union, get_type_hints
 
+from . import profiling, resources
 from ._gluonts_core_serde import decode
 
+# Hyperparameters with this prefix are meant for smepu, not for the wrapped callable.
+RESERVED_PREFIX = "smepu."
+
+# How to_sys_argv() passes ``--flag False``, see there.
+FALSE_FLAGS = ("verbatim", "negate", "drop")
+
+# PEP 604 unions, e.g., ``float | None``, are not typing.Union.
+_UNION_TYPES = (types.UnionType,) if sys.version_info >= (3, 10) else ()
+
 
 def _list(*args):
     """Provide a wrapper to Python list, to be used by cli args."""
@@ -69,7 +83,7 @@ def sm_protocol(
     return parser
 
 
-def to_kwargs(cli_args: Iterable[str]) -> Dict[str, Any]:
+def to_kwargs(cli_args: Iterable[str], target: Optional[Callable] = None) -> Dict[str, Any]:
     """Convert list of ['--name', 'value', ...] to {'name': val} that represents **kwargs of a callable.
 
     The ``value`` string will be converted to ``val`` which is either the nearest data type or a specific class as
@@ -77,29 +91,207 @@ def to_kwargs(cli_args: Iterable[str]) -> Dict[str, Any]:
 
     For the nearest types, conversion follows the principle: "if it looks like a duck and quacks like a duck, then it
     must be a duck".
+
+    When ``target`` is given, the value of each of its type-annotated parameters is converted to the annotated type
+    instead, e.g., ``--init 1`` remains a ``str`` when ``target`` is ``def f(init: str)``. Supported annotations are
+    ``str``, ``int``, ``float``, ``bool``, ``Path``, and ``Optional`` of those. Other parameters fallback to the
+    nearest types.
+
+    Reserved hyperparameters (i.e., ``--smepu.*``) are acted upon then removed from the returned kwargs. Supported:
+
+    - ``--smepu.profile cpu|mem|stages``: profile the rest of the job, and write the profile to the output data dir.
+      See ``smepu.profiling.start_capture()``.
+    - ``--smepu.sample_resources <seconds>``: log resource utilization at this interval. See
+      ``smepu.resources.start_sampler()``.
+
+    Args:
+        cli_args (Iterable[str]): cli args.
+        target (Callable, optional): The callable (e.g., a class) that will receive the kwargs. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: kwargs.
+
+    Raises:
+        ValueError: a value cannot be converted to the annotated type of its ``target`` parameter.
     """
     # TODO: with eval() and/or exec(), the cli args can be made shorter. Is this a good idea?
-    args_round_1 = _round_1(cli_args)
-    args_round_2 = _round_2(args_round_1)  # Custom class in IR
-    return args_round_2
+    args_round_1 = _round_1(cli_args, _converters(target) if target is not None else None)
+    return _finish(args_round_1)
 
 
-def to_sys_argv(cli_args: List[str]) -> List[Any]:
-    """Put a placeholder."""
-    # TODO: This function converts a SageMaker-compatible CLI args to structure that the underlying function expect.
-    # Intended use-case: when wrapping another function that directly access sys.argv.
-    # Returns a new sys.argv-like data structure, i.e., ['--param1', 'value1', '--].
-    raise NotImplementedError
+def from_hyperparameters_json(
+    path: Union[None, str, Path] = None,
+    exclude: Iterable[str] = (),
+    target: Optional[Callable] = None,
+) -> Dict[str, Any]:
+    """Load hyperparameters from SageMaker's ``hyperparameters.json``, and convert them to kwargs of a callable.
 
+    This is the same as ``to_kwargs()``, except that hyperparameters are read directly from the json file, rather than
+    from cli args. Hence, no tokenization of cli args, and no shell quoting issues. Each value may be JSON-encoded (as
+    the SageMaker Python SDK v2 does) or not.
+
+    SageMaker's own hyperparameters (i.e., ``sagemaker_*``) are always excluded.
+
+    Args:
+        path (Union[None, str, Path], optional): Path to the json file. Defaults to None which means
+            ``hyperparameters.json`` under ``SM_INPUT_CONFIG_DIR``, or ``/opt/ml/input/config``.
+        exclude (Iterable[str], optional): Hyperparameters that are not kwargs, e.g., those of the entrypoint script
+            itself. Dashes and underscores are interchangeable, hence ``exclude=vars(args)`` works with the namespace
+            returned by an ``argparse`` parser. Defaults to ().
+        target (Callable, optional): The callable (e.g., a class) that will receive the kwargs. See ``to_kwargs()``.
+            Defaults to None.
 
-def patch_sys_argv(cli_args: List[str]) -> List[Any]:
-    """Put a placeholder."""
-    # TODO: replace sys.argv with whatever returned by parse_hp_for_argv. Return the original sys.argv.
+    Returns:
+        Dict[str, Any]: kwargs.
+    """
+    if path is None:
+        path = Path(os.environ.get("SM_INPUT_CONFIG_DIR", "/opt/ml/input/config")) / "hyperparameters.json"
+    with open(path) as f:
+        hps: Dict[str, Any] = json.load(f)
+
+    excluded = {k.replace("-", "_") for k in exclude}
+    converters = _converters(target) if target is not None else {}
+    d = {}
+    for k, v in hps.items():
+        if k.startswith("sagemaker_") or k.replace("-", "_") in excluded:
+            continue
+        v = _json_decode(v)
+        converter = converters.get(k)
+        if converter is not None and (v is None or isinstance(v, (str, bool, int, float))):
+            # Same as the cli-arg string that an entrypoint receives from SageMaker.
+            d[k] = converter(str(v))
+        elif isinstance(v, str):
+            d[k] = infer_dtype(v)
+        else:
+            # Already the nearest data type.
+            d[k] = v
+    return _finish(d)
+
+
+def _json_decode(v: Any) -> Any:
+    """Decode a JSON-encoded hyperparameter value, or return the value as-is when it is not JSON-encoded."""
+    if not isinstance(v, str):
+        return v
+    if v[:1] == '"' and v[-1:] == '"' and len(v) > 1 and '"' not in v[1:-1] and "\\" not in v:
+        # Fast path for plain JSON strings, by far the most common.
+        return v[1:-1]
+    try:
+        return json.loads(v)
+    except ValueError:
+        return v
+
+
+def to_sys_argv(cli_args: Iterable[str], false_flags: str = "verbatim") -> List[str]:
+    """Convert SageMaker-compatible cli args to the sys.argv (minus the program name) that a wrapped script expects.
+
+    Intended use-case: when wrapping another script or function that directly access sys.argv. SageMaker always passes
+    hyperparameters as ['--name', 'value', ...], which this function converts to argparse conventions:
+
+    - ``--flag True`` becomes ``--flag``, i.e., ``action="store_true"`` or ``nargs="?"``.
+    - ``--flag False`` depends on ``false_flags``: "verbatim" keeps it as-is (e.g., HF ``--remove_unused_columns
+      False``, or ``type=str2bool``), "negate" becomes ``--no-flag`` (i.e., ``argparse.BooleanOptionalAction``), and
+      "drop" removes it (i.e., ``action="store_true"``, but a flag that defaults to True stays True).
+    - ``--name '[1, 2]'`` (i.e., a JSON list of scalars) becomes ``--name 1 2``, i.e., ``nargs="*"``. A list that
+      contains lists or dicts is passed verbatim, i.e., as JSON.
+    - Everything else is passed through verbatim.
+
+    Reserved hyperparameters (i.e., ``--smepu.*``) are acted upon then removed, as in ``to_kwargs()``.
+
+    Args:
+        cli_args (Iterable[str]): cli args.
+        false_flags (str, optional): "verbatim", "negate", or "drop". Defaults to "verbatim".
+
+    Returns:
+        List[str]: sys.argv-like list, i.e., ['--param1', 'value1', '--flag', '--param2', 'v2a', 'v2b', ...]
+
+    Raises:
+        ValueError: invalid ``false_flags``.
+    """
+    if false_flags not in FALSE_FLAGS:
+        raise ValueError(f"Invalid false_flags: {false_flags}; must be one of {FALSE_FLAGS}")
+
+    d = _tokenize(cli_args)
+    reserved, d = _split_reserved(d)
+    _apply_reserved({k: infer_dtype(v) for k, v in reserved.items()})
+
+    argv: List[str] = []
+    for k, v in d.items():
+        if v == "True":
+            argv.append(f"--{k}")
+        elif v == "False" and false_flags != "verbatim":
+            if false_flags == "negate":
+                argv.append(f"--no-{k}")
+        elif v[:1] == "[" and _is_flat_list(infer_dtype(v)):
+            argv.append(f"--{k}")
+            argv.extend(str(i) for i in json.loads(v))
+        else:
+            argv.extend([f"--{k}", v])
+    return argv
+
+
+def _is_flat_list(v: Any) -> bool:
+    """Check whether ``v`` is a list of scalars, i.e., ``nargs="*"`` material."""
+    return isinstance(v, list) and all(isinstance(i, (str, int, float)) for i in v)
+
+
+def patch_sys_argv(cli_args: Iterable[str], false_flags: str = "verbatim") -> List[str]:
+    """Replace sys.argv[1:] with ``to_sys_argv(cli_args, false_flags)``.
+
+    Returns:
+        List[str]: the original sys.argv, to be restored by the caller.
+    """
     ori_sys_argv = sys.argv
-    sys.argv = [sys.argv[0], *to_sys_argv(cli_args)]
+    sys.argv = [sys.argv[0], *to_sys_argv(cli_args, false_flags)]
     return ori_sys_argv
 
 
+def run_script(
+    path_or_module: str, cli_args: Iterable[str], false_flags: str = "verbatim", convert_args: bool = True
+) -> Dict[str, Any]:
+    """Run a Python script or module as ``__main__`` in this interpreter, with ``to_sys_argv(cli_args)`` as its args.
+
+    Unlike spawning a new Python process, the wrapped script reuses the modules already imported by the caller (e.g.,
+    torch, transformers), hence skips their import time. As with ``python script.py``, the script's directory is
+    prepended to ``sys.path``. The original ``sys.argv`` and ``sys.path`` are restored afterwards.
+
+    >>> smepu.run_script("run_ner.py", train_args)      # Same as: python run_ner.py ...
+    >>> smepu.run_script("mypackage.train", train_args)  # Same as: python -m mypackage.train ...
+
+    Args:
+        path_or_module (str): Path to a .py file or a directory with ``__main__.py``, otherwise a module name.
+        cli_args (Iterable[str]): SageMaker-compatible cli args, to be converted by ``to_sys_argv()``.
+        false_flags (str, optional): See ``to_sys_argv()``. Defaults to "verbatim".
+        convert_args (bool, optional): When False, the script receives ``cli_args`` verbatim, as SageMaker passes them,
+            e.g., to an entrypoint that parses them with ``to_kwargs()``. Defaults to True.
+
+    Raises:
+        SystemExit: the script exits with a non-zero status.
+
+    Returns:
+        Dict[str, Any]: the globals of the script after it finishes, or an empty dict when it calls ``sys.exit(0)``.
+    """
+    if convert_args:
+        ori_sys_argv = patch_sys_argv(cli_args, false_flags)
+    else:
+        ori_sys_argv, sys.argv = sys.argv, [sys.argv[0], *cli_args]
+    ori_sys_path = sys.path[:]
+    try:
+        if path_or_module.endswith(".py") or os.path.exists(path_or_module):
+            sys.argv[0] = path_or_module
+            sys.path.insert(0, os.path.dirname(os.path.abspath(path_or_module)))
+            return runpy.run_path(path_or_module, run_name="__main__")
+        else:
+            # Similar to python -m, which sets sys.argv[0] to the module's path.
+            return runpy.run_module(path_or_module, run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise
+        return {}
+    finally:
+        sys.argv = ori_sys_argv
+        sys.path[:] = ori_sys_path
+
+
 def infer_dtype(s):
     """Auto-cast string values to nearest matching datatype.
 
@@ -134,14 +326,25 @@ def infer_dtype(s):
 # Helper utilities
 ################################################################################
 ArgsDict = Dict[str, Any]
-IR = Dict[str, "ObjectIR"]
+Converter = Callable[[str], Any]
 
 
-def _round_1(cli_args: Iterable[str]) -> ArgsDict:
+def _round_1(cli_args: Iterable[str], converters: Optional[Dict[str, Converter]] = None) -> ArgsDict:
     """Convert list of ['--name', 'value', ...] to {'name': val}, where 'val' will be in the nearest data type.
 
-    Conversion follows the principle: "if it looks like a duck and quacks like a duck, then it must be a duck".
+    Conversion follows the principle: "if it looks like a duck and quacks like a duck, then it must be a duck", except
+    for names that have a converter.
     """
+    d = _tokenize(cli_args)
+
+    # Infer data types.
+    if not converters:
+        return {k: infer_dtype(v) for k, v in d.items()}
+    return {k: converters.get(k, infer_dtype)(v) for k, v in d.items()}
+
+
+def _tokenize(cli_args: Iterable[str]) -> Dict[str, str]:
+    """Convert list of ['--name', 'value', ...] to {'name': 'value'}."""
     d = {}
     it = iter(cli_args)
     try:
@@ -161,10 +364,100 @@ def _round_1(cli_args: Iterable[str]) -> ArgsDict:
     except StopIteration:
         if expected > 1:
             raise ValueError(f"CLI arg --{key} has no value, so ignored")
+    return d
+
+
+@lru_cache(maxsize=None)
+def _converters(target: Callable) -> Dict[str, Converter]:
+    """Build a converter for each type-annotated parameter of ``target``. Cached per ``target``."""
+    try:
+        params = inspect.signature(target).parameters
+    except (TypeError, ValueError):
+        return {}
+
+    try:
+        hints = get_type_hints(target.__init__ if inspect.isclass(target) else target)  # type: ignore
+    except Exception:
+        # Unresolvable forward references, etc.
+        hints = {}
+
+    retval = {}
+    for name, param in params.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        converter = _converter_of(name, hints.get(name, param.annotation))
+        if converter is not None:
+            retval[name] = converter
+    return retval
+
+
+def _converter_of(name: str, annotation: Any) -> Optional[Converter]:
+    """Create a converter of cli arg ``name`` to its ``annotation`` type, or None when not supported."""
+    # Optional[X] is Union[X, None], and so is X | None
+    if getattr(annotation, "__origin__", None) is Union or isinstance(annotation, _UNION_TYPES):
+        args = [t for t in annotation.__args__ if t is not type(None)]  # noqa: E721
+        if len(args) != 1:
+            return None
+        converter = _converter_of(name, args[0])
+        if converter is None:
+            return None
+        return lambda s: None if s == "None" else converter(s)  # type: ignore
+
+    if annotation is str:
+        return str
+    if annotation is bool:
+        return lambda s: _to_bool(name, s)
+    if annotation in (int, float, Path):
+        return lambda s: _to_type(name, annotation, s)
+    return None
+
+
+def _to_bool(name: str, s: str) -> bool:
+    """Convert a cli arg to bool."""
+    if s in ("True", "true", "1"):
+        return True
+    if s in ("False", "false", "0"):
+        return False
+    raise ValueError(f'CLI arg --{name} expects bool, but got "{s}"')
+
+
+def _to_type(name: str, klass: Type, s: str) -> Any:
+    """Convert a cli arg to ``klass``."""
+    try:
+        return klass(s)
+    except ValueError:
+        raise ValueError(f'CLI arg --{name} expects {klass.__name__}, but got "{s}"')
 
-    # Infer data types.
-    dd = {k: infer_dtype(v) for k, v in d.items()}
-    return dd
+
+def _finish(d: ArgsDict) -> ArgsDict:
+    """Act on then remove reserved arguments, then lower the rest."""
+    reserved, d = _split_reserved(d)
+    _apply_reserved(reserved)
+    return _round_2(d)  # Custom class in IR
+
+
+def _split_reserved(d: ArgsDict) -> Tuple[ArgsDict, ArgsDict]:
+    """Split arguments into (reserved, the rest), where the reserved ones are stripped of their prefix."""
+    reserved, rest = {}, {}
+    for k, v in d.items():
+        if k.startswith(RESERVED_PREFIX):
+            reserved[k[len(RESERVED_PREFIX) :]] = v
+        else:
+            rest[k] = v
+    return reserved, rest
+
+
+def _apply_reserved(reserved: ArgsDict) -> None:
+    """Act on reserved hyperparameters."""
+    for k, v in reserved.items():
+        if k == "profile":
+            if v is not None:
+                profiling.start_capture(v)
+        elif k == "sample_resources":
+            if v:
+                resources.start_sampler(v)
+        else:
+            warnings.warn(f"Unknown reserved cli args / hyperparams: {RESERVED_PREFIX}{k}")
 
 
 def _round_2(d: ArgsDict) -> ArgsDict:
@@ -180,137 +473,115 @@ def _round_2(d: ArgsDict) -> ArgsDict:
     Returns:
         ArgsDict: lowered arguments.
     """
+    untouched, root = _TrieNode.build(d)
+    desered = {k: decode(node.to_ir(k)) for k, node in root.children.items()}
+    return {**untouched, **desered}
 
-    def split_args(d: ArgsDict) -> Tuple[IR, ArgsDict]:
-        """Split input arguments into two parts: as-is, and to-be-lowered.
 
-        Args:
-            d (ArgsDict): Arguments produced by round-1 parsing.
+class _TrieNode(object):
+    """A trie of dotted cli args, where each node is one component of the dotted keys.
 
-        Returns:
-            Tuple[ArgsDict, ArgsDict]: Tuple of (as-is arguments, to-be-lowered arguments).
-        """
-        untouched, workset = {}, {}
-        for k, v in d.items():
-            if "." not in k:
-                untouched[k] = v
-            else:
-                workset[k] = v
-        return untouched, workset
-
-    def lower(d) -> IR:
-        """Convert cli args dict to ObjectIR."""
-        klasses, rest = ObjectIR.split(d)
-        ObjectIR.scatter_args(klasses, rest)
-        # [print(f"{k}:", v.klass_dict) for k, v in klasses.items()]  # type: ignore
-        top_level_klasses = ObjectIR.reduce_oir(klasses)
-        return top_level_klasses
-
-    untouched, workset = split_args(d)
-    ir = lower(workset)
-    desered = {k: decode(v.klass_dict) for k, v in ir.items()}
-    # [print(f"{k}:", v.klass_dict) for k, v in ir.items()]  # type: ignore
-    return {**untouched, **desered}
+    For example, "--callbacks.__class__ smepu.list --callbacks.0.__class__ dummyest.DummyCallback
+    --callbacks.0.name EarlyStopper" becomes:
 
+    root
+    └── callbacks      (klass="smepu.list")
+        └── 0          (klass="dummyest.DummyCallback")
+            └── name = "EarlyStopper"
 
-class ObjectIR(object):
-    """Intermediate representation of an instance of a custom class."""
+    A node is an instance of its ``klass``, whose children are its positional args (i.e., digits) and kwargs. A child
+    is either a nested node, or a plain value.
+    """
 
-    @staticmethod
-    def split(d: ArgsDict) -> Tuple[ArgsDict, ArgsDict]:
-        """Split arguments into as-is vs lowered."""
-        klasses, rest = {}, {}
-        for k, v in d.items():
-            if k.endswith("__class__"):
-                klasses[k[: -len(".__class__")]] = ObjectIR(v)
-            else:
-                # I'm args (either pos or kw).
-                rest[k] = v
-        return klasses, rest
+    __slots__ = ("klass", "children", "n_args")
 
-    @staticmethod
-    def scatter_args(klasses: IR, rest: ArgsDict):
-        """Assign arguments to their ObjectIR; will modify ``klasses`` in-place."""
-        for k, v in rest.items():
-            k2, arg_spec = k.rsplit(".", 1)
-            object_ir = klasses[k2]  # Get the owner ObjectIR.
-            if ObjectIR.is_kwarg(arg_spec):
-                object_ir.kwargs[arg_spec] = v
-            else:
-                object_ir.args_d[arg_spec] = v
+    def __init__(self) -> None:
+        """Initialize a ``_TrieNode`` instance."""
+        self.klass: Optional[str] = None
+        self.children: Dict[str, Any] = {}  # {name: _TrieNode or value}
+        self.n_args = 0  # Number of children that are positional args.
 
     @staticmethod
-    def is_kwarg(s: str) -> bool:
-        """Check whether this is a positional argument or keyword argument."""
-        try:
-            # Python doesn't optimize away (i.e., remove) next statement,
-            # unlike some compilers; or else, fun puzzling time ahead.
-            int(s)
-            return False
-        except ValueError:
-            return True
+    def build(d: ArgsDict) -> Tuple[ArgsDict, "_TrieNode"]:
+        """Split arguments into as-is vs to-be-lowered, in a single pass.
 
-    @staticmethod
-    def reduce_oir(klasses: IR) -> IR:
-        """Reduced ObjectIR to just the top-level ones."""
-        # After lower, we end up with this:
-        #
-        # callbacks: {
-        #   '__kind__': 'instance',
-        #   'class': 'smepu.list',
-        #   'args': [],
-        #   'kwargs': {}}
-        #
-        # callbacks.0: {
-        #   '__kind__': 'instance',
-        #   'class': 'dummyest.DummyCallback',
-        #   'args': [],
-        #   'kwargs': {'name': 'EarlyStopper'}
-        # }
-        #
-        # callbacks.1: {
-        #   '__kind__': 'instance',
-        #   'class': 'dummyest.DummyCallback',
-        #   'args': ['Checkpointer'],
-        #   'kwargs': {}
-        # }
-        #
-        # So, another step needed to properly assign each ObjectIR as pos- or kw-args of another ObjectIR.
-        for k, v in klasses.items():
+        Args:
+            d (ArgsDict): Arguments produced by round-1 parsing.
+
+        Returns:
+            Tuple[ArgsDict, _TrieNode]: Tuple of (as-is arguments, root of the to-be-lowered arguments). The order of
+                the dotted keys does not matter.
+        """
+        untouched: ArgsDict = {}
+        root = _TrieNode()
+        nodes = {"": root}  # Index of {dotted prefix: node}, so that each key walks the trie at most once.
+
+        def get_node(prefix: str) -> _TrieNode:
+            node = nodes.get(prefix)
+            if node is None:
+                parent, _, name = prefix.rpartition(".")
+                node = nodes[prefix] = _TrieNode()
+                get_node(parent).add(name, node)
+            return node
+
+        for k, v in d.items():
             if "." not in k:
-                # Top-level has no parent.
+                untouched[k] = v
                 continue
 
-            k2, arg_spec = k.rsplit(".", 1)
-            object_ir = klasses[k2]  # Get the parent ObjectIR
-            if ObjectIR.is_kwarg(arg_spec):
-                object_ir.kwargs[arg_spec] = v
+            prefix, _, leaf = k.rpartition(".")
+            node = nodes.get(prefix) or get_node(prefix)
+            if leaf == "__class__":
+                node.klass = v
             else:
-                object_ir.args_d[arg_spec] = v
-
-        return {k: v for k, v in klasses.items() if "." not in k}
-
-    def __init__(self, klass: str) -> None:
-        """Initialize an instance of ``ObjectIR``.
+                node.add(leaf, v)
+        return untouched, root
+
+    def add(self, name: str, child: Any) -> None:
+        """Add a child, where a nested node takes precedence over a plain value of the same name."""
+        old = self.children.get(name, _TrieNode)
+        if old is _TrieNode:
+            if _is_positional(name):
+                self.n_args += 1
+        elif isinstance(old, _TrieNode):
+            return
+        self.children[name] = child
+
+    def to_ir(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return this node as a gluonts-style dictionary, or None for a lone ``--key.__class__ None``.
 
         Args:
-            klass (str): Full class name.
+            key (str): Dotted key of this node, for error messages.
         """
-        self.klass = klass
-        self.args_d: ArgsDict = {}  # Use dict as #args unknown & may be out-of-order.
-        self.kwargs: ArgsDict = {}
-
-    @property
-    def args(self) -> List[Any]:
-        """Convert args dictionary to list."""
-        args = [None] * len(self.args_d)
-        for k, v in self.args_d.items():
-            args[int(k)] = v
-        return args
-
-    @property
-    def klass_dict(self) -> ArgsDict:
-        """Return this IR object as a gluonts-style dictionary."""
-        args_ird = [a.klass_dict if isinstance(a, ObjectIR) else a for a in self.args]
-        kwargs_ird = {k: v.klass_dict if isinstance(v, ObjectIR) else v for k, v in self.kwargs.items()}
-        return {"__kind__": "instance", "class": self.klass, "args": args_ird, "kwargs": kwargs_ird}
+        if self.klass is None:
+            if not self.children:
+                return None
+            raise KeyError(f"--{key}.{next(iter(self.children))} requires --{key}.__class__")
+
+        args: List[Any] = [None] * self.n_args  # Positional args may be out-of-order.
+        kwargs: ArgsDict = {}
+        for name, child in self.children.items():
+            if isinstance(child, _TrieNode):
+                child = child.to_ir(f"{key}.{name}")
+            if not _is_positional(name):
+                kwargs[name] = child
+            elif -self.n_args <= int(name) < self.n_args:
+                args[int(name)] = child
+            else:
+                raise KeyError(f"--{key}.{name} requires --{key}.{self._missing_arg()}")
+        return {"__kind__": "instance", "class": self.klass, "args": args, "kwargs": kwargs}
+
+    def _missing_arg(self) -> int:
+        """Return the first position without a positional arg."""
+        positions = (int(name) for name in self.children if _is_positional(name))
+        given = {i % self.n_args for i in positions if -self.n_args <= i < self.n_args}
+        return min(set(range(self.n_args)) - given)
+
+
+def _is_positional(name: str) -> bool:
+    """Check whether a child is a positional argument (i.e., an integer), or a keyword argument."""
+    try:
+        int(name)
+        return True
+    except ValueError:
+        return False
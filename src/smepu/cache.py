@@ -0,0 +1,125 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Content-addressed cache of trial results on local disk, with LRU eviction by size.
+
+An entry is a dir of artifacts (e.g., fitted model, labels, metrics), addressed by a digest of whatever determines
+them, e.g., (data fingerprint, estimator class, estimator kwargs). Entries are written to a temporary dir then renamed
+into place, hence an entry either exists completely or not at all. Every hit refreshes the entry's mtime, and once the
+cache exceeds ``max_bytes``, the least-recently-used entries are evicted.
+
+Sample usage:
+
+>>> import smepu
+>>> cache = smepu.cache.ResultCache("/tmp/smepu-cache", max_bytes=2**30)
+>>> key = cache.key(fingerprint, "sklearn.cluster.KMeans", {"n_clusters": 5})
+>>> entry = cache.get(key)
+>>> if entry is None:
+>>>     ...  # Train
+>>>     with cache.put(key) as tmp_dir:
+>>>         ...  # Save artifacts to tmp_dir
+>>> else:
+>>>     ...  # Load artifacts from entry
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from .core import mkdir, normalize_json
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache(object):
+    """A dir of cache entries, each is a dir named by its key."""
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: Optional[int] = None) -> None:
+        """Initialize a ``ResultCache`` instance.
+
+        Args:
+            cache_dir (Union[str, Path]): Where to store the entries.
+            max_bytes (int, optional): Evict the least-recently-used entries once the total size of the entries exceeds
+                this, checked now and after every ``put()``. Defaults to None, which means no eviction.
+        """
+        self.cache_dir = mkdir(cache_dir)
+        self.max_bytes = max_bytes
+        self.evict()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Digest of the parts that determine an entry.
+
+        Parts are serialized to JSON with sorted keys, hence ``dict`` order is irrelevant. Some non-JSON values are
+        normalized first: numpy arrays and scalars to lists and numbers, paths to strings, classes and functions to
+        their qualified names, and sklearn estimators to their class and ``get_params(deep=False)``.
+
+        Raises:
+            TypeError: a part is, or contains, a value that is neither JSON nor normalizable, e.g., ``object()``.
+        """
+        blob = json.dumps(parts, sort_keys=True, default=normalize_json)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the dir of an entry and mark it as recently used, or None on a miss."""
+        entry = self.cache_dir / key
+        if not entry.is_dir():
+            return None
+        os.utime(entry)
+        return entry
+
+    @contextmanager
+    def put(self, key: str) -> Iterator[Path]:
+        """Yield a temporary dir to write the artifacts of an entry to, then publish it as the entry.
+
+        The entry is not published when the ``with`` block raises. When another process has published the same entry
+        in the meantime, keep theirs.
+        """
+        tmp = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key}.", suffix=".tmp"))
+        try:
+            yield tmp
+            try:
+                os.rename(tmp, self.cache_dir / key)
+            except OSError:
+                if not (self.cache_dir / key).is_dir():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> List[str]:
+        """Delete the least-recently-used entries until the cache fits in ``max_bytes``, and return their keys."""
+        if self.max_bytes is None:
+            return []
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for entry, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted.append(entry.name)
+        if evicted:
+            logger.info("Evicted %d entries from %s, now %d bytes", len(evicted), self.cache_dir, total)
+        return evicted
+
+    def size(self) -> int:
+        """Total bytes of the entries."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> List[Tuple[Path, float, int]]:
+        """(dir, mtime, bytes) of each published entry."""
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in entry.rglob("*") if f.is_file())
+            entries.append((entry, entry.stat().st_mtime, size))
+        return entries
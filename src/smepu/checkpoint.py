@@ -0,0 +1,124 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Resumable trials, by checkpointing each completed trial to a local dir that SageMaker syncs to S3.
+
+With managed spot training, SageMaker syncs ``/opt/ml/checkpoints`` to S3, and restores it when the interrupted job
+restarts. A trial writes its artifacts to its own dir under the checkpoint dir, then commits a record of itself to
+``manifest.json``. The manifest is rewritten atomically, hence a trial is complete if and only if it is in the manifest,
+and an interruption costs at most the trial in progress.
+
+Sample usage:
+
+>>> import smepu
+>>> manifest = smepu.checkpoint.Manifest(smepu.checkpoint.default_checkpoint_dir(), config={"algo": "KMeans"})
+>>> for n in range(2, 10):
+>>>     key = f"n_clusters-{n}"
+>>>     if key in manifest:
+>>>         metrics = manifest[key]  # And restore artifacts from manifest.trial_dir(key)
+>>>         continue
+>>>     ...  # Train, then save artifacts to manifest.trial_dir(key)
+>>>     manifest.commit(key, metrics)
+"""
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+
+from .core import is_on_sagemaker, mkdir, normalize_json
+
+logger = logging.getLogger(__name__)
+
+# Local path that SageMaker syncs with checkpoint_s3_uri.
+SM_CHECKPOINT_DIR = "/opt/ml/checkpoints"
+
+
+def default_checkpoint_dir() -> Optional[Path]:
+    """Return ``/opt/ml/checkpoints`` when running on SageMaker, else None which means no checkpoint."""
+    return Path(SM_CHECKPOINT_DIR) if is_on_sagemaker() else None
+
+
+class Manifest(object):
+    """Records of completed trials, persisted to ``manifest.json`` in a checkpoint dir."""
+
+    FNAME = "manifest.json"
+
+    def __init__(self, checkpoint_dir: Union[str, Path], config: Optional[Mapping[str, Any]] = None) -> None:
+        """Initialize a ``Manifest`` instance, and load the completed trials of a previous run, if any.
+
+        Args:
+            checkpoint_dir (Union[str, Path]): Where to checkpoint.
+            config (Mapping[str, Any], optional): Configuration that all trials share (e.g., algorithm, data
+                fingerprint). Completed trials of a previous run with a different configuration are discarded. Non-JSON
+                values are normalized as per ``smepu.core.normalize_json()``. Defaults to None.
+
+        Raises:
+            TypeError: ``config`` contains a value that cannot be normalized to stable JSON.
+        """
+        self.checkpoint_dir = mkdir(checkpoint_dir)
+        self.path = self.checkpoint_dir / self.FNAME
+        # Normalize config to what a JSON round-trip gives, to compare with the persisted one.
+        self.config = json.loads(json.dumps(config, default=normalize_json))
+        self.trials: Dict[str, Any] = {}
+
+        if self.path.exists():
+            saved = json.loads(self.path.read_text())
+            if saved.get("config") == self.config:
+                self.trials = saved["trials"]
+                logger.info("Resume from %d completed trials in %s", len(self.trials), self.path)
+            else:
+                logger.warning("Discard completed trials in %s, because of a different config", self.path)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether trial ``key`` has completed."""
+        return key in self.trials
+
+    def __getitem__(self, key: str) -> Any:
+        """Return the record of completed trial ``key``."""
+        return self.trials[key]
+
+    def __len__(self) -> int:
+        """Return the number of completed trials."""
+        return len(self.trials)
+
+    def trial_dir(self, key: str) -> Path:
+        """Return the dir of a trial's artifacts, after creating it."""
+        return mkdir(self.checkpoint_dir / key)
+
+    def commit(self, key: str, record: Any) -> None:
+        """Mark a trial as complete. Call only after its artifacts have been written to its trial dir.
+
+        Args:
+            key (str): Trial key.
+            record (Any): JSON-serializable record of the trial, e.g., its metrics.
+        """
+        self.trials[key] = json.loads(json.dumps(record, default=str))
+        atomic_write_text(self.path, json.dumps({"config": self.config, "trials": self.trials}, indent=2))
+
+
+def atomic_write_text(path: Union[str, Path], text: str) -> None:
+    """Write a text file atomically, i.e., readers see either the old or the new content, even after a crash.
+
+    Write to a temporary file in the same dir, flush it to disk, then rename it over the target. On POSIX, the dir is
+    flushed too, to persist the rename itself.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    if os.name == "posix":
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -5,8 +5,8 @@
 import logging
 import os
 import sys
-from pathlib import Path
-from typing import Union
+from pathlib import Path, PurePath
+from typing import Any, Optional, Union
 
 
 def is_on_sagemaker() -> bool:
@@ -21,7 +21,7 @@ def mkdir(path: Path, parents=True, exist_ok=True, **kwargs) -> Path:
     return path
 
 
-def setup_opinionated_logger(name: str, level: int = logging.INFO):
+def setup_opinionated_logger(name: str, level: int = logging.INFO, sample_resources: Optional[float] = None):
     """Configure a very opinionated logger that works on and outside SageMaker.
 
     On SageMaker (particularly training), root logger may have no handler despite basicConfig(...). Hence, force add
@@ -32,6 +32,9 @@ def setup_opinionated_logger(name: str, level: int = logging.INFO):
 
     When run outside SageMaker (i.e., from your shell on your workstation), typically the root logger will be configured
     to stderr, hence we don't add anymore handler to stdout (otherwise, double print log messages).
+
+    When ``sample_resources`` is a number of seconds, also start logging the resource utilization of this process at
+    that interval. See ``smepu.resources.start_sampler()``.
     """
     fmt = "%(asctime)s [%(levelname)s] %(name)s %(message)s"
     datefmt = "[%Y-%m-%d %H:%M:%S]"
@@ -64,6 +67,11 @@ def setup_opinionated_logger(name: str, level: int = logging.INFO):
     logger.setLevel(level)
     print_logging_setup(logger)
 
+    if sample_resources:
+        from .resources import start_sampler
+
+        start_sampler(sample_resources)
+
     return logger
 
 
@@ -75,6 +83,27 @@ def pathify(path: Union[str, Path, os.PathLike]) -> Path:
         return Path(path)
 
 
+def normalize_json(obj: Any) -> Any:
+    """Convert a non-JSON value to a stable JSON value, i.e., one that is equal across processes and runs.
+
+    Meant as the ``default`` of ``json.dumps()``, where ``str()`` may give the memory address of an object. Numpy arrays
+    and scalars become lists and numbers, paths become strings, classes and functions become their qualified names, and
+    sklearn estimators become their class and ``get_params(deep=False)``.
+
+    Raises:
+        TypeError: none of the above, e.g., ``object()``.
+    """
+    if isinstance(obj, PurePath):
+        return obj.as_posix()
+    if isinstance(obj, type) or (callable(obj) and hasattr(obj, "__qualname__")):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if hasattr(obj, "tolist") and hasattr(obj, "dtype"):
+        return obj.tolist()  # numpy arrays and scalars.
+    if hasattr(obj, "get_params"):
+        return {"__class__": normalize_json(type(obj)), "params": obj.get_params(deep=False)}
+    raise TypeError(f"Cannot convert a {type(obj).__name__} value to stable JSON: {obj!r}")
+
+
 def logger_has_stdeo(logger: logging.Logger) -> bool:
     """Check whether logger has stdout or stderr in its handlers."""
     for handler in logger.handlers:
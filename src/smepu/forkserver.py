@@ -0,0 +1,287 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Run an entrypoint script many times, each in a child forked from a warm parent that has pre-imported heavy modules.
+
+Intended for local dev and local HPO, where an entrypoint runs hundreds of times and each ``python entrypoint.py``
+re-imports pandas, sklearn, torch, etc. Requires ``os.fork()``, hence POSIX only. Exit handlers that the script
+registers with ``atexit`` run at the end of each child on CPython only, see ``_run_exit_handlers()``.
+
+Sample usage:
+
+>>> from smepu.forkserver import ForkServer, Run
+>>> server = ForkServer(preload=["pandas", "sklearn.cluster"])
+>>> runs = [Run(["--train", "refdata", "--n_clusters", str(i)], {"SM_MODEL_DIR": f"/tmp/m-{i}"}) for i in range(2, 9)]
+>>> results = server.run_many("train.py", runs, max_workers=4)
+>>> [r.exit_code for r in results]
+
+or from the command line, where each line of ``runs.jsonl`` is ``{"args": [...], "env": {...}}``:
+
+    python -m smepu.forkserver --preload pandas sklearn.cluster --runs runs.jsonl --max-workers 4 train.py
+"""
+import argparse
+import atexit
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import traceback
+from typing import IO, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import threads
+from .argparse import run_script
+
+logger = logging.getLogger(__name__)
+
+
+class Run(NamedTuple):
+    """Specification of one run of an entrypoint script."""
+
+    args: List[str]
+    env: Dict[str, str] = {}
+
+
+class RunResult(NamedTuple):
+    """Outcome of one run."""
+
+    exit_code: int  # Negative means killed by that signal number.
+    output: str  # Combined stdout and stderr.
+    elapsed: float  # Seconds, from fork to exit.
+
+
+class ForkServer(object):
+    """A warm parent process that forks a child for each run of an entrypoint script."""
+
+    def __init__(self, preload: Iterable[str] = (), convert_args: bool = False) -> None:
+        """Initialize a ``ForkServer`` instance, and import the ``preload`` modules into this process.
+
+        Args:
+            preload (Iterable[str], optional): Modules to import once, and share with every child. Defaults to ().
+            convert_args (bool, optional): Convert the args of each run with ``smepu.argparse.to_sys_argv()``, to wrap
+                a third-party script that follows argparse conventions (e.g., ``--flag`` instead of ``--flag True``).
+                Defaults to False, which means each child's ``sys.argv[1:]`` is its args verbatim, as SageMaker passes
+                hyperparameters.
+
+        Raises:
+            OSError: this platform does not support ``os.fork()``.
+        """
+        if not hasattr(os, "fork"):
+            raise OSError("ForkServer requires os.fork()")
+
+        self.preload = list(preload)
+        self.convert_args = convert_args
+        for module in self.preload:
+            start = time.perf_counter()
+            importlib.import_module(module)
+            logger.info("Preloaded %s in %.3fs", module, time.perf_counter() - start)
+
+    def run(self, script: str, run: Run) -> RunResult:
+        """Run ``script`` once, in a forked child. See ``smepu.run_script()`` for what ``script`` can be."""
+        return self.run_many(script, [run])[0]
+
+    def run_many(
+        self,
+        script: str,
+        runs: Iterable[Run],
+        max_workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        pin_workers: bool = False,
+    ) -> List[RunResult]:
+        """Run ``script`` once per run, with up to ``max_workers`` children at any time.
+
+        Args:
+            script (str): Path to a .py file, or a module name.
+            runs (Iterable[Run]): cli args and additional environment variables (e.g., ``SM_*``) of each run.
+            max_workers (int, optional): Maximum number of concurrent children. Defaults to 1.
+            threads_per_worker (int, optional): BLAS / OpenMP threads of each child, see ``smepu.threads``. Defaults
+                to None, which means to share the available cpus among the children when ``max_workers > 1``, and to
+                leave the thread pools as-is otherwise.
+            pin_workers (bool, optional): Pin each concurrent child to its own cpu set within a NUMA node, see
+                ``smepu.threads.partition_cpus()``. Unless set, ``threads_per_worker`` is the size of the cpu set,
+                capped by each child's share of the cgroup cpu quota. Defaults to False.
+
+        Returns:
+            List[RunResult]: results, in the same order as ``runs``.
+        """
+        max_workers = max(max_workers, 1)
+        cpu_sets: List[Optional[List[int]]] = [None] * max_workers
+        if pin_workers:
+            cpu_sets = list(threads.partition_cpus(max_workers))
+            logger.info("Pin workers to cpus %s", cpu_sets)
+        if threads_per_worker is None and (max_workers > 1 or pin_workers):
+            # A cpu set comes from the cpu affinity, which may exceed the cgroup cpu quota.
+            threads_per_worker = threads.per_worker(max_workers)
+            if cpu_sets[0]:
+                threads_per_worker = min(len(cpu_sets[0]), threads_per_worker)
+
+        results: Dict[int, RunResult] = {}
+        active: Dict[int, _Child] = {}
+        free_slots = list(range(max_workers))
+
+        for i, run in enumerate(runs):
+            while not free_slots:
+                free_slots.append(self._reap(active, results))
+            slot = free_slots.pop(0)
+            output = tempfile.TemporaryFile()
+            start = time.perf_counter()
+            pid = self._fork(script, run, output, threads_per_worker, cpu_sets[slot])
+            active[pid] = _Child(i, slot, output, start)
+
+        while active:
+            self._reap(active, results)
+        return [results[i] for i in range(len(results))]
+
+    def _fork(
+        self,
+        script: str,
+        run: Run,
+        output: IO[bytes],
+        n_threads: Optional[int] = None,
+        cpus: Optional[List[int]] = None,
+    ) -> int:
+        """Fork a child that runs the script once, and return the child's pid."""
+        # Prevent the child from re-flushing what the parent has buffered.
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # Child: never return to the caller. Exit handlers registered by the parent belong to the parent, whereas those
+        # registered by the script (e.g., smepu.profiling reports) must run as if the script were its own interpreter.
+        exit_code = 1
+        try:
+            _clear_exit_handlers()
+            os.dup2(output.fileno(), 1)
+            os.dup2(output.fileno(), 2)
+            # Whatever the parent has done to sys.stdout and sys.stderr (e.g., pytest capture), the child writes to fds.
+            sys.stdout = open(1, "w", buffering=1, closefd=False)
+            sys.stderr = open(2, "w", buffering=1, closefd=False)
+            if cpus is not None:
+                threads.pin(cpus)
+            if n_threads is not None:
+                threads.configure(n_threads, override=True)
+            os.environ.update(run.env)
+            run_script(script, run.args, convert_args=self.convert_args)
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = _exit_code(e)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                _run_exit_handlers()
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+    @staticmethod
+    def _reap(active: Dict[int, "_Child"], results: Dict[int, RunResult]) -> int:
+        """Wait for any child to exit, collect its result, then return its worker slot.
+
+        Waits only on the children forked by this server, hence never reaps (and loses the exit status of) children
+        that the caller started otherwise, e.g., with ``subprocess.Popen``.
+        """
+        pid, status = _wait_any(list(active))
+        child = active.pop(pid)
+        elapsed = time.perf_counter() - child.start
+        exit_code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+        child.output.seek(0)
+        results[child.index] = RunResult(exit_code, child.output.read().decode(errors="replace"), elapsed)
+        child.output.close()
+        return child.slot
+
+
+# Seconds between polls of the children, when more than one is running.
+def _exit_code(e: SystemExit) -> int:
+    """Return the exit code of ``sys.exit(code)``, and print a non-int code to stderr, the way the interpreter does."""
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _clear_exit_handlers() -> None:
+    """Unregister the exit handlers that a child has inherited from its parent.
+
+    ``atexit`` has no public API to do so: ``atexit._clear()`` is undocumented, and CPython-only. Elsewhere, a child
+    does not run any exit handler (see ``_run_exit_handlers()``), because it would also run those of its parent.
+    """
+    if hasattr(atexit, "_clear"):
+        atexit._clear()
+
+
+def _run_exit_handlers() -> None:
+    """Run the exit handlers registered by the script, before ``os._exit()`` which skips them.
+
+    ``atexit._run_exitfuncs()`` is undocumented, and CPython-only, as is ``atexit._clear()`` which it depends on.
+    """
+    if hasattr(atexit, "_clear") and hasattr(atexit, "_run_exitfuncs"):
+        atexit._run_exitfuncs()
+
+
+_POLL_INTERVAL = 0.01
+
+
+def _wait_any(pids: List[int]) -> Tuple[int, int]:
+    """Wait until any of ``pids`` exits, and return its (pid, status)."""
+    if len(pids) == 1:
+        return os.waitpid(pids[0], 0)
+    while True:
+        for pid in pids:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                return done, status
+        time.sleep(_POLL_INTERVAL)
+
+
+class _Child(NamedTuple):
+    """Bookkeeping of a running child."""
+
+    index: int  # Run index
+    slot: int  # Worker slot, i.e., which cpu set.
+    output: IO[bytes]
+    start: float
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line interface. Print the result of each run as a JSON line, and return the number of failed runs."""
+    parser = argparse.ArgumentParser(prog="python -m smepu.forkserver", description=__doc__.split("\n")[0])
+    parser.add_argument("script", help="Path to an entrypoint script, or a module name")
+    parser.add_argument("--preload", nargs="*", default=[], help="Modules to import once in the parent")
+    parser.add_argument("--runs", required=True, help='JSON lines file, one {"args": [...], "env": {...}} per run')
+    parser.add_argument("--max-workers", type=int, default=1, help="Maximum number of concurrent runs")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="BLAS / OpenMP threads of each run")
+    parser.add_argument("--pin-workers", action="store_true", help="Pin each worker to its own cpus")
+    parser.add_argument("--log-dir", default=None, help="Write output of run i to LOG_DIR/run-i.log, not to stdout")
+    parser.add_argument(
+        "--convert-args", action="store_true", help="Convert run args to argparse conventions, see to_sys_argv()"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.runs) as f:
+        runs = [Run(d["args"], d.get("env", {})) for d in (json.loads(line) for line in f if line.strip())]
+
+    server = ForkServer(args.preload, args.convert_args)
+    results = server.run_many(args.script, runs, args.max_workers, args.threads_per_worker, args.pin_workers)
+    for i, result in enumerate(results):
+        record = result._asdict()
+        if args.log_dir:
+            os.makedirs(args.log_dir, exist_ok=True)
+            with open(os.path.join(args.log_dir, f"run-{i}.log"), "w") as f:
+                f.write(record.pop("output"))
+        print(json.dumps({"run": i, **record}))
+    return sum(1 for r in results if r.exit_code != 0)
+
+
+if __name__ == "__main__":
+    # No logging config here: children inherit the root logger, and the entrypoint script configures its own.
+    sys.exit(main())
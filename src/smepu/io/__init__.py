@@ -0,0 +1,5 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Utilities for the data channels of a training job."""
+from .channel import FINGERPRINT_MODES, fingerprint  # noqa
@@ -0,0 +1,237 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Streaming parsers of SageMaker manifests, and a lazy dataset with random access to JSON-lines manifest records.
+
+A channel whose S3 data type is ``ManifestFile`` is described by a JSON array, whose first element is
+``{"prefix": "s3://bucket/prefix/"}``, and the remaining elements are keys relative to the prefix. An
+``AugmentedManifestFile`` is JSON lines, i.e., one JSON object of attributes per record, e.g.,
+``{"source-ref": "s3://bucket/images/0001.jpg", "label": 3}``.
+
+Both are parsed incrementally, hence never loaded whole into memory. ``ManifestDataset`` additionally indexes the
+offset of every line once (which costs 8 bytes per record), then reads any record, or any contiguous batch of records,
+with a single seek. Files that records refer to are not touched until the caller opens them, e.g., at
+``local_path(record["source-ref"], channel_dir, prefix)``.
+
+Sample usage:
+
+>>> from smepu.io.manifest import ManifestDataset
+>>> with ManifestDataset("/opt/ml/input/data/train/train.manifest") as ds:
+>>>     len(ds), ds[0], ds[-1]
+>>>     for batch in ds.batches(1024):
+>>>         ...  # List of 1024 dicts
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
+
+import numpy as np
+
+from .channel import fingerprint
+
+_BLOCK_SIZE = 2**22
+
+_NEWLINE = ord("\n")
+# Lookup table of whether a byte is anything but JSON whitespace.
+_IS_CONTENT = np.ones(256, dtype=bool)
+_IS_CONTENT[list(b" \t\r\n")] = False
+
+
+def iter_manifest(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a JSON-lines (i.e., augmented) manifest, one line at a time. Blank lines are skipped."""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_manifest_file(path: Union[str, Path], block_size: int = 2**20) -> Iterator[str]:
+    """Yield the S3 URIs of a ``ManifestFile`` manifest, i.e., prefix + key, parsing the JSON array incrementally.
+
+    Args:
+        path (Union[str, Path]): Manifest file.
+        block_size (int, optional): Characters to read at a time. Defaults to 1 MiB.
+
+    Yields:
+        Iterator[str]: S3 URIs.
+
+    Raises:
+        ValueError: not a JSON array whose first element is ``{"prefix": ...}``.
+    """
+    with open(path) as f:
+        elements = _iter_json_array(f, block_size, path)
+        head = next(elements, None)
+        if not isinstance(head, dict) or "prefix" not in head:
+            raise ValueError(f'{path} does not start with {{"prefix": ...}}')
+        for key in elements:
+            yield head["prefix"] + key
+
+
+def _iter_json_array(f: TextIO, block_size: int, name: Any) -> Iterator[Any]:
+    """Yield the elements of a JSON array read from a text stream, ``block_size`` characters at a time."""
+    decoder = json.JSONDecoder()
+    buf = f.read(block_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError(f"{name} is not a JSON array")
+    pos, eof = 1, False
+    while True:
+        # Skip whitespace and separators between elements.
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if buf[pos : pos + 1] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+            # A number may be cut at the end of the buffer, e.g., 12|34.
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"{name} is truncated, or not a JSON array") from None
+            complete = False
+
+        if complete:
+            yield value
+            pos = end
+        else:
+            block = f.read(block_size)
+            eof = not block
+            buf, pos = buf[pos:] + block, 0
+
+
+def local_path(uri: str, root: Union[str, Path], prefix: Optional[str] = None) -> Path:
+    """Map an S3 URI in a manifest to its local copy under ``root``.
+
+    Args:
+        uri (str): S3 URI, e.g., ``s3://bucket/prefix/images/0001.jpg``.
+        root (Union[str, Path]): Local dir of the downloaded objects, e.g., the channel dir.
+        prefix (str, optional): S3 prefix that ``root`` corresponds to, e.g., ``s3://bucket/prefix/``. Defaults to
+            None, which means the bucket, i.e., ``root/prefix/images/0001.jpg``.
+
+    Raises:
+        ValueError: ``uri`` is not under ``prefix``.
+    """
+    if prefix is None:
+        if not uri.startswith("s3://"):
+            raise ValueError(f"Not an S3 URI: {uri}")
+        prefix = uri[: uri.index("/", len("s3://")) + 1]
+    if not uri.startswith(prefix):
+        raise ValueError(f"{uri} is not under {prefix}")
+    return Path(root) / uri[len(prefix) :].lstrip("/")
+
+
+class ManifestDataset(object):
+    """Random access to the records of a JSON-lines (i.e., augmented) manifest, by record number."""
+
+    def __init__(self, path: Union[str, Path], index_path: Union[None, str, Path] = None) -> None:
+        """Initialize a ``ManifestDataset`` instance, and index the offset of each record.
+
+        Args:
+            path (Union[str, Path]): JSON-lines manifest.
+            index_path (Union[None, str, Path], optional): Where to persist the index, to reuse while the manifest is
+                unchanged (by size and mtime). Defaults to None, which means to re-index every time.
+        """
+        self.path = Path(path)
+        self.offsets = self._load_index(Path(index_path)) if index_path is not None else None
+        if self.offsets is None:
+            self.offsets = build_index(self.path)
+            if index_path is not None:
+                self._save_index(Path(index_path))
+        self._f = open(self.path, "rb")
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        """Read record ``i``, where negative ``i`` counts from the end."""
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(f"Record {i} out of range of {n} records")
+        i %= n
+        return self.read_batch(i, i + 1)[0]
+
+    def read_batch(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Read records ``[start, stop)`` with a single seek and read."""
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return []
+        self._f.seek(int(self.offsets[start]))
+        blob = self._f.read(int(self.offsets[stop] - self.offsets[start]))
+        return [json.loads(line) for line in blob.splitlines() if line.strip()]
+
+    def batches(self, batch_size: int, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield consecutive batches of records, from record ``start`` to ``stop`` (exclusive, defaults to the end)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop, batch_size):
+            yield self.read_batch(i, min(i + batch_size, stop))
+
+    def close(self) -> None:
+        """Close the manifest file."""
+        self._f.close()
+
+    def __enter__(self) -> "ManifestDataset":
+        """Return this dataset."""
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        """Close the manifest file."""
+        self.close()
+
+    def _load_index(self, index_path: Path) -> Optional[np.ndarray]:
+        """Load a persisted index, if it belongs to the current manifest."""
+        if not index_path.exists():
+            return None
+        with np.load(index_path) as npz:
+            if str(npz["fingerprint"]) != fingerprint(self.path, mode="stat"):
+                return None
+            return npz["offsets"]
+
+    def _save_index(self, index_path: Path) -> None:
+        """Persist the index, with the fingerprint of the current manifest."""
+        with open(index_path, "wb") as f:
+            np.savez(f, offsets=self.offsets, fingerprint=fingerprint(self.path, mode="stat"))
+
+
+def build_index(path: Union[str, Path], block_size: int = _BLOCK_SIZE) -> np.ndarray:
+    """Offsets of the non-blank lines of a file, plus the file size, i.e., record ``i`` is in ``[o[i], o[i + 1])``.
+
+    Scans the file in blocks, and finds newlines and non-whitespace bytes with numpy, hence does not parse any JSON.
+    Blank lines between two records fall in the range of the first one.
+
+    Args:
+        path (Union[str, Path]): JSON-lines file.
+        block_size (int, optional): Bytes to read at a time. Defaults to 4 MiB.
+
+    Returns:
+        np.ndarray: ``int64`` offsets, of length number of records + 1.
+    """
+    starts: List[np.ndarray] = []
+    size = 0
+    line_start, line_has_content = 0, False
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            arr = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(arr == _NEWLINE)
+            content = np.cumsum(_IS_CONTENT[arr], dtype=np.int64)
+
+            # Non-whitespace bytes per line that ends in this block. The first one may have begun in a previous block.
+            per_line = np.diff(content[newlines], prepend=0)
+            if len(per_line):
+                per_line[0] += line_has_content
+            line_starts = np.append(line_start, newlines[:-1] + size + 1)
+            starts.append(line_starts[per_line > 0])
+
+            # The last line continues into the next block.
+            if len(newlines):
+                line_start = size + int(newlines[-1]) + 1
+                line_has_content = bool(content[-1] > content[newlines[-1]])
+            else:
+                line_has_content = line_has_content or bool(content[-1])
+            size += len(block)
+
+    if line_has_content:
+        starts.append(np.array([line_start], dtype=np.int64))
+    return np.append(np.concatenate(starts + [np.zeros(0, dtype=np.int64)]), size).astype(np.int64)
@@ -0,0 +1,361 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Streaming reader of ``application/x-recordio-protobuf``, i.e., the data format of SageMaker built-in algorithms.
+
+Pure Python plus numpy (and scipy for sparse records), i.e., requires neither ``protobuf`` nor ``mxnet``. Two layers:
+
+- Framing (MXNet RecordIO): each record is a little-endian ``uint32`` magic number, a ``uint32`` whose upper 3 bits are
+  a continuation flag and lower 29 bits are the payload length, then the payload padded to a multiple of 4 bytes.
+- Payload: an ``aialgs.data.Record`` protobuf message, i.e., maps of ``features`` and ``label`` names to dense or
+  sparse (with ``keys``) tensors, usually a single tensor named ``"values"``.
+
+Streams are read strictly sequentially (no seek), hence work for both File mode (files under the channel dir) and Pipe
+mode (the ``<channel dir>_<epoch>`` FIFO).
+
+Sample usage:
+
+>>> from smepu.io import recordio
+>>> for batch in recordio.read_batches(recordio.open_channel("/opt/ml/input/data/train")):
+>>>     batch.features  # np.ndarray of (batch_size, dim), or scipy.sparse.csr_matrix for sparse records.
+>>>     batch.labels  # np.ndarray of (batch_size,), or None.
+"""
+import struct
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+MAGIC = 0xCED7230A
+_MAGIC_BYTES = struct.pack("<I", MAGIC)
+_HEADER = struct.Struct("<II")
+
+# Continuation flags of multi-part records, i.e., a payload that contains the magic number is split around it.
+_FULL, _START, _MIDDLE, _END = range(4)
+
+# Field numbers of aialgs.data.Value, which holds one of these tensors, and their element dtypes.
+_TENSOR_DTYPES = {2: np.dtype("<f4"), 3: np.dtype("<f8"), 7: np.dtype("<i4")}
+
+# Protobuf wire types
+_VARINT, _I64, _LEN, _I32 = 0, 1, 2, 5
+
+
+class Tensor(NamedTuple):
+    """A dense tensor (``keys is None``), or a sparse one whose ``values`` are at flat indices ``keys``."""
+
+    values: np.ndarray
+    keys: Optional[np.ndarray] = None
+    shape: Optional[Tuple[int, ...]] = None
+
+
+class Record(NamedTuple):
+    """A decoded ``aialgs.data.Record``. Non-tensor (i.e., bytes) values are omitted."""
+
+    features: Dict[str, Tensor]
+    label: Dict[str, Tensor]
+    uid: Optional[str] = None
+
+
+class Batch(NamedTuple):
+    """Features and labels of consecutive records."""
+
+    features: Any  # np.ndarray of (n, dim) if dense, else scipy.sparse.csr_matrix.
+    labels: Optional[np.ndarray]  # np.ndarray of (n,), or None when the records have no label.
+
+
+def read_records(stream: IO[bytes]) -> Iterator[bytes]:
+    """Yield the payload of each record in a binary stream.
+
+    Args:
+        stream (IO[bytes]): Binary stream, e.g., a file or a Pipe mode FIFO opened with ``"rb"``.
+
+    Yields:
+        Iterator[bytes]: payloads.
+
+    Raises:
+        ValueError: corrupted stream.
+    """
+    parts: List[bytes] = []
+    while True:
+        header = _read_exact(stream, _HEADER.size)
+        if not header:
+            break
+        magic, lrecord = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Invalid RecordIO magic number: {magic:#x}")
+        cflag, length = lrecord >> 29, lrecord & ((1 << 29) - 1)
+        payload = _read_exact(stream, length)
+        if len(payload) < length:
+            raise ValueError("Truncated RecordIO record")
+        _read_exact(stream, -length % 4)
+
+        if cflag == _FULL:
+            yield payload
+        elif cflag == _START:
+            parts = [payload]
+        else:
+            parts.append(payload)
+            if cflag == _END:
+                yield _MAGIC_BYTES.join(parts)
+                parts = []
+
+
+def parse_record(buf: bytes) -> Record:
+    """Decode an ``aialgs.data.Record`` protobuf message.
+
+    Args:
+        buf (bytes): Serialized message, e.g., from ``read_records()``.
+
+    Returns:
+        Record: decoded record.
+    """
+    features: Dict[str, Tensor] = {}
+    label: Dict[str, Tensor] = {}
+    uid = None
+    for field, wire_type, value in _fields(buf):
+        if field in (1, 2) and wire_type == _LEN:
+            key, tensor = _parse_map_entry(value)
+            if tensor is not None:
+                (features if field == 1 else label)[key] = tensor
+        elif field == 3 and wire_type == _LEN:
+            uid = bytes(value).decode()
+    return Record(features, label, uid)
+
+
+def read_batches(
+    streams: Union[IO[bytes], Iterable[IO[bytes]]],
+    batch_size: int = 1024,
+    feature: str = "values",
+    label: Optional[str] = "values",
+) -> Iterator[Batch]:
+    """Yield the features and labels of consecutive records, batch by batch.
+
+    Dense features are decoded straight into a preallocated ``(batch_size, dim)`` array, and sparse features into
+    preallocated CSR buffers that grow geometrically. A batch is dense when its first record is.
+
+    Args:
+        streams (Union[IO[bytes], Iterable[IO[bytes]]]): A binary stream, or several (e.g., ``open_channel()``).
+        batch_size (int, optional): Records per batch. The last batch may be smaller. Defaults to 1024.
+        feature (str, optional): Name of the features tensor. Defaults to "values".
+        label (str, optional): Name of the label tensor, whose first element is the label. Defaults to "values".
+
+    Yields:
+        Iterator[Batch]: batches.
+
+    Raises:
+        ValueError: a record lacks the features tensor, or dense records of different dimensions.
+    """
+    if hasattr(streams, "read"):
+        streams = [streams]  # type: ignore
+    records = (parse_record(buf) for stream in streams for buf in read_records(stream))  # type: ignore
+
+    builder: Optional[_BatchBuilder] = None
+    for record in records:
+        if feature not in record.features:
+            raise ValueError(f"Record has no feature {feature!r}; has {list(record.features)}")
+        tensor = record.features[feature]
+        if builder is None:
+            builder = _BatchBuilder(batch_size, tensor)
+        builder.add(tensor, record.label.get(label) if label is not None else None)
+        if builder.n == batch_size:
+            yield builder.build()
+            builder = None
+    if builder is not None and builder.n > 0:
+        yield builder.build()
+
+
+def open_channel(path: Union[str, Path], epoch: int = 0) -> Iterator[IO[bytes]]:
+    """Open, one at a time, the Pipe mode FIFO of an epoch, or else the files of a File mode channel dir (sorted).
+
+    Args:
+        path (Union[str, Path]): Channel dir, e.g., ``/opt/ml/input/data/train``.
+        epoch (int, optional): In Pipe mode, read FIFO ``<path>_<epoch>``. Defaults to 0.
+
+    Yields:
+        Iterator[IO[bytes]]: binary streams, each closed once the next one is requested.
+
+    Raises:
+        FileNotFoundError: neither the channel dir nor the FIFO exists.
+    """
+    path = Path(path)
+    fifo = Path(f"{path}_{epoch}")
+    if fifo.is_fifo():
+        fpaths = [fifo]
+    elif path.is_dir():
+        fpaths = sorted(f for f in path.glob("**/*") if f.is_file() and not f.name.startswith("."))
+    elif path.is_file():
+        fpaths = [path]
+    else:
+        raise FileNotFoundError(path)
+
+    for fpath in fpaths:
+        with open(fpath, "rb") as f:
+            yield f
+
+
+def is_recordio(path: Union[str, Path]) -> bool:
+    """Whether a regular file starts with the RecordIO magic number."""
+    with open(path, "rb") as f:
+        return f.read(4) == _MAGIC_BYTES
+
+
+class _BatchBuilder(object):
+    """Preallocated buffers of a batch."""
+
+    def __init__(self, batch_size: int, first: Tensor) -> None:
+        self.n = 0
+        self.sparse = first.keys is not None
+        self.dtype = first.values.dtype
+        self.labels = np.empty(batch_size, dtype=np.float64)
+        self.has_labels = False
+        if self.sparse:
+            self.dim = int(np.prod(first.shape)) if first.shape else 0
+            capacity = max(len(first.values), 1) * batch_size
+            self.data = np.empty(capacity, dtype=self.dtype)
+            self.indices = np.empty(capacity, dtype=np.int64)
+            self.indptr = np.zeros(batch_size + 1, dtype=np.int64)
+        else:
+            self.dim = len(first.values)
+            self.dense = np.empty((batch_size, self.dim), dtype=self.dtype)
+
+    def add(self, tensor: Tensor, label: Optional[Tensor]) -> None:
+        i = self.n
+        if self.sparse:
+            keys = tensor.keys if tensor.keys is not None else np.flatnonzero(tensor.values)
+            values = tensor.values if tensor.keys is not None else tensor.values[keys]
+            start, end = self.indptr[i], self.indptr[i] + len(values)
+            if end > len(self.data):
+                capacity = max(2 * len(self.data), end)
+                self.data = np.resize(self.data, capacity)
+                self.indices = np.resize(self.indices, capacity)
+            self.data[start:end] = values
+            self.indices[start:end] = keys
+            self.indptr[i + 1] = end
+            if tensor.shape:
+                self.dim = max(self.dim, int(np.prod(tensor.shape)))
+            elif len(keys):
+                self.dim = max(self.dim, int(keys.max()) + 1)
+        else:
+            if tensor.keys is not None or len(tensor.values) != self.dim:
+                raise ValueError(f"Expect a dense record of {self.dim} values, got {tensor}")
+            self.dense[i] = tensor.values
+        if label is not None and len(label.values):
+            self.labels[i] = label.values[0]
+            self.has_labels = True
+        else:
+            self.labels[i] = np.nan
+        self.n += 1
+
+    def build(self) -> Batch:
+        n = self.n
+        labels = self.labels[:n] if self.has_labels else None
+        if not self.sparse:
+            return Batch(self.dense[:n], labels)
+
+        import scipy.sparse as sp
+
+        nnz = self.indptr[n]
+        X = sp.csr_matrix((self.data[:nnz], self.indices[:nnz], self.indptr[: n + 1]), shape=(n, self.dim))
+        return Batch(X, labels)
+
+
+def _read_exact(stream: IO[bytes], n: int) -> bytes:
+    """Read ``n`` bytes, or fewer only at EOF. Pipes may return short reads."""
+    chunks = []
+    while n > 0:
+        chunk = stream.read(n)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def _varint(buf: memoryview, pos: int) -> Tuple[int, int]:
+    """Decode a varint at ``pos``, and return (value, position after it)."""
+    result, shift = 0, 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: Union[bytes, memoryview]) -> Iterator[Tuple[int, int, Any]]:
+    """Yield (field number, wire type, value) of a protobuf message, where a length-delimited value is a memoryview."""
+    buf = memoryview(buf)
+    pos, end = 0, len(buf)
+    while pos < end:
+        # Fast path of single-byte varints, i.e., field numbers < 16, and lengths < 128.
+        tag = buf[pos]
+        pos += 1
+        if tag >= 0x80:
+            tag, pos = _varint(buf, pos - 1)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == _VARINT:
+            value, pos = _varint(buf, pos)
+        elif wire_type == _LEN:
+            length = buf[pos]
+            pos += 1
+            if length >= 0x80:
+                length, pos = _varint(buf, pos - 1)
+            value, pos = buf[pos : pos + length], pos + length
+        elif wire_type == _I64:
+            value, pos = buf[pos : pos + 8], pos + 8
+        elif wire_type == _I32:
+            value, pos = buf[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type: {wire_type}")
+        yield field, wire_type, value
+
+
+def _parse_map_entry(buf: memoryview) -> Tuple[str, Optional[Tensor]]:
+    """Decode a map<string, Value> entry, where Value is a oneof tensors (or bytes, which decode to None)."""
+    key, tensor = "", None
+    for field, _, value in _fields(buf):
+        if field == 1:
+            key = bytes(value).decode()
+        elif field == 2:
+            for tensor_field, _, tensor_buf in _fields(value):
+                if tensor_field in _TENSOR_DTYPES:
+                    tensor = _parse_tensor(tensor_buf, _TENSOR_DTYPES[tensor_field])
+    return key, tensor
+
+
+def _parse_tensor(buf: memoryview, dtype: np.dtype) -> Tensor:
+    """Decode a Float32Tensor, Float64Tensor, or Int32Tensor message, whose repeated fields are usually packed."""
+    values: List[Any] = []
+    keys: List[Any] = []
+    shape: List[Any] = []
+    for field, wire_type, value in _fields(buf):
+        if field == 1:
+            if wire_type != _LEN:
+                values.append(np.frombuffer(value, dtype=dtype) if wire_type != _VARINT else np.array([value], dtype))
+            elif dtype.kind == "f":
+                values.append(np.frombuffer(value, dtype=dtype))
+            else:
+                values.append(_packed_varints(value).astype(np.int64).astype(dtype))  # Two's complement int32
+        elif field in (2, 3):
+            array = _packed_varints(value) if wire_type == _LEN else np.array([value], dtype=np.uint64)
+            (keys if field == 2 else shape).append(array)
+
+    return Tensor(
+        values[0] if len(values) == 1 else np.concatenate(values) if values else np.empty(0, dtype=dtype),
+        np.concatenate(keys).astype(np.int64) if keys else None,
+        tuple(int(d) for d in np.concatenate(shape)) if shape else None,
+    )
+
+
+def _packed_varints(buf: memoryview) -> np.ndarray:
+    """Decode packed varints, vectorized."""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(b < 0x80)
+    if len(ends) == len(b):
+        return b.astype(np.uint64)
+
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    shifted = (b & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    return np.add.reduceat(shifted, starts)
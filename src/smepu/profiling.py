@@ -0,0 +1,341 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Per-stage timing of entrypoint scripts.
+
+Sample usage:
+
+>>> import smepu
+>>> smepu.profiling.enable()
+>>> with smepu.profiling.stage("load"):
+>>>     df = load_data(path)
+>>>
+>>> @smepu.profiling.stage("fit")
+>>> def fit(df):
+>>>     ...
+
+Stages can be nested, and each nested stage is aggregated under its parent, e.g., "sweep/fit". Each thread has its own
+stack of stages, hence a function submitted to a thread pool must be wrapped with ``propagate()`` to nest its stages
+under those of the submitter. At the end of the job, the summary is logged and written to ``profiling.json`` under the
+output data dir.
+
+When profiling is not enabled, a stage costs a flag check.
+
+For a deeper look, ``capture()`` runs a block or a function under ``cProfile`` or ``tracemalloc``. Entrypoints that use
+``smepu.argparse.to_kwargs()`` can also turn on a capture without code changes, using the reserved hyperparameter
+``--smepu.profile cpu|mem|stages``.
+"""
+import atexit
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .core import mkdir
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+_output_data_dir: Optional[Path] = None
+_atexit_registered = False
+_capture_atexit_registered = False
+_lock = threading.Lock()
+_local = threading.local()  # Each thread has its own stack of stages.
+_stats: Dict[str, List[Any]] = {}  # {'parent/child': [count, total_seconds]}
+
+
+def enable(output_data_dir: Union[None, str, Path] = None, at_exit: bool = True) -> None:
+    """Start recording stages.
+
+    Args:
+        output_data_dir (Union[None, str, Path], optional): Where to write the summary. Defaults to None which means
+            ``SM_OUTPUT_DATA_DIR`` or, when not running on SageMaker, "output".
+        at_exit (bool, optional): Log and write the summary when the Python interpreter exits. Defaults to True.
+    """
+    global _enabled, _output_data_dir, _atexit_registered
+    _enabled = True
+    if output_data_dir is not None:
+        _output_data_dir = Path(output_data_dir)
+    if at_exit and not _atexit_registered:
+        atexit.register(report)
+        _atexit_registered = True
+
+
+def disable() -> None:
+    """Stop recording stages. Stages recorded so far are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Check whether stages are being recorded."""
+    return _enabled
+
+
+def reset() -> None:
+    """Forget all recorded stages."""
+    with _lock:
+        _stats.clear()
+
+
+class stage(object):
+    """Record the elapsed time of a named stage. Use as a context manager or a decorator."""
+
+    __slots__ = ("name", "_path", "_start")
+
+    def __init__(self, name: str) -> None:
+        """Initialize a ``stage`` instance.
+
+        Args:
+            name (str): Stage name. Must not contain "/", which separates nested stages.
+        """
+        self.name = name
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "stage":
+        """Start the clock, unless profiling is disabled."""
+        if not _enabled:
+            self._start = None
+            return self
+
+        stack = _stack()
+        self._path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self._path)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop the clock, and aggregate the elapsed time to this stage."""
+        if self._start is None:
+            return
+        elapsed = time.perf_counter() - self._start
+        _stack().pop()
+        with _lock:
+            stat = _stats.setdefault(self._path, [0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+
+    def __call__(self, f: Callable) -> Callable:
+        """Decorate ``f`` to record each of its calls as this stage."""
+        name = self.name
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return f(*args, **kwargs)
+            with stage(name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+
+def propagate(f: Callable) -> Callable:
+    """Wrap ``f`` to run, e.g., on a worker thread, nested in the stages that are active in the calling thread now.
+
+    Nested stages that run concurrently add up to more than the wall time of their parent, hence the parent's ``self_s``
+    may be negative.
+    """
+    parent = list(_stack())
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        saved = stack[:]
+        stack[:] = parent
+        try:
+            return f(*args, **kwargs)
+        finally:
+            stack[:] = saved
+
+    return wrapper
+
+
+def summary() -> Dict[str, Dict[str, Any]]:
+    """Return the aggregated stages.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: {"parent/child": {"count": int, "total_s": float, "self_s": float}}, where
+            ``self_s`` excludes the time spent in nested stages.
+    """
+    with _lock:
+        stats = {k: (v[0], v[1]) for k, v in _stats.items()}
+
+    retval = {path: {"count": count, "total_s": total, "self_s": total} for path, (count, total) in stats.items()}
+    for path, (_, total) in stats.items():
+        if "/" in path:
+            parent = path.rsplit("/", 1)[0]
+            if parent in retval:
+                retval[parent]["self_s"] -= total
+    return dict(sorted(retval.items()))
+
+
+def report(output_data_dir: Union[None, str, Path] = None, fname: str = "profiling.json") -> Dict[str, Dict[str, Any]]:
+    """Log the summary of recorded stages, and write it as JSON to ``output_data_dir/fname``.
+
+    Args:
+        output_data_dir (Union[None, str, Path], optional): Output directory. Defaults to None which means the one
+            given to ``enable()``, then ``SM_OUTPUT_DATA_DIR``, then "output".
+        fname (str, optional): Output filename. Defaults to "profiling.json".
+
+    Returns:
+        Dict[str, Dict[str, Any]]: the summary.
+    """
+    stats = summary()
+    if not stats:
+        return stats
+
+    for path, stat in stats.items():
+        logger.info(
+            "stage %s: count=%d total=%.3fs self=%.3fs",
+            path,
+            stat["count"],
+            stat["total_s"],
+            stat["self_s"],
+        )
+
+    opath = _resolve_output_data_dir(output_data_dir) / fname
+    with opath.open("w") as f:
+        json.dump(stats, f, indent=2)
+    logger.info("Profiling summary written to %s", opath)
+    return stats
+
+
+################################################################################
+# Capture with cProfile or tracemalloc
+################################################################################
+PROFILE_MODES = ("cpu", "mem", "stages")
+_capture: Dict[str, Any] = {}  # {'mode': str, 'output_data_dir': ..., 'profiler': cProfile.Profile}
+
+
+def start_capture(mode: str, output_data_dir: Union[None, str, Path] = None, at_exit: bool = True) -> bool:
+    """Start profiling the rest of this process, until ``stop_capture()`` or the interpreter exits.
+
+    Modes:
+
+    - "cpu": ``cProfile`` of the calling thread, dumped to ``profile.prof``. Inspect it with ``pstats``, or tools such
+      as snakeviz.
+    - "mem": ``tracemalloc``, whose snapshot is dumped to ``tracemalloc.snapshot``. Load it with
+      ``tracemalloc.Snapshot.load()``.
+    - "stages": same as ``enable()``.
+
+    A no-op when a capture is already active.
+
+    Args:
+        mode (str): "cpu", "mem", or "stages".
+        output_data_dir (Union[None, str, Path], optional): Where to dump the capture. Defaults to None which means
+            ``SM_OUTPUT_DATA_DIR`` or, when not running on SageMaker, "output".
+        at_exit (bool, optional): Stop the capture when the Python interpreter exits. Defaults to True.
+
+    Returns:
+        bool: whether this call started a capture, i.e., False when a capture is already active.
+
+    Raises:
+        ValueError: unknown mode.
+    """
+    global _capture_atexit_registered
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode}, must be one of {PROFILE_MODES}")
+    if _capture:
+        logger.warning("Ignore profile mode %s, because profile mode %s is active", mode, _capture["mode"])
+        return False
+
+    _capture.update(mode=mode, output_data_dir=output_data_dir)
+    logger.info("Start profile mode %s", mode)
+    if mode == "cpu":
+        _capture["profiler"] = cProfile.Profile()
+        _capture["profiler"].enable()
+    elif mode == "mem":
+        tracemalloc.start()
+    else:
+        # The summary is reported by stop_capture().
+        enable(output_data_dir, at_exit=False)
+
+    if at_exit and not _capture_atexit_registered:
+        atexit.register(stop_capture)
+        _capture_atexit_registered = True
+    return True
+
+
+def stop_capture() -> Optional[Path]:
+    """Stop the active capture, and dump its output to the output data dir.
+
+    Returns:
+        Optional[Path]: the dumped file, or None when no capture is active.
+    """
+    if not _capture:
+        return None
+
+    mode, output_data_dir = _capture["mode"], _capture["output_data_dir"]
+    opath: Optional[Path] = None
+    if mode == "cpu":
+        profiler = _capture["profiler"]
+        profiler.disable()
+        opath = _resolve_output_data_dir(output_data_dir) / "profile.prof"
+        profiler.dump_stats(opath)
+
+        s = io.StringIO()
+        pstats.Stats(profiler, stream=s).sort_stats("cumulative").print_stats(20)
+        logger.info("Top-20 functions by cumulative time:\n%s", s.getvalue())
+    elif mode == "mem":
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        opath = _resolve_output_data_dir(output_data_dir) / "tracemalloc.snapshot"
+        snapshot.dump(str(opath))
+
+        logger.info("tracemalloc: current=%.1fMiB peak=%.1fMiB", current / 2**20, peak / 2**20)
+        for stat in snapshot.statistics("lineno")[:10]:
+            logger.info("tracemalloc: %s", stat)
+    else:
+        disable()
+        report(output_data_dir)
+
+    _capture.clear()
+    if opath:
+        logger.info("Profile mode %s written to %s", mode, opath)
+    return opath
+
+
+@contextmanager
+def capture(mode: str, output_data_dir: Union[None, str, Path] = None):
+    """Profile a block of code or, as a decorator, a function. The modes are those of ``start_capture``.
+
+    >>> @smepu.profiling.capture("cpu")
+    >>> def main(...):
+    >>>     ...
+    """
+    started = start_capture(mode, output_data_dir, at_exit=False)
+    try:
+        yield
+    finally:
+        # A capture that was already active, e.g., by ``--smepu.profile``, goes on.
+        if started:
+            stop_capture()
+
+
+def _resolve_output_data_dir(output_data_dir: Union[None, str, Path] = None) -> Path:
+    """Create the output data dir when necessary, and return it.
+
+    Defaults to the one given to ``enable()``, then ``SM_OUTPUT_DATA_DIR``, then "output".
+    """
+    if output_data_dir is None:
+        output_data_dir = _output_data_dir or os.environ.get("SM_OUTPUT_DATA_DIR", "output")
+    return mkdir(output_data_dir)
+
+
+def _stack() -> List[str]:
+    """Get the stack of active stages of the current thread."""
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
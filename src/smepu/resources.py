@@ -0,0 +1,352 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Resource utilization from inside the container.
+
+Readers of ``/proc/self/*`` and cgroup (v1 or v2) files return empty values when those files do not exist, e.g., on
+macOS, so that callers need not special-case running outside SageMaker.
+
+Sample usage:
+
+>>> import smepu
+>>> smepu.resources.start_sampler(interval=30)  # Log utilization every 30 seconds.
+>>> ...
+>>> smepu.resources.stop_sampler()  # Optional; also called when the Python interpreter exits.
+"""
+import atexit
+import csv
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .core import mkdir
+
+logger = logging.getLogger(__name__)
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# An absurdly large value (i.e., ~ 2^63 rounded to pages) means no limit on cgroup v1.
+_CGROUP_V1_UNLIMITED = 2**60
+
+
+def read_proc_stat() -> Dict[str, float]:
+    """Read cpu times (in seconds), number of threads, and RSS (in bytes) of this process from ``/proc/self/stat``."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the executable name, which is in parentheses and may contain spaces.
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return {}
+
+    # Field numbers from proc(5), minus the 2 leading fields (pid, comm) and 1 for 0-based index.
+    return {
+        "utime_s": int(fields[11]) / _CLK_TCK,
+        "stime_s": int(fields[12]) / _CLK_TCK,
+        "num_threads": int(fields[17]),
+        "rss_bytes": int(fields[21]) * _PAGE_SIZE,
+    }
+
+
+def read_proc_status() -> Dict[str, int]:
+    """Read memory stats (in bytes) of this process from ``/proc/self/status``."""
+    keys = {"VmRSS": "rss_bytes", "VmHWM": "peak_rss_bytes", "VmSwap": "swap_bytes"}
+    retval = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                k, _, v = line.partition(":")
+                if k in keys:
+                    retval[keys[k]] = int(v.split()[0]) * 1024  # Unit is kB
+    except OSError:
+        pass
+    return retval
+
+
+def read_proc_io() -> Dict[str, int]:
+    """Read I/O counters (in bytes) of this process from ``/proc/self/io``."""
+    retval = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                k, _, v = line.partition(":")
+                retval[k] = int(v)
+    except OSError:
+        pass
+    return retval
+
+
+def cgroup_memory() -> Tuple[Optional[int], Optional[int]]:
+    """Return the (usage, limit) in bytes of the cgroup memory controller.
+
+    Either value is None when it is not available, and limit is None also when the cgroup has no memory limit.
+    """
+    # cgroup v2
+    if (_CGROUP_ROOT / "memory.max").exists():
+        limit = _read_int(_CGROUP_ROOT / "memory.max")
+        usage = _read_int(_CGROUP_ROOT / "memory.current")
+        return usage, limit
+
+    # cgroup v1
+    limit = _read_int(_CGROUP_ROOT / "memory" / "memory.limit_in_bytes")
+    usage = _read_int(_CGROUP_ROOT / "memory" / "memory.usage_in_bytes")
+    if limit is not None and limit >= _CGROUP_V1_UNLIMITED:
+        limit = None
+    return usage, limit
+
+
+def memory_budget() -> Optional[int]:
+    """Return how many more bytes this process can allocate, before hitting the memory limit.
+
+    In a container with a cgroup memory limit, this is the limit minus the cgroup's working set, i.e., its usage minus
+    its reclaimable page cache. The result is also capped by ``MemAvailable`` of ``/proc/meminfo``, which is the only
+    source outside containers.
+
+    Returns:
+        Optional[int]: the budget in bytes, or None when unknown (e.g., on macOS).
+    """
+    available = read_meminfo().get("available_bytes")
+    usage, limit = cgroup_memory()
+    if limit is not None:
+        working_set = max((usage or 0) - _cgroup_inactive_file(), 0)
+        remaining = max(limit - working_set, 0)
+        available = remaining if available is None else min(available, remaining)
+    return available
+
+
+def chunk_size(bytes_per_item: float, fraction: float = 0.25, budget: Optional[int] = None) -> Optional[int]:
+    """Return how many items fit in a fraction of the memory budget.
+
+    Args:
+        bytes_per_item (float): Size of each item (e.g., a record) in bytes.
+        fraction (float, optional): Fraction of the budget for one chunk. Defaults to 0.25.
+        budget (int, optional): Memory budget in bytes. Defaults to None, which means ``memory_budget()``.
+
+    Returns:
+        Optional[int]: the number of items, at least 1, or None when the memory budget is unknown.
+    """
+    if budget is None:
+        budget = memory_budget()
+        if budget is None:
+            return None
+    return max(int(fraction * budget / max(bytes_per_item, 1.0)), 1)
+
+
+def read_meminfo() -> Dict[str, int]:
+    """Read system-wide memory stats (in bytes) from ``/proc/meminfo``."""
+    keys = {"MemTotal": "total_bytes", "MemAvailable": "available_bytes"}
+    retval = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                k, _, v = line.partition(":")
+                if k in keys:
+                    retval[keys[k]] = int(v.split()[0]) * 1024  # Unit is kB
+    except OSError:
+        pass
+    return retval
+
+
+def _cgroup_inactive_file() -> int:
+    """Return the reclaimable page cache (in bytes) of the cgroup, which counts toward its memory usage."""
+    # cgroup v2, then cgroup v1
+    for path, key in (
+        (_CGROUP_ROOT / "memory.stat", "inactive_file"),
+        (_CGROUP_ROOT / "memory" / "memory.stat", "total_inactive_file"),
+    ):
+        try:
+            with path.open() as f:
+                for line in f:
+                    k, _, v = line.partition(" ")
+                    if k == key:
+                        return int(v)
+        except (OSError, ValueError):
+            continue
+    return 0
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """Return the number of cpus allowed by the cgroup cpu controller (e.g., 1.5), or None when unlimited or unknown."""
+    # cgroup v2: "<quota> <period>", where quota may be "max".
+    try:
+        quota, period = (_CGROUP_ROOT / "cpu.max").read_text().split()[:2]
+    except (OSError, ValueError):
+        pass
+    else:
+        return None if quota == "max" else int(quota) / int(period)
+
+    # cgroup v1: quota is -1 when unlimited.
+    for controller in ("cpu", "cpu,cpuacct"):
+        quota_us = _read_int(_CGROUP_ROOT / controller / "cpu.cfs_quota_us")
+        period_us = _read_int(_CGROUP_ROOT / controller / "cpu.cfs_period_us")
+        if quota_us is not None and period_us:
+            return None if quota_us < 0 else quota_us / period_us
+    return None
+
+
+def _read_int(path: Path) -> Optional[int]:
+    """Read a file that contains a single integer. Return None when the file is unreadable, or contains "max"."""
+    try:
+        return int(path.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+################################################################################
+# Background sampler
+################################################################################
+class ResourceSampler(threading.Thread):
+    """A daemon thread that periodically samples resource utilization of this process."""
+
+    FIELDS = (
+        "timestamp",
+        "cpu_pct",
+        "rss_bytes",
+        "peak_rss_bytes",
+        "cgroup_usage_bytes",
+        "cgroup_limit_bytes",
+        "read_bytes_per_s",
+        "write_bytes_per_s",
+        "num_threads",
+    )
+
+    def __init__(self, interval: float = 60.0, log: bool = True) -> None:
+        """Initialize a ``ResourceSampler`` instance.
+
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to 60.0.
+            log (bool, optional): Log each sample. Defaults to True.
+        """
+        super().__init__(name="smepu-resource-sampler", daemon=True)
+        self.interval = interval
+        self.log = log
+        self.samples: List[Dict[str, Any]] = []
+        self._stop_event = threading.Event()
+        self._last: Optional[Tuple[float, float, int, int]] = None  # (wallclock, cpu_s, read_bytes, write_bytes)
+
+    def run(self) -> None:
+        """Sample until stopped."""
+        self.sample()
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        """Stop sampling, after taking one last sample."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+            self.sample()
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample, and log it when requested."""
+        now = time.time()
+        stat, status, io = read_proc_stat(), read_proc_status(), read_proc_io()
+        cgroup_usage, cgroup_limit = cgroup_memory()
+
+        cpu_s = stat.get("utime_s", 0.0) + stat.get("stime_s", 0.0)
+        read_bytes, write_bytes = io.get("read_bytes", 0), io.get("write_bytes", 0)
+        cpu_pct = read_rate = write_rate = None
+        if self._last is not None:
+            elapsed = max(now - self._last[0], 1e-6)
+            cpu_pct = 100.0 * (cpu_s - self._last[1]) / elapsed
+            read_rate = (read_bytes - self._last[2]) / elapsed
+            write_rate = (write_bytes - self._last[3]) / elapsed
+        self._last = (now, cpu_s, read_bytes, write_bytes)
+
+        sample = {
+            "timestamp": now,
+            "cpu_pct": cpu_pct,
+            "rss_bytes": status.get("rss_bytes", stat.get("rss_bytes")),
+            "peak_rss_bytes": status.get("peak_rss_bytes"),
+            "cgroup_usage_bytes": cgroup_usage,
+            "cgroup_limit_bytes": cgroup_limit,
+            "read_bytes_per_s": read_rate,
+            "write_bytes_per_s": write_rate,
+            "num_threads": stat.get("num_threads"),
+        }
+        self.samples.append(sample)
+        if self.log:
+            logger.info("%s", format_sample(sample))
+        return sample
+
+    def write(self, path: Union[str, Path]) -> Path:
+        """Write all samples as a csv file."""
+        path = Path(path)
+        with path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(self.samples)
+        return path
+
+
+def format_sample(sample: Dict[str, Any]) -> str:
+    """Format a sample as a compact, single-line string."""
+
+    def mib(n: Optional[float]) -> str:
+        return "-" if n is None else f"{n / 2**20:.1f}MiB"
+
+    cpu = "-" if sample["cpu_pct"] is None else f"{sample['cpu_pct']:.0f}%"
+    limit = "" if sample["cgroup_limit_bytes"] is None else f"/{mib(sample['cgroup_limit_bytes'])}"
+    return (
+        f"resources: cpu={cpu} rss={mib(sample['rss_bytes'])} peak_rss={mib(sample['peak_rss_bytes'])} "
+        f"cgroup_mem={mib(sample['cgroup_usage_bytes'])}{limit} "
+        f"io_read={mib(sample['read_bytes_per_s'])}/s io_write={mib(sample['write_bytes_per_s'])}/s "
+        f"threads={sample['num_threads']}"
+    )
+
+
+_sampler: Optional[ResourceSampler] = None
+_sampler_output_data_dir: Union[None, str, Path] = None
+_atexit_registered = False
+
+
+def start_sampler(
+    interval: float = 60.0, output_data_dir: Union[None, str, Path] = None, log: bool = True
+) -> ResourceSampler:
+    """Start the background resource sampler, unless it has already been started.
+
+    When the Python interpreter exits, the sampler is stopped, and its samples are written to ``resources.csv`` in the
+    output data dir.
+
+    Args:
+        interval (float, optional): Seconds between samples. Defaults to 60.0.
+        output_data_dir (Union[None, str, Path], optional): Where to write the samples. Defaults to None which means
+            ``SM_OUTPUT_DATA_DIR`` or, when not running on SageMaker, "output".
+        log (bool, optional): Log each sample. Defaults to True.
+
+    Returns:
+        ResourceSampler: the sampler thread.
+    """
+    global _sampler, _sampler_output_data_dir, _atexit_registered
+    if _sampler is not None:
+        return _sampler
+
+    _sampler = ResourceSampler(interval, log)
+    _sampler_output_data_dir = output_data_dir
+    _sampler.start()
+    if not _atexit_registered:
+        atexit.register(stop_sampler)
+        _atexit_registered = True
+    return _sampler
+
+
+def stop_sampler() -> Optional[Path]:
+    """Stop the background resource sampler, and write its samples to ``resources.csv`` in the output data dir.
+
+    Returns:
+        Optional[Path]: the csv file, or None when the sampler was not started.
+    """
+    global _sampler
+    if _sampler is None:
+        return None
+
+    sampler, _sampler = _sampler, None
+    sampler.stop()
+    output_data_dir = _sampler_output_data_dir or os.environ.get("SM_OUTPUT_DATA_DIR", "output")
+    opath = sampler.write(mkdir(output_data_dir) / "resources.csv")
+    logger.info("Resource samples written to %s", opath)
+    return opath
@@ -0,0 +1,180 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Size the thread pools of BLAS / OpenMP libraries (numpy, scipy, sklearn, etc.) to the cpus of the container.
+
+These libraries default to one thread per cpu of the host, disregarding the cgroup cpu quota and the cpu affinity of
+the process. Hence, they oversubscribe a container with a cpu quota, and more so when several processes run
+concurrently (e.g., sweep trials).
+
+On SageMaker, ``import smepu`` calls ``configure()``, which sets the ``*_NUM_THREADS`` environment variables unless
+they have already been set. Environment variables take effect only when set before a library loads, so import smepu
+first. To resize thread pools of already-loaded libraries, ``configure()`` uses ``threadpoolctl`` when installed.
+
+Sample usage:
+
+>>> import smepu
+>>> smepu.threads.available_cpus()
+4
+>>> smepu.threads.configure(smepu.threads.per_worker(n_workers=2), override=True)
+2
+"""
+import itertools
+import logging
+import math
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from .resources import cgroup_cpu_quota
+
+logger = logging.getLogger(__name__)
+
+_NODE_ROOT = Path("/sys/devices/system/node")
+
+# Environment variables read by the thread pools of OpenMP, MKL, OpenBLAS, Accelerate, and numexpr.
+ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def available_cpus() -> int:
+    """Return the number of cpus this process can use, i.e., the min. of its cpu affinity and the cgroup cpu quota.
+
+    A fractional quota (e.g., 1.5 cpus) rounds up, and the result is at least 1.
+    """
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on macOS and Windows.
+        n = os.cpu_count() or 1
+
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        n = min(n, math.ceil(quota))
+    return max(n, 1)
+
+
+def per_worker(n_workers: int, n_cpus: Optional[int] = None) -> int:
+    """Return the number of threads of each of ``n_workers`` processes, such that workers x threads <= cpus.
+
+    Args:
+        n_workers (int): Number of concurrent worker processes.
+        n_cpus (int, optional): Number of cpus to share. Defaults to None, which means ``available_cpus()``.
+
+    Returns:
+        int: threads per worker, at least 1.
+    """
+    if n_cpus is None:
+        n_cpus = available_cpus()
+    return max(n_cpus // max(n_workers, 1), 1)
+
+
+def configure(n_threads: Optional[int] = None, override: bool = False) -> int:
+    """Set the thread pool size of BLAS / OpenMP libraries.
+
+    Args:
+        n_threads (int, optional): Number of threads. Defaults to None, which means ``available_cpus()``.
+        override (bool, optional): Whether to override the environment variables that are already set. When True, also
+            resize the thread pools of already-loaded libraries with ``threadpoolctl``, if it is installed. Defaults to
+            False.
+
+    Returns:
+        int: the number of threads.
+    """
+    if n_threads is None:
+        n_threads = available_cpus()
+
+    for k in ENV_VARS:
+        if override or k not in os.environ:
+            os.environ[k] = str(n_threads)
+
+    if override:
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            pass
+        else:
+            threadpool_limits(limits=n_threads)
+
+    logger.debug("Thread pools configured to %d threads", n_threads)
+    return n_threads
+
+
+################################################################################
+# Worker placement
+################################################################################
+def numa_nodes() -> List[List[int]]:
+    """Return the cpus of each NUMA node, restricted to the cpu affinity of this process.
+
+    When the topology is unknown (e.g., not Linux), return a single node of all the cpus available to this process.
+    """
+    try:
+        allowed = os.sched_getaffinity(0)
+    except AttributeError:
+        allowed = set(range(os.cpu_count() or 1))
+
+    nodes = []
+    for path in sorted(_NODE_ROOT.glob("node[0-9]*"), key=lambda p: int(p.name[4:])):
+        try:
+            cpus = [cpu for cpu in parse_cpulist((path / "cpulist").read_text()) if cpu in allowed]
+        except OSError:
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+
+def parse_cpulist(s: str) -> List[int]:
+    """Parse a Linux cpu list, e.g., ``"0-3,8-11"`` to ``[0, 1, 2, 3, 8, 9, 10, 11]``."""
+    cpus = []
+    for part in s.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def partition_cpus(n_workers: int, nodes: Optional[List[List[int]]] = None) -> List[List[int]]:
+    """Split cpus into one disjoint cpu set per worker, where each cpu set does not cross NUMA nodes.
+
+    Each worker gets the same number of cpus, as many as possible. Consecutive workers go to different nodes, to
+    spread the load when there are fewer workers than cpu sets. When there are more workers than cpus, cpu sets are
+    reused (i.e., no longer disjoint).
+
+    Args:
+        n_workers (int): Number of workers.
+        nodes (List[List[int]], optional): cpus of each NUMA node. Defaults to None, which means ``numa_nodes()``.
+
+    Returns:
+        List[List[int]]: the cpu set of each worker.
+    """
+    if nodes is None:
+        nodes = numa_nodes()
+    n_workers = max(n_workers, 1)
+
+    # Shrink the cpu set until there is one per worker, when nodes are not divisible by the cpu set size.
+    size = max(sum(len(node) for node in nodes) // n_workers, 1)
+    while size > 1 and sum(len(node) // size for node in nodes) < n_workers:
+        size -= 1
+
+    per_node = [[node[i : i + size] for i in range(0, len(node) - size + 1, size)] for node in nodes]
+    interleaved = [chunk for chunks in itertools.zip_longest(*per_node) for chunk in chunks if chunk is not None]
+    return [interleaved[i % len(interleaved)] for i in range(n_workers)]
+
+
+def pin(cpus: List[int]) -> None:
+    """Pin this process to the cpus, when supported by the platform.
+
+    On Linux, memory is allocated on the NUMA node of the cpu that first touches it. Hence, pinning a process before it
+    loads its data also places the data on the local node of its cpus.
+    """
+    try:
+        os.sched_setaffinity(0, cpus)
+    except AttributeError:
+        logger.debug("sched_setaffinity() not supported, so do nothing.")
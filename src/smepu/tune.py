@@ -0,0 +1,342 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Local, parallel hyperparameter search over an entrypoint script.
+
+The search space maps cli args to their candidate values, in the same format that ``smepu.argparse.to_kwargs()``
+understands, including dotted ``__class__`` args. Each value of the search space is either:
+
+- a list of choices, e.g., ``{"--n_clusters": [2, 4, 8]}``,
+- a distribution (random search only), i.e., ``{"uniform": [lo, hi]}``, ``{"loguniform": [lo, hi]}``, or
+  ``{"randint": [lo, hi]}`` where ``hi`` is inclusive,
+- or a fixed value.
+
+Every trial runs the script in a child forked by ``smepu.forkserver.ForkServer``, with ``SM_MODEL_DIR`` and
+``SM_OUTPUT_DATA_DIR`` pointing to the trial's own dirs. Metrics of a trial are collected from its output, with
+SageMaker-style metric definitions (i.e., regexes), and from a single-row ``metrics.csv`` in its output data dir.
+
+Sample usage:
+
+>>> import smepu.tune
+>>> space = {
+>>>     "--n_clusters": [2, 3, 4, 5],
+>>>     "--init": ["k-means++", "random"],
+>>>     "--tol": {"loguniform": [1e-5, 1e-2]},
+>>> }
+>>> trials = smepu.tune.tune(
+>>>     "train.py", space, ["--train", "refdata"], strategy="random", n_trials=20, max_workers=4, preload=["sklearn"]
+>>> )
+>>> smepu.tune.best(trials, "silhouette_score")
+
+or from the command line, where the search space is a JSON file, and cli args not recognized by ``smepu.tune`` are
+passed as-is to every trial:
+
+    python -m smepu.tune train.py --space space.json --strategy grid --max-workers 4 --train refdata
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+from . import threads
+from .core import mkdir
+from .forkserver import ForkServer, Run
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("grid", "random")
+DISTRIBUTIONS = ("uniform", "loguniform", "randint")
+
+SearchSpace = Mapping[str, Any]
+
+
+class Trial(NamedTuple):
+    """Outcome of one trial."""
+
+    index: int
+    params: Dict[str, str]  # The cli args sampled from the search space.
+    args: List[str]  # Complete cli args of this trial.
+    exit_code: int
+    elapsed: float
+    model_dir: Path
+    output_data_dir: Path
+    metrics: Dict[str, float]
+
+
+def tune(
+    script: str,
+    space: SearchSpace,
+    fixed_args: Sequence[str] = (),
+    strategy: str = "grid",
+    n_trials: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    output_dir: Union[None, str, Path] = None,
+    metric_definitions: Sequence[Mapping[str, str]] = (),
+    preload: Iterable[str] = (),
+    seed: Optional[int] = None,
+    pin_workers: bool = False,
+) -> List[Trial]:
+    """Run trials of an entrypoint script, then write a summary of all trials to ``tune.csv`` in the output dir.
+
+    Args:
+        script (str): Path to a .py file, or a module name. See ``smepu.run_script()``.
+        space (SearchSpace): Search space, i.e., ``{"--name": candidate values}``.
+        fixed_args (Sequence[str], optional): cli args common to all trials. Defaults to ().
+        strategy (str, optional): "grid" or "random". Defaults to "grid".
+        n_trials (int, optional): Number of trials. Defaults to None, which means the whole grid, or 10 trials of
+            random search.
+        max_workers (int, optional): Maximum number of concurrent trials. Defaults to None, which means
+            ``smepu.threads.available_cpus()``. BLAS / OpenMP thread pools of the trials share the available cpus.
+        output_dir (Union[None, str, Path], optional): Where to create the dirs of each trial, i.e.,
+            ``trial-NNNN/{model,output}``. Defaults to None, which means ``tune`` under ``SM_OUTPUT_DATA_DIR`` or, when
+            not running on SageMaker, "output".
+        metric_definitions (Sequence[Mapping[str, str]], optional): ``[{"Name": ..., "Regex": ...}]`` where the first
+            group of the last match of ``Regex`` in the trial's output is the metric value. Defaults to ().
+        preload (Iterable[str], optional): Modules to import once, and share with all trials. Defaults to ().
+        seed (int, optional): Random seed of the random search. Defaults to None.
+        pin_workers (bool, optional): Pin concurrent trials to disjoint cpu sets, each within a NUMA node. Defaults to
+            False.
+
+    Returns:
+        List[Trial]: the trials, in order of their index.
+
+    Raises:
+        ValueError: invalid strategy or search space.
+    """
+    if output_dir is None:
+        output_dir = Path(os.environ.get("SM_OUTPUT_DATA_DIR", "output")) / "tune"
+    output_dir = mkdir(output_dir)
+
+    params = list(sample(space, strategy, n_trials, seed))
+    runs, dirs = [], []
+    for i, p in enumerate(params):
+        trial_dir = output_dir / f"trial-{i:04d}"
+        model_dir, output_data_dir = mkdir(trial_dir / "model"), mkdir(trial_dir / "output")
+        env = {"SM_MODEL_DIR": str(model_dir), "SM_OUTPUT_DATA_DIR": str(output_data_dir)}
+        runs.append(Run([*fixed_args, *_to_cli_args(p)], env))
+        dirs.append((trial_dir, model_dir, output_data_dir))
+    logger.info("Running %d trials of %s, with strategy=%s", len(runs), script, strategy)
+
+    server = ForkServer(preload)
+    results = server.run_many(script, runs, max_workers or threads.available_cpus(), pin_workers=pin_workers)
+
+    trials = []
+    for i, (p, run, result, (trial_dir, model_dir, output_data_dir)) in enumerate(zip(params, runs, results, dirs)):
+        (trial_dir / "trial.log").write_text(result.output)
+        metrics = {**_read_metrics_csv(output_data_dir), **_match_metrics(result.output, metric_definitions)}
+        trial = Trial(i, p, run.args, result.exit_code, result.elapsed, model_dir, output_data_dir, metrics)
+        if trial.exit_code != 0:
+            logger.warning("Trial %d failed with exit code %d, see %s", i, trial.exit_code, trial_dir / "trial.log")
+        trials.append(trial)
+
+    opath = write_csv(trials, output_dir / "tune.csv")
+    logger.info("Summary of %d trials written to %s", len(trials), opath)
+    return trials
+
+
+def sample(
+    space: SearchSpace, strategy: str = "grid", n_trials: Optional[int] = None, seed: Optional[int] = None
+) -> Iterable[Dict[str, str]]:
+    """Generate the cli args of each trial, as ``{"--name": "value"}``.
+
+    Args:
+        space (SearchSpace): Search space, i.e., ``{"--name": candidate values}``.
+        strategy (str, optional): "grid" or "random". Defaults to "grid".
+        n_trials (int, optional): Number of trials. Defaults to None, which means the whole grid, or 10 trials of
+            random search.
+        seed (int, optional): Random seed of the random search. Defaults to None.
+
+    Raises:
+        ValueError: invalid strategy or search space.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy}; must be one of {STRATEGIES}")
+
+    names = [name if name.startswith("--") else f"--{name}" for name in space]
+    dims = [_dimension(name, v) for name, v in zip(names, space.values())]
+
+    if strategy == "grid":
+        for name, dim in zip(names, dims):
+            if not isinstance(dim, list):
+                raise ValueError(f"Grid search requires a list of choices for {name}, but got {dim}")
+        grid = itertools.product(*dims)
+        for values in grid if n_trials is None else itertools.islice(grid, n_trials):
+            yield {name: _format(v) for name, v in zip(names, values)}
+    else:
+        rng = random.Random(seed)
+        for _ in range(10 if n_trials is None else n_trials):
+            yield {name: _format(_draw(rng, dim)) for name, dim in zip(names, dims)}
+
+
+def best(trials: Iterable[Trial], metric: str, mode: str = "max") -> Optional[Trial]:
+    """Return the successful trial with the max (or min) metric, or None when no successful trial has the metric.
+
+    Trials whose metric is NaN (e.g., not a number in their output) do not count.
+    """
+    if mode not in ("max", "min"):
+        raise ValueError(f"Unknown mode {mode}; must be max or min")
+
+    candidates = [t for t in trials if t.exit_code == 0 and t.metrics.get(metric) is not None]
+    candidates = [t for t in candidates if not (isinstance(t.metrics[metric], float) and math.isnan(t.metrics[metric]))]
+    if not candidates:
+        return None
+    sign = 1 if mode == "max" else -1
+    return max(candidates, key=lambda t: sign * t.metrics[metric])
+
+
+def write_csv(trials: Sequence[Trial], path: Union[str, Path]) -> Path:
+    """Write one row per trial: its index, sampled cli args, exit code, elapsed seconds, and metrics."""
+    path = Path(path)
+    param_names = list(dict.fromkeys(k for t in trials for k in t.params))
+    metric_names = list(dict.fromkeys(k for t in trials for k in t.metrics))
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trial", *param_names, "exit_code", "elapsed", *metric_names])
+        for t in trials:
+            writer.writerow(
+                [
+                    t.index,
+                    *(t.params.get(k) for k in param_names),
+                    t.exit_code,
+                    t.elapsed,
+                    *(t.metrics.get(k) for k in metric_names),
+                ]
+            )
+    return path
+
+
+################################################################################
+# Helper utilities
+################################################################################
+def _dimension(name: str, v: Any) -> Any:
+    """Validate one dimension of the search space, i.e., a list of choices, a distribution, or a fixed value."""
+    if isinstance(v, list):
+        if not v:
+            raise ValueError(f"No choices for {name}")
+        return v
+    if isinstance(v, dict):
+        if len(v) != 1 or next(iter(v)) not in DISTRIBUTIONS:
+            raise ValueError(f"Invalid distribution for {name}: {v}; must be one of {DISTRIBUTIONS}")
+        (dist, (lo, hi)) = next(iter(v.items()))
+        if not lo <= hi or (dist == "loguniform" and lo <= 0):
+            raise ValueError(f"Invalid range for {name}: {v}")
+        return v
+    return [v]
+
+
+def _draw(rng: random.Random, dim: Any) -> Any:
+    """Draw one value from a list of choices, or from a distribution."""
+    if isinstance(dim, list):
+        return rng.choice(dim)
+    ((dist, (lo, hi)),) = dim.items()
+    if dist == "uniform":
+        return rng.uniform(lo, hi)
+    if dist == "loguniform":
+        return math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    return rng.randint(lo, hi)
+
+
+def _format(v: Any) -> str:
+    """Format a value as a cli arg that ``smepu.argparse.infer_dtype()`` converts back to the same value.
+
+    Trials receive their cli args verbatim (see ``ForkServer``), hence e.g., ``"False"`` and ``"[1, 2]"`` reach the
+    entrypoint as-is, as they would on SageMaker.
+    """
+    if isinstance(v, str):
+        return v
+    if isinstance(v, (list, dict)):
+        return json.dumps(v)
+    return str(v)
+
+
+def _to_cli_args(params: Mapping[str, str]) -> List[str]:
+    return [s for kv in params.items() for s in kv]
+
+
+def _read_metrics_csv(output_data_dir: Path) -> Dict[str, float]:
+    """Read the numeric columns of ``metrics.csv``, when it has exactly one row."""
+    try:
+        with (output_data_dir / "metrics.csv").open(newline="") as f:
+            rows = list(csv.DictReader(f))
+    except OSError:
+        return {}
+    if len(rows) != 1:
+        return {}
+
+    metrics = {}
+    for k, v in rows[0].items():
+        try:
+            metrics[k] = float(v)
+        except (TypeError, ValueError):
+            pass
+    return metrics
+
+
+def _match_metrics(output: str, metric_definitions: Sequence[Mapping[str, str]]) -> Dict[str, float]:
+    """Extract metrics from a trial's output, SageMaker-style: the last match of each regex wins.
+
+    A match that is not a number is recorded as NaN, rather than failing the whole tuning run.
+    """
+    metrics = {}
+    for d in metric_definitions:
+        matches = re.findall(d["Regex"], output)
+        if matches:
+            last = matches[-1]
+            value = last[0] if isinstance(last, tuple) else last
+            try:
+                metrics[d["Name"]] = float(value)
+            except ValueError:
+                logger.warning("Metric %s is not a number: %r, record NaN", d["Name"], value)
+                metrics[d["Name"]] = math.nan
+    return metrics
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line interface. Print each trial as a JSON line, and return the number of failed trials."""
+    # Without abbreviations, e.g., the script's own --n is not taken for --n-trials.
+    parser = argparse.ArgumentParser(
+        prog="python -m smepu.tune", description=__doc__.split("\n")[0], allow_abbrev=False
+    )
+    parser.add_argument("script", help="Path to an entrypoint script, or a module name")
+    parser.add_argument("--space", required=True, help="JSON file of the search space")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="grid")
+    parser.add_argument("--n-trials", type=int, default=None, help="Number of trials")
+    parser.add_argument("--max-workers", type=int, default=None, help="Maximum number of concurrent trials")
+    parser.add_argument("--tune-output-dir", default=None, help="Where to create the dirs of each trial")
+    parser.add_argument("--metric-definitions", default=None, help='JSON file of [{"Name": ..., "Regex": ...}]')
+    parser.add_argument("--preload", nargs="*", default=[], help="Modules to import once in the parent")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--pin-workers", action="store_true", help="Pin each trial to its own cpus")
+    args, fixed_args = parser.parse_known_args(argv)
+
+    space = json.loads(Path(args.space).read_text())
+    metric_definitions = json.loads(Path(args.metric_definitions).read_text()) if args.metric_definitions else ()
+    trials = tune(
+        args.script,
+        space,
+        fixed_args,
+        args.strategy,
+        args.n_trials,
+        args.max_workers,
+        args.tune_output_dir,
+        metric_definitions,
+        args.preload,
+        args.seed,
+        args.pin_workers,
+    )
+    for t in trials:
+        print(json.dumps({"trial": t.index, **t.params, "exit_code": t.exit_code, "elapsed": t.elapsed, **t.metrics}))
+    return sum(1 for t in trials if t.exit_code != 0)
+
+
+if __name__ == "__main__":
+    # No logging config here: trials inherit the root logger, and the entrypoint script configures its own.
+    sys.exit(main())
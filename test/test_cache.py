@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu.cache import ResultCache
+
+import os
+from pathlib import Path
+
+import pytest
+
+
+def test_key():
+    """Put a placeholder."""
+    key = ResultCache.key("abc", "sklearn.cluster.KMeans", {"n_clusters": 2, "tol": 1e-4})
+    assert key == ResultCache.key("abc", "sklearn.cluster.KMeans", {"tol": 1e-4, "n_clusters": 2})
+    assert key != ResultCache.key("abd", "sklearn.cluster.KMeans", {"tol": 1e-4, "n_clusters": 2})
+    assert key != ResultCache.key("abc", "sklearn.cluster.KMeans", {"tol": 1e-4, "n_clusters": 3})
+
+
+def test_key_normalized():
+    """Put a placeholder."""
+    np = pytest.importorskip("numpy")
+    assert ResultCache.key(np.arange(3), np.float32(0.5), Path("a/b")) == ResultCache.key([0, 1, 2], 0.5, "a/b")
+    assert ResultCache.key(ResultCache, {"f": os.path.join}) == ResultCache.key(
+        "smepu.cache.ResultCache", {"f": f"{os.path.join.__module__}.join"}
+    )
+
+    class Estimator(object):
+        def __init__(self, n_clusters):
+            self.n_clusters = n_clusters
+
+        def get_params(self, deep=True):
+            return {"n_clusters": self.n_clusters}
+
+    assert ResultCache.key({"init": Estimator(2)}) == ResultCache.key({"init": Estimator(2)})
+    assert ResultCache.key({"init": Estimator(2)}) != ResultCache.key({"init": Estimator(3)})
+
+    with pytest.raises(TypeError):
+        ResultCache.key({"x": object()})
+
+
+def test_get_put(tmp_path):
+    """Put a placeholder."""
+    cache = ResultCache(tmp_path)
+    assert cache.get("a") is None
+
+    with cache.put("a") as tmp_dir:
+        (tmp_dir / "metrics.json").write_text("{}")
+    assert (cache.get("a") / "metrics.json").read_text() == "{}"
+
+    # A failed put publishes nothing, and leaves no temporary dir.
+    with pytest.raises(RuntimeError):
+        with cache.put("b") as tmp_dir:
+            (tmp_dir / "metrics.json").write_text("{}")
+            raise RuntimeError()
+    assert cache.get("b") is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a"]
+
+
+def test_evict_lru(tmp_path):
+    """Put a placeholder."""
+    cache = ResultCache(tmp_path, max_bytes=250)
+    for i, key in enumerate("abc"):
+        with cache.put(key) as tmp_dir:
+            (tmp_dir / "model").write_bytes(b"0" * 100)
+        os.utime(tmp_path / key, (i, i))  # Deterministic mtimes.
+
+    # Adding c has evicted a, the least-recently used.
+    assert cache.get("a") is None
+    assert cache.size() == 200
+
+    # Hit b, then adding d evicts c.
+    cache.get("b")
+    with cache.put("d") as tmp_dir:
+        (tmp_dir / "model").write_bytes(b"0" * 100)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import checkpoint
+
+import json
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+
+def test_resume(tmp_path):
+    """Put a placeholder."""
+    config = {"algo": "KMeans", "train": Path("refdata")}
+    manifest = checkpoint.Manifest(tmp_path, config)
+    assert len(manifest) == 0
+
+    (manifest.trial_dir("n_clusters-2") / "model.txt").write_text("model")
+    manifest.commit("n_clusters-2", {"silhouette_score": 0.5})
+    manifest.trial_dir("n_clusters-3")  # Interrupted before commit.
+
+    resumed = checkpoint.Manifest(tmp_path, config)
+    assert len(resumed) == 1
+    assert "n_clusters-2" in resumed and "n_clusters-3" not in resumed
+    assert resumed["n_clusters-2"] == {"silhouette_score": 0.5}
+    assert (resumed.trial_dir("n_clusters-2") / "model.txt").read_text() == "model"
+
+
+def test_config_mismatch(tmp_path):
+    """Put a placeholder."""
+    checkpoint.Manifest(tmp_path, {"algo": "KMeans"}).commit("a", 1)
+    assert len(checkpoint.Manifest(tmp_path, {"algo": "KMeans"})) == 1
+    assert len(checkpoint.Manifest(tmp_path, {"algo": "GaussianMixture"})) == 0
+
+
+def test_config_normalized(tmp_path):
+    """Put a placeholder."""
+
+    class Estimator(object):
+        def __init__(self, n_clusters):
+            self.n_clusters = n_clusters
+
+        def get_params(self, deep=True):
+            return {"n_clusters": self.n_clusters}
+
+    # The default repr of an object has its memory address, which differs across runs.
+    checkpoint.Manifest(tmp_path, {"init": Estimator(2)}).commit("a", 1)
+    assert len(checkpoint.Manifest(tmp_path, {"init": Estimator(2)})) == 1
+    assert len(checkpoint.Manifest(tmp_path, {"init": Estimator(3)})) == 0
+    with pytest.raises(TypeError):
+        checkpoint.Manifest(tmp_path, {"init": object()})
+
+
+def test_atomic_write_text(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    path = tmp_path / "manifest.json"
+    checkpoint.atomic_write_text(path, json.dumps({"a": 1}))
+    assert json.loads(path.read_text()) == {"a": 1}
+
+    # Both the file and, on POSIX, its dir are flushed to disk.
+    fsync = checkpoint.os.fsync
+    synced = []
+    monkeypatch.setattr(
+        checkpoint.os, "fsync", lambda fd: synced.append(stat.S_ISDIR(os.fstat(fd).st_mode)) or fsync(fd)
+    )
+    checkpoint.atomic_write_text(path, json.dumps({"a": 1}))
+    assert synced == [False, True] if os.name == "posix" else [False]
+
+    # A crash before the rename leaves the old content, and no temporary file.
+    def crash(src, dst):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(checkpoint.os, "replace", crash)
+    with pytest.raises(KeyboardInterrupt):
+        checkpoint.atomic_write_text(path, json.dumps({"a": 2}))
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+
+def test_default_checkpoint_dir(monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.delenv("SM_HOSTS", raising=False)
+    assert checkpoint.default_checkpoint_dir() is None
+    monkeypatch.setenv("SM_HOSTS", '["algo-1"]')
+    assert checkpoint.default_checkpoint_dir() == Path("/opt/ml/checkpoints")
@@ -0,0 +1,139 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import threads
+from smepu.forkserver import ForkServer, Run, main
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork()")
+
+SCRIPT = """
+import argparse
+import atexit
+import os
+import subprocess
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--epochs", type=int)
+parser.add_argument("--exit", type=int, default=0)
+args = parser.parse_args()
+atexit.register(print, "atexit")
+print("epochs", args.epochs, os.environ["SM_MODEL_DIR"], "textwrap" in sys.modules)
+sys.exit(args.exit)
+"""
+
+
+@pytest.fixture
+def script(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "entrypoint.py"
+    path.write_text(textwrap.dedent(SCRIPT))
+    return str(path)
+
+
+def test_run_many(script):
+    """Put a placeholder."""
+    server = ForkServer(preload=["textwrap"])
+    runs = [Run(["--epochs", str(i), "--exit", str(i % 2)], {"SM_MODEL_DIR": f"/model-{i}"}) for i in range(4)]
+    results = server.run_many(script, runs, max_workers=2)
+
+    assert [r.exit_code for r in results] == [0, 1, 0, 1]
+    assert [r.output for r in results] == [f"epochs {i} /model-{i} True\natexit\n" for i in range(4)]
+    assert "SM_MODEL_DIR" not in os.environ
+
+
+def test_args_verbatim(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "kwargs.py"
+    path.write_text(
+        "import json, sys\nfrom smepu.argparse import to_kwargs\nprint(json.dumps(to_kwargs(sys.argv[1:])))\n"
+    )
+    args = ["--copy_x", "True", "--a", "1", "--verbose", "False", "--z", "[1, 2]", "--cfg", '{"k": [3]}']
+    result = ForkServer().run(str(path), Run(args))
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == {"copy_x": True, "a": 1, "verbose": False, "z": [1, 2], "cfg": {"k": [3]}}
+
+    # Opt-in conversion, for third-party scripts that follow argparse conventions.
+    path.write_text("import sys\nprint(sys.argv[1:])\n")
+    result = ForkServer(convert_args=True).run(str(path), Run(args))
+    expected = ["--copy_x", "--a", "1", "--verbose", "False", "--z", "1", "2", "--cfg", '{"k": [3]}']
+    assert result.output == f"{expected}\n"
+
+
+def test_foreign_children(script):
+    """Put a placeholder."""
+    # A child that the caller started itself, and that exits while the server is waiting on its own children.
+    proc = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+    runs = [Run(["--epochs", "1"], {"SM_MODEL_DIR": "/model"})] * 3
+    results = ForkServer().run_many(script, runs, max_workers=2)
+    assert [r.exit_code for r in results] == [0, 0, 0]
+    assert proc.wait() == 3
+
+
+def test_threads_per_worker(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "threads.py"
+    path.write_text("import os\nprint(os.environ['OMP_NUM_THREADS'])\n")
+    results = ForkServer().run_many(str(path), [Run([])] * 2, max_workers=2, threads_per_worker=3)
+    assert [r.output for r in results] == ["3\n", "3\n"]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Requires os.sched_getaffinity()")
+def test_pin_workers(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "pin.py"
+    path.write_text("import os\nprint(sorted(os.sched_getaffinity(0)), os.environ['OMP_NUM_THREADS'])\n")
+    results = ForkServer().run_many(str(path), [Run([])] * 3, max_workers=2, pin_workers=True)
+
+    cpu_sets = threads.partition_cpus(2)
+    assert {r.output for r in results} <= {f"{cpus} {len(cpus)}\n" for cpus in cpu_sets}
+
+
+def test_pin_workers_quota(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    # 2 NUMA nodes of 4 cpus each, but a cgroup cpu quota of 2 cpus.
+    monkeypatch.setattr(threads, "numa_nodes", lambda: [[0, 1, 2, 3], [4, 5, 6, 7]])
+    monkeypatch.setattr(threads, "available_cpus", lambda: 2)
+    monkeypatch.setattr(threads, "pin", lambda cpus: None)
+    path = tmp_path / "pin.py"
+    path.write_text("import os\nprint(os.environ['OMP_NUM_THREADS'])\n")
+    results = ForkServer().run_many(str(path), [Run([])] * 2, max_workers=2, pin_workers=True)
+    assert [r.output for r in results] == ["1\n", "1\n"]
+
+
+def test_run_error(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "error.py"
+    path.write_text("raise ValueError('boom')\n")
+    result = ForkServer().run(str(path), Run([]))
+    assert result.exit_code == 1
+    assert "ValueError: boom" in result.output
+
+
+@pytest.mark.parametrize("code,exit_code,output", [("'bad input'", 1, "bad input\n"), ("None", 0, ""), ("3", 3, "")])
+def test_run_sys_exit(tmp_path, code, exit_code, output):
+    """Put a placeholder."""
+    path = tmp_path / "exit.py"
+    path.write_text(f"import sys\nsys.exit({code})\n")
+    result = ForkServer().run(str(path), Run([]))
+    assert (result.exit_code, result.output) == (exit_code, output)
+
+
+def test_main(script, tmp_path, capsys):
+    """Put a placeholder."""
+    runs = tmp_path / "runs.jsonl"
+    runs.write_text("\n".join(json.dumps({"args": ["--epochs", "1"], "env": {"SM_MODEL_DIR": d}}) for d in "ab"))
+    assert main([script, "--runs", str(runs), "--log-dir", str(tmp_path / "logs")]) == 0
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r["run"], r["exit_code"]) for r in records] == [(0, 0), (1, 0)]
+    assert (tmp_path / "logs" / "run-1.log").read_text() == f"epochs 1 b {'textwrap' in sys.modules}\natexit\n"
@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import io
+
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def channel(tmp_path):
+    """Put a placeholder."""
+    d = tmp_path / "train"
+    (d / "sub").mkdir(parents=True)
+    (d / "a.csv").write_bytes(os.urandom(300_000))
+    (d / "sub" / "b.csv").write_bytes(b"1,2,3\n")
+    return d
+
+
+@pytest.mark.parametrize("mode", io.FINGERPRINT_MODES)
+def test_fingerprint_stable(channel, mode):
+    """Put a placeholder."""
+    digest = io.fingerprint(channel, mode)
+    assert len(digest) == 32
+    assert digest == io.fingerprint(channel, mode, max_workers=1)
+    assert digest == io.fingerprint(str(channel), mode)
+
+
+@pytest.mark.parametrize("mode", io.FINGERPRINT_MODES)
+def test_fingerprint_changed(channel, mode):
+    """Put a placeholder."""
+    digest = io.fingerprint(channel, mode)
+    (channel / "sub" / "b.csv").write_bytes(b"1,2,3\n4,5,6\n")
+    assert io.fingerprint(channel, mode) != digest
+
+
+@pytest.mark.parametrize("mode,same", [("stat", False), ("sampled", True), ("full", True)])
+def test_fingerprint_copy(channel, tmp_path, mode, same):
+    """Put a placeholder."""
+    copy = tmp_path / "copy"
+    shutil.copytree(channel, copy, copy_function=shutil.copyfile)  # New mtimes
+    os.utime(copy / "a.csv", ns=(0, 0))
+    assert (io.fingerprint(copy, mode) == io.fingerprint(channel, mode)) == same
+
+
+def test_fingerprint_sampled_blocks(channel):
+    """Put a placeholder."""
+    # In-place edit of a large file: sampled mode sees it only when it hits a sampled block.
+    data = bytearray((channel / "a.csv").read_bytes())
+    sampled, full = io.fingerprint(channel, "sampled", block_size=1000, n_blocks=4), io.fingerprint(channel, "full")
+    data[1] ^= 0xFF
+    (channel / "a.csv").write_bytes(bytes(data))
+    assert io.fingerprint(channel, "sampled", block_size=1000, n_blocks=4) != sampled
+    data[1] ^= 0xFF
+    data[50_000] ^= 0xFF
+    (channel / "a.csv").write_bytes(bytes(data))
+    assert io.fingerprint(channel, "sampled", block_size=1000, n_blocks=4) == sampled
+    assert io.fingerprint(channel, "full") != full
+
+
+def test_fingerprint_errors(tmp_path):
+    """Put a placeholder."""
+    with pytest.raises(ValueError):
+        io.fingerprint(tmp_path, "md5")
+    with pytest.raises(FileNotFoundError):
+        io.fingerprint(tmp_path / "missing")
+    assert io.fingerprint(tmp_path, "full") == io.fingerprint(tmp_path, "full")
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="Requires FIFOs")
+def test_fingerprint_pipe_mode(channel, tmp_path):
+    """Put a placeholder."""
+    # Pipe mode: /opt/ml/input/data/<channel>_<epoch> FIFOs, and no channel dir. Opening a FIFO would block.
+    fifo = tmp_path / "pipe_0"
+    os.mkfifo(fifo)
+    with pytest.raises(FileNotFoundError):
+        io.fingerprint(tmp_path / "pipe", "full")
+    with pytest.raises(FileNotFoundError):
+        io.fingerprint(fifo, "full")
+
+    # FIFOs under a dir are not part of its fingerprint.
+    expected = io.fingerprint(channel, "full")
+    os.mkfifo(channel / "train_0")
+    assert io.fingerprint(channel, "full") == expected
+
+
+def test_fingerprint_full_segments(channel, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setattr(io.channel, "_SEGMENT_SIZE", 1000)
+    digest = io.fingerprint(channel, "full", max_workers=4)
+    assert digest == io.fingerprint(channel, "full", max_workers=1)
+
+    data = bytearray((channel / "a.csv").read_bytes())
+    data[-1] ^= 0xFF
+    (channel / "a.csv").write_bytes(bytes(data))
+    assert io.fingerprint(channel, "full") != digest
@@ -2,7 +2,11 @@
 # SPDX-License-Identifier: MIT-0
 
 """Placeholder."""
-from smepu.argparse import sm_protocol, to_kwargs
+from smepu.argparse import from_hyperparameters_json, sm_protocol, to_kwargs
+
+import sys
+from pathlib import Path
+from typing import Optional
 
 import pytest
 
@@ -58,3 +62,127 @@ def actual_train(model_dir, train_dir, epochs=100, init="uniform", dict_arg=None
         "init": init,
         "dict_arg": dict_arg,
     }
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        [
+            "--callbacks.__class__",
+            "smepu.list",
+            "--callbacks.0.__class__",
+            "collections.OrderedDict",
+            "--callbacks.0.name",
+            "EarlyStopper",
+            "--callbacks.1.__class__",
+            "smepu.list",
+            "--callbacks.1.0",
+            "Checkpointer",
+            "--callbacks.1.1",
+            "7",
+        ],
+        # Any order of dotted args yields the same result.
+        [
+            "--callbacks.1.1",
+            "7",
+            "--callbacks.0.name",
+            "EarlyStopper",
+            "--callbacks.1.0",
+            "Checkpointer",
+            "--callbacks.1.__class__",
+            "smepu.list",
+            "--callbacks.__class__",
+            "smepu.list",
+            "--callbacks.0.__class__",
+            "collections.OrderedDict",
+        ],
+    ],
+)
+def test_nested_class(test_input):
+    """Put a placeholder."""
+    assert to_kwargs(["--epochs", "7", *test_input]) == {
+        "epochs": 7,
+        "callbacks": [{"name": "EarlyStopper"}, ["Checkpointer", 7]],
+    }
+
+
+def test_missing_class():
+    """Put a placeholder."""
+    with pytest.raises(KeyError):
+        to_kwargs(["--trainer.epochs", "7"])
+    with pytest.raises(KeyError):
+        to_kwargs(["--trainer.__class__", "None", "--trainer.epochs", "7"])
+
+
+def test_positional_args():
+    """Put a placeholder."""
+    assert to_kwargs(["--a.__class__", "smepu.list", "--a.1", "y", "--a.0", "x"]) == {"a": ["x", "y"]}
+    assert to_kwargs(["--a.__class__", "smepu.list", "--a.-1", "z"]) == {"a": ["z"]}
+    with pytest.raises(KeyError, match="--a.1"):
+        to_kwargs(["--a.__class__", "smepu.list", "--a.0", "x", "--a.2", "y"])
+
+
+def test_none_class():
+    """Put a placeholder."""
+    assert to_kwargs(["--epochs", "7", "--trainer.__class__", "None"]) == {"epochs": 7, "trainer": None}
+    assert to_kwargs(["--trainer.__class__", "builtins.dict", "--trainer.callback.__class__", "None"]) == {
+        "trainer": {"callback": None}
+    }
+
+
+class Typed(object):
+    """Put a placeholder."""
+
+    def __init__(
+        self,
+        init: str = "uniform",
+        epochs: int = 2,
+        lr: Optional[float] = None,
+        verbose: bool = False,
+        any_arg=None,
+        **kwargs,
+    ):
+        """Put a placeholder."""
+
+
+def test_target():
+    """Put a placeholder."""
+    cli_args = ["--init", "1", "--epochs", "7", "--lr", "None", "--verbose", "true", "--any_arg", "1", "--extra", "1.0"]
+    assert to_kwargs(cli_args, target=Typed) == dict(init="1", epochs=7, lr=None, verbose=True, any_arg=1, extra=1.0)
+    assert to_kwargs(["--lr", "1"], target=Typed) == dict(lr=1.0)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="Requires PEP 604 unions")
+def test_target_pep604():
+    """Put a placeholder."""
+
+    def target(lr: float | None = None, epochs: "int | None" = None, init: int | str = 0):
+        """Put a placeholder."""
+
+    assert to_kwargs(["--lr", "1", "--epochs", "2", "--init", "3"], target=target) == dict(lr=1.0, epochs=2, init=3)
+    assert to_kwargs(["--lr", "None", "--epochs", "None"], target=target) == dict(lr=None, epochs=None)
+    with pytest.raises(ValueError):
+        to_kwargs(["--epochs", "1.5"], target=target)
+
+
+@pytest.mark.parametrize("test_input", [["--epochs", "1.5"], ["--verbose", "yes"]])
+def test_target_bad_type(test_input):
+    """Put a placeholder."""
+    with pytest.raises(ValueError):
+        to_kwargs(test_input, target=Typed)
+
+
+def test_from_hyperparameters_json(monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setenv("SM_INPUT_CONFIG_DIR", str(Path(__file__).parent / "refdata"))
+    expected = dict(
+        epochs=7,
+        init=1,
+        lr=None,
+        dict_arg={"seq": [1, 2]},
+        callbacks=[{"name": "Early Stopper"}, "--fishy"],
+    )
+    assert from_hyperparameters_json(exclude=["algo", "sweep_start"]) == expected
+
+    kwargs = from_hyperparameters_json(exclude={"algo": "dummyest.DummyEstimator", "sweep_start": 2}, target=Typed)
+    assert kwargs == {**expected, "init": "1"}
@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu.io import manifest
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def jsonl(tmp_path):
+    records = [{"source-ref": f"s3://bucket/prefix/img/{i:04d}.jpg", "label": i % 3} for i in range(100)]
+    lines = [json.dumps(r) for r in records]
+    lines[10:10] = ["", "   "]  # Blank lines are not records.
+    lines.insert(50, "{}")  # Short lines are.
+    records.insert(48, {})
+    path = tmp_path / "train.manifest"
+    path.write_text("\n".join(lines) + "\n")
+    return path, records
+
+
+def test_iter_manifest(jsonl):
+    """Put a placeholder."""
+    path, records = jsonl
+    assert list(manifest.iter_manifest(path)) == records
+
+
+def test_iter_manifest_file(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "train.manifest"
+    keys = [f"img/{i:04d}.jpg" for i in range(1000)]
+    path.write_text(json.dumps([{"prefix": "s3://bucket/prefix/"}] + keys, indent=1))
+
+    # Tiny blocks, to cut elements at block boundaries.
+    uris = list(manifest.iter_manifest_file(path, block_size=7))
+    assert uris == ["s3://bucket/prefix/" + k for k in keys]
+
+    path.write_text(json.dumps(["img/0000.jpg"]))
+    with pytest.raises(ValueError):
+        list(manifest.iter_manifest_file(path))
+    path.write_text('[{"prefix": "s3://bucket/"}, "a", "b"')
+    with pytest.raises(ValueError):
+        list(manifest.iter_manifest_file(path))
+
+
+def test_dataset(jsonl):
+    """Put a placeholder."""
+    path, records = jsonl
+    with manifest.ManifestDataset(path) as ds:
+        assert len(ds) == len(records)
+        assert ds[0] == records[0]
+        assert ds[48] == {}
+        assert ds[-1] == records[-1]
+        assert [ds[i] for i in range(len(ds))] == records
+        with pytest.raises(IndexError):
+            ds[len(ds)]
+        assert ds.read_batch(45, 55) == records[45:55]
+        assert ds.read_batch(95, 200) == records[95:]
+
+        batches = list(ds.batches(32))
+        assert [len(b) for b in batches] == [32, 32, 32, 5]
+        assert sum(batches, []) == records
+        assert sum(ds.batches(10, start=5, stop=27), []) == records[5:27]
+
+
+def test_build_index(tmp_path):
+    """Put a placeholder."""
+    path = tmp_path / "x.jsonl"
+    path.write_bytes(b'{"a": 1}\r\n\n1\n{"b": 2}')  # No trailing newline.
+    offsets = manifest.build_index(path, block_size=3)
+    assert offsets.tolist() == [0, 11, 13, 21]
+
+    path.write_bytes(b"")
+    assert manifest.build_index(path).tolist() == [0]
+    with manifest.ManifestDataset(path) as ds:
+        assert len(ds) == 0
+        assert list(ds.batches(10)) == []
+
+
+def test_persisted_index(jsonl, tmp_path):
+    """Put a placeholder."""
+    path, records = jsonl
+    index_path = tmp_path / "train.idx"
+    with manifest.ManifestDataset(path, index_path=index_path):
+        pass
+    assert index_path.exists()
+
+    # Reused while the manifest is unchanged.
+    mtime = index_path.stat().st_mtime_ns
+    with manifest.ManifestDataset(path, index_path=index_path) as ds:
+        assert ds[-1] == records[-1]
+    assert index_path.stat().st_mtime_ns == mtime
+
+    # Rebuilt once the manifest changes.
+    with open(path, "a") as f:
+        f.write(json.dumps({"label": -1}) + "\n")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    with manifest.ManifestDataset(path, index_path=index_path) as ds:
+        assert len(ds) == len(records) + 1
+        assert ds[-1] == {"label": -1}
+
+
+def test_local_path():
+    """Put a placeholder."""
+    uri = "s3://bucket/prefix/img/0001.jpg"
+    assert manifest.local_path(uri, "/data") == Path("/data/prefix/img/0001.jpg")
+    assert manifest.local_path(uri, "/data", "s3://bucket/prefix/") == Path("/data/img/0001.jpg")
+    assert manifest.local_path(uri, "/data", "s3://bucket/prefix") == Path("/data/img/0001.jpg")
+    with pytest.raises(ValueError):
+        manifest.local_path(uri, "/data", "s3://other/")
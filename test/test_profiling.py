@@ -0,0 +1,126 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import profiling
+from smepu.argparse import to_kwargs
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_profiling():
+    """Put a placeholder."""
+    profiling.reset()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+
+@profiling.stage("fit")
+def fit():
+    """Put a placeholder."""
+    with profiling.stage("epoch"):
+        pass
+    return 42
+
+
+def test_disabled():
+    """Put a placeholder."""
+    with profiling.stage("load"):
+        pass
+    assert fit() == 42
+    assert profiling.summary() == {}
+
+
+def test_nested(tmp_path):
+    """Put a placeholder."""
+    profiling.enable(at_exit=False)
+    with profiling.stage("load"):
+        pass
+    with profiling.stage("sweep"):
+        for _ in range(3):
+            fit()
+
+    stats = profiling.summary()
+    assert list(stats) == ["load", "sweep", "sweep/fit", "sweep/fit/epoch"]
+    assert stats["sweep/fit"]["count"] == 3
+    assert stats["sweep/fit/epoch"]["count"] == 3
+    assert stats["sweep"]["self_s"] == pytest.approx(stats["sweep"]["total_s"] - stats["sweep/fit"]["total_s"])
+
+    profiling.report(tmp_path)
+    assert json.loads((tmp_path / "profiling.json").read_text()) == stats
+
+
+def test_propagate():
+    """Put a placeholder."""
+    profiling.enable(at_exit=False)
+    with profiling.stage("metrics"):
+        with ThreadPoolExecutor(2) as executor:
+            assert list(executor.map(profiling.propagate(lambda _: fit()), range(2))) == [42, 42]
+        # Unwrapped, the stages of a worker thread are not nested.
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(fit).result()
+    assert list(profiling.summary()) == ["fit", "fit/epoch", "metrics", "metrics/fit", "metrics/fit/epoch"]
+    assert profiling.summary()["metrics/fit"]["count"] == 2
+
+
+def test_exception_still_recorded():
+    """Put a placeholder."""
+    profiling.enable(at_exit=False)
+    with pytest.raises(ValueError):
+        with profiling.stage("load"):
+            raise ValueError()
+    with profiling.stage("fit"):
+        pass
+    assert list(profiling.summary()) == ["fit", "load"]
+
+
+@pytest.mark.parametrize("mode,fname", [("cpu", "profile.prof"), ("mem", "tracemalloc.snapshot")])
+def test_capture(tmp_path, mode, fname):
+    """Put a placeholder."""
+
+    @profiling.capture(mode, tmp_path)
+    def main():
+        return [i for i in range(1000)]
+
+    main()
+    assert (tmp_path / fname).is_file()
+
+
+def test_nested_capture(tmp_path):
+    """Put a placeholder."""
+    assert profiling.start_capture("cpu", tmp_path / "outer", at_exit=False)
+    with profiling.capture("mem", tmp_path / "inner"):
+        pass
+    assert not (tmp_path / "inner").exists()
+    assert profiling.stop_capture() == tmp_path / "outer" / "profile.prof"
+
+
+def test_capture_at_exit_once(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    registered = []
+    monkeypatch.setattr(profiling.atexit, "register", registered.append)
+    monkeypatch.setattr(profiling, "_capture_atexit_registered", False)
+    for _ in range(3):
+        profiling.start_capture("cpu", tmp_path)
+        profiling.stop_capture()
+    assert registered == [profiling.stop_capture]
+
+
+def test_reserved_hyperparams(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setenv("SM_OUTPUT_DATA_DIR", str(tmp_path))
+    kwargs = to_kwargs(["--epochs", "7", "--smepu.profile", "cpu"])
+    assert kwargs == {"epochs": 7}
+    assert profiling.stop_capture() == tmp_path / "profile.prof"
+    assert (tmp_path / "profile.prof").is_file()
+
+
+def test_bad_profile_mode():
+    """Put a placeholder."""
+    with pytest.raises(ValueError):
+        to_kwargs(["--smepu.profile", "gpu"])
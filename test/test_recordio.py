@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu.io import recordio
+
+import io
+import os
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+sp = pytest.importorskip("scipy.sparse")
+
+
+def _varint(n):
+    out = bytearray()
+    n = int(n) & ((1 << 64) - 1)
+    while True:
+        if n < 0x80:
+            out.append(n)
+            return bytes(out)
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+
+
+def _len_field(field, payload):
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _tensor(values, keys=None, shape=None, dtype="<f4"):
+    """Encode a Value holding a Float32Tensor (or Float64Tensor, Int32Tensor), with packed repeated fields."""
+    if dtype == "<i4":
+        msg = _len_field(1, b"".join(_varint(int(v)) for v in values))
+    else:
+        msg = _len_field(1, np.asarray(values, dtype=dtype).tobytes())
+    if keys is not None:
+        msg += _len_field(2, b"".join(_varint(k) for k in keys))
+    if shape is not None:
+        msg += _len_field(3, b"".join(_varint(d) for d in shape))
+    return _len_field({"<f4": 2, "<f8": 3, "<i4": 7}[dtype], msg)
+
+
+def _record(features, label=None, uid=None):
+    """Encode a Record whose features and label are {name: Value}."""
+    msg = b"".join(_len_field(1, _len_field(1, k.encode()) + _len_field(2, v)) for k, v in features.items())
+    msg += b"".join(_len_field(2, _len_field(1, k.encode()) + _len_field(2, v)) for k, v in (label or {}).items())
+    if uid is not None:
+        msg += _len_field(3, uid.encode())
+    return msg
+
+
+def _frame(payload, cflag=0):
+    return struct.pack("<II", recordio.MAGIC, cflag << 29 | len(payload)) + payload + b"\0" * (-len(payload) % 4)
+
+
+def test_parse_record():
+    """Put a placeholder."""
+    buf = _record(
+        {"values": _tensor([1.5, -2.0, 300.0], keys=[0, 200, 100_000], shape=[100_001])},
+        {"values": _tensor([7], dtype="<f8"), "ints": _tensor([-1, 2**20], dtype="<i4")},
+        uid="abc",
+    )
+    record = recordio.parse_record(buf)
+    assert record.uid == "abc"
+    tensor = record.features["values"]
+    np.testing.assert_array_equal(tensor.values, np.float32([1.5, -2.0, 300.0]))
+    np.testing.assert_array_equal(tensor.keys, [0, 200, 100_000])
+    assert tensor.shape == (100_001,)
+    assert record.label["values"].values.dtype == np.float64
+    np.testing.assert_array_equal(record.label["ints"].values, np.int32([-1, 2**20]))
+
+
+def test_read_records_multipart():
+    """Put a placeholder."""
+    # A payload that contains the magic number is split around it.
+    parts = [b"head", b"mid", b"tail"]
+    stream = io.BytesIO(_frame(b"one") + _frame(parts[0], 1) + _frame(parts[1], 2) + _frame(parts[2], 3))
+    payloads = list(recordio.read_records(stream))
+    assert payloads == [b"one", struct.pack("<I", recordio.MAGIC).join(parts)]
+
+    with pytest.raises(ValueError):
+        list(recordio.read_records(io.BytesIO(b"\0" * 8)))
+    with pytest.raises(ValueError):
+        list(recordio.read_records(io.BytesIO(_frame(b"truncated")[:-4])))
+
+
+def test_read_batches_dense():
+    """Put a placeholder."""
+    X = np.random.default_rng(0).standard_normal((10, 3)).astype(np.float32)
+    stream = io.BytesIO(
+        b"".join(_frame(_record({"values": _tensor(x)}, {"values": _tensor([i])})) for i, x in enumerate(X))
+    )
+    batches = list(recordio.read_batches(stream, batch_size=4))
+    assert [len(b.features) for b in batches] == [4, 4, 2]
+    np.testing.assert_array_equal(np.concatenate([b.features for b in batches]), X)
+    np.testing.assert_array_equal(np.concatenate([b.labels for b in batches]), np.arange(10))
+
+
+def test_read_batches_sparse():
+    """Put a placeholder."""
+    X = sp.random(20, 50, density=0.1, format="csr", dtype=np.float32, random_state=0)
+    records = [_record({"values": _tensor(X[i].data, keys=X[i].indices, shape=[50])}) for i in range(X.shape[0])]
+    stream = io.BytesIO(b"".join(_frame(r) for r in records))
+    batches = list(recordio.read_batches(stream, batch_size=8))
+    assert all(b.labels is None for b in batches)
+    np.testing.assert_array_equal(sp.vstack([b.features for b in batches]).toarray(), X.toarray())
+
+
+def test_open_channel(tmp_path):
+    """Put a placeholder."""
+    rec = _frame(_record({"values": _tensor([1, 2])}))
+    channel = tmp_path / "train"
+    channel.mkdir()
+    (channel / "a.pbr").write_bytes(rec * 2)
+    (channel / "b.pbr").write_bytes(rec)
+    assert recordio.is_recordio(channel / "a.pbr")
+    assert sum(len(b.features) for b in recordio.read_batches(recordio.open_channel(channel))) == 3
+
+    # Pipe mode
+    fifo = tmp_path / "pipe_0"
+    os.mkfifo(fifo)
+    writer = threading.Thread(target=lambda: fifo.write_bytes(rec * 5))
+    writer.start()
+    batches = list(recordio.read_batches(recordio.open_channel(tmp_path / "pipe"), batch_size=2))
+    writer.join()
+    assert [len(b.features) for b in batches] == [2, 2, 1]
+
+    with pytest.raises(FileNotFoundError):
+        list(recordio.open_channel(tmp_path / "missing"))
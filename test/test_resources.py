@@ -0,0 +1,103 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import resources
+
+import csv
+import sys
+
+import pytest
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Requires /proc")
+def test_proc():
+    """Put a placeholder."""
+    stat = resources.read_proc_stat()
+    assert stat["num_threads"] >= 1
+    assert stat["rss_bytes"] > 0
+    status = resources.read_proc_status()
+    assert status["peak_rss_bytes"] >= status["rss_bytes"] > 0
+
+
+def test_cgroup_memory(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setattr(resources, "_CGROUP_ROOT", tmp_path)
+    assert resources.cgroup_memory() == (None, None)
+
+    (tmp_path / "memory.max").write_text("max\n")
+    (tmp_path / "memory.current").write_text("1024\n")
+    assert resources.cgroup_memory() == (1024, None)
+
+    (tmp_path / "memory.max").write_text("4096\n")
+    assert resources.cgroup_memory() == (1024, 4096)
+
+
+def test_sampler(tmp_path):
+    """Put a placeholder."""
+    sampler = resources.start_sampler(interval=0.01, output_data_dir=tmp_path, log=False)
+    assert resources.start_sampler() is sampler
+    sampler._stop_event.wait(0.05)
+    opath = resources.stop_sampler()
+    assert resources.stop_sampler() is None
+
+    with opath.open() as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) >= 2
+    assert list(rows[0]) == list(resources.ResourceSampler.FIELDS)
+    assert "cpu=" in resources.format_sample(sampler.samples[-1])
+
+
+def test_cgroup_cpu_quota(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setattr(resources, "_CGROUP_ROOT", tmp_path)
+    assert resources.cgroup_cpu_quota() is None
+
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert resources.cgroup_cpu_quota() is None
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("250000\n")
+    assert resources.cgroup_cpu_quota() == 2.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert resources.cgroup_cpu_quota() is None
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert resources.cgroup_cpu_quota() == 1.5
+
+
+def test_memory_budget(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setattr(resources, "_CGROUP_ROOT", tmp_path)
+    monkeypatch.setattr(resources, "read_meminfo", lambda: {"available_bytes": 10_000})
+    assert resources.memory_budget() == 10_000
+
+    (tmp_path / "memory.max").write_text("4096\n")
+    (tmp_path / "memory.current").write_text("3072\n")
+    assert resources.memory_budget() == 1024
+
+    (tmp_path / "memory.stat").write_text("anon 1024\ninactive_file 2048\n")
+    assert resources.memory_budget() == 3072
+
+    monkeypatch.setattr(resources, "read_meminfo", lambda: {})
+    assert resources.memory_budget() == 3072
+    (tmp_path / "memory.max").write_text("max\n")
+    assert resources.memory_budget() is None
+
+
+def test_chunk_size():
+    """Put a placeholder."""
+    assert resources.chunk_size(100, budget=4000) == 10
+    assert resources.chunk_size(100, fraction=1.0, budget=4000) == 40
+    assert resources.chunk_size(10_000, budget=4000) == 1
+
+
+def test_sampler_at_exit_once(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    registered = []
+    monkeypatch.setattr(resources.atexit, "register", registered.append)
+    monkeypatch.setattr(resources, "_atexit_registered", False)
+    for _ in range(3):
+        resources.start_sampler(interval=0.01, output_data_dir=tmp_path, log=False)
+        resources.stop_sampler()
+    assert registered == [resources.stop_sampler]
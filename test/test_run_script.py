@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+import smepu
+from smepu.argparse import to_sys_argv
+
+import argparse
+import sys
+import textwrap
+
+import pytest
+
+SCRIPT = """
+import argparse
+import sys
+
+from sibling import VALUE
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--epochs", type=int)
+parser.add_argument("--do_train", action="store_true")
+parser.add_argument("--do_eval", action="store_true")
+parser.add_argument("--layers", type=int, nargs="*")
+parser.add_argument("--exit", type=int, default=None)
+args = parser.parse_args()
+argv0 = sys.argv[0]
+if args.exit is not None:
+    sys.exit(args.exit)
+"""
+
+
+@pytest.fixture
+def script(tmp_path):
+    """Put a placeholder."""
+    (tmp_path / "sibling.py").write_text("VALUE = 42\n")
+    path = tmp_path / "legacy.py"
+    path.write_text(textwrap.dedent(SCRIPT))
+    return path
+
+
+def test_to_sys_argv():
+    """Put a placeholder."""
+    cli_args = ["--epochs", "7", "--do_train", "True", "--do_eval", "False", "--layers", "[1, 2]", "--name", "a b"]
+    expected = ["--epochs", "7", "--do_train", "--do_eval", "False", "--layers", "1", "2", "--name", "a b"]
+    assert to_sys_argv(cli_args) == expected
+    assert to_sys_argv(cli_args, false_flags="drop") == [
+        "--epochs",
+        "7",
+        "--do_train",
+        "--layers",
+        "1",
+        "2",
+        "--name",
+        "a b",
+    ]
+    assert to_sys_argv(cli_args, false_flags="negate")[2:4] == ["--do_train", "--no-do_eval"]
+    with pytest.raises(ValueError):
+        to_sys_argv(cli_args, false_flags="invert")
+
+
+def test_to_sys_argv_nested_list():
+    """Put a placeholder."""
+    cli_args = ["--names", '["a", "b c"]', "--grid", "[[1, 2], [3]]", "--cfg", '[{"a": 1}]', "--empty", "[]"]
+    expected = ["--names", "a", "b c", "--grid", "[[1, 2], [3]]", "--cfg", '[{"a": 1}]', "--empty"]
+    assert to_sys_argv(cli_args) == expected
+
+
+def test_false_flag_default_true():
+    """Put a placeholder."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--remove_unused_columns", type=lambda s: s == "True", default=True, nargs="?", const=True)
+    args = parser.parse_args(to_sys_argv(["--remove_unused_columns", "False"]))
+    assert args.remove_unused_columns is False
+
+
+@pytest.mark.skipif(not hasattr(argparse, "BooleanOptionalAction"), reason="Requires Python 3.9+")
+def test_false_flag_negate():
+    """Put a placeholder."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shuffle", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args(to_sys_argv(["--shuffle", "False"], false_flags="negate"))
+    assert args.shuffle is False
+
+
+def test_run_script(script):
+    """Put a placeholder."""
+    ori_sys_argv, ori_sys_path = sys.argv[:], sys.path[:]
+    g = smepu.run_script(str(script), ["--epochs", "7", "--do_train", "True", "--layers", "[1, 2]"])
+
+    assert g["VALUE"] == 42
+    assert g["argv0"] == str(script)
+    assert vars(g["args"]) == dict(epochs=7, do_train=True, do_eval=False, layers=[1, 2], exit=None)
+    assert sys.argv == ori_sys_argv
+    assert sys.path == ori_sys_path
+
+
+def test_run_script_exit(script):
+    """Put a placeholder."""
+    assert smepu.run_script(str(script), ["--exit", "0"]) == {}
+    with pytest.raises(SystemExit):
+        smepu.run_script(str(script), ["--exit", "1"])
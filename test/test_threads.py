@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import threads
+
+import os
+
+import pytest
+
+
+def test_available_cpus(monkeypatch):
+    """Put a placeholder."""
+    n = threads.available_cpus()
+    assert 1 <= n <= os.cpu_count()
+
+    monkeypatch.setattr(threads, "cgroup_cpu_quota", lambda: 0.5)
+    assert threads.available_cpus() == 1
+
+
+def test_per_worker():
+    """Put a placeholder."""
+    assert threads.per_worker(4, n_cpus=16) == 4
+    assert threads.per_worker(3, n_cpus=16) == 5
+    assert threads.per_worker(32, n_cpus=16) == 1
+
+
+def test_configure(monkeypatch):
+    """Put a placeholder."""
+    for k in threads.ENV_VARS:
+        monkeypatch.delenv(k, raising=False)
+    monkeypatch.setenv("OMP_NUM_THREADS", "7")
+
+    assert threads.configure(2) == 2
+    assert os.environ["OMP_NUM_THREADS"] == "7"
+    assert os.environ["MKL_NUM_THREADS"] == "2"
+
+    threads.configure(3, override=True)
+    assert all(os.environ[k] == "3" for k in threads.ENV_VARS)
+
+
+def test_parse_cpulist():
+    """Put a placeholder."""
+    assert threads.parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert threads.parse_cpulist("\n") == []
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Requires os.sched_getaffinity()")
+def test_numa_nodes(tmp_path, monkeypatch):
+    """Put a placeholder."""
+    monkeypatch.setattr(threads, "_NODE_ROOT", tmp_path)
+    assert threads.numa_nodes() == [sorted(os.sched_getaffinity(0))]
+
+    (tmp_path / "node0").mkdir()
+    (tmp_path / "node0" / "cpulist").write_text("0\n")
+    assert threads.numa_nodes() == [[0]]
+
+
+def test_partition_cpus():
+    """Put a placeholder."""
+    nodes = [[0, 1, 2, 3, 4, 5], [6, 7, 8, 9, 10, 11]]
+    assert threads.partition_cpus(4, nodes) == [[0, 1, 2], [6, 7, 8], [3, 4, 5], [9, 10, 11]]
+    assert threads.partition_cpus(3, nodes) == [[0, 1, 2], [6, 7, 8], [3, 4, 5]]
+    assert threads.partition_cpus(5, nodes) == [[0, 1], [6, 7], [2, 3], [8, 9], [4, 5]]
+    assert threads.partition_cpus(1, [[0, 1]]) == [[0, 1]]
+    assert threads.partition_cpus(3, [[0, 1]]) == [[0], [1], [0]]
@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""Placeholder."""
+from smepu import tune
+
+import json
+import math
+import os
+import textwrap
+
+import pytest
+
+SCRIPT = """
+import os
+import smepu
+
+kwargs = smepu.argparse.to_kwargs(__import__("sys").argv[1:])
+score = -((kwargs["x"] - 3) ** 2) + len(kwargs["est"])
+print(f"score={score}")
+with open(os.path.join(os.environ["SM_OUTPUT_DATA_DIR"], "metrics.csv"), "w") as f:
+    f.write(f"x,note\\n{kwargs['x']},{kwargs['y']}\\n")
+"""
+
+
+def test_sample_grid():
+    """Put a placeholder."""
+    space = {"--x": [1, 2], "y": ["a", True], "--est.__class__": "smepu.list", "--z": [[1, 2]]}
+    trials = list(tune.sample(space))
+    assert len(trials) == 4
+    assert trials[0] == {"--x": "1", "--y": "a", "--est.__class__": "smepu.list", "--z": "[1, 2]"}
+    assert trials[-1]["--y"] == "True"
+    assert len(list(tune.sample(space, n_trials=3))) == 3
+
+    with pytest.raises(ValueError):
+        list(tune.sample({"--x": {"uniform": [0, 1]}}))
+    with pytest.raises(ValueError):
+        list(tune.sample({"--x": [1]}, strategy="bayes"))
+
+
+def test_sample_random():
+    """Put a placeholder."""
+    space = {"--lr": {"loguniform": [1e-4, 1e-1]}, "--n": {"randint": [2, 4]}, "--opt": ["sgd", "adam"]}
+    trials = list(tune.sample(space, "random", n_trials=50, seed=0))
+    assert trials == list(tune.sample(space, "random", n_trials=50, seed=0))
+    assert all(1e-4 <= float(t["--lr"]) <= 1e-1 for t in trials)
+    assert {t["--n"] for t in trials} == {"2", "3", "4"}
+    assert {t["--opt"] for t in trials} == {"sgd", "adam"}
+
+    with pytest.raises(ValueError):
+        list(tune.sample({"--lr": {"loguniform": [0, 1]}}, "random"))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork()")
+def test_tune(tmp_path):
+    """Put a placeholder."""
+    script = tmp_path / "entrypoint.py"
+    script.write_text(textwrap.dedent(SCRIPT))
+    space = {"--x": [1, 3, 5], "--est.__class__": "smepu.list", "--est.0": [7]}
+
+    trials = tune.tune(
+        str(script),
+        space,
+        ["--y", "hello"],
+        max_workers=2,
+        output_dir=tmp_path / "tune",
+        metric_definitions=[{"Name": "score", "Regex": r"score=(-?\d+)"}],
+    )
+    assert [t.exit_code for t in trials] == [0, 0, 0]
+    assert [t.metrics for t in trials] == [{"x": x, "score": -((x - 3) ** 2) + 1} for x in (1, 3, 5)]
+    assert trials[1].output_data_dir == tmp_path / "tune" / "trial-0001" / "output"
+    assert tune.best(trials, "score") is trials[1]
+    assert tune.best(trials, "score", mode="min") is trials[0]
+    assert (tmp_path / "tune" / "tune.csv").read_text().splitlines()[0].split(",") == [
+        "trial",
+        "--x",
+        "--est.__class__",
+        "--est.0",
+        "exit_code",
+        "elapsed",
+        "x",
+        "score",
+    ]
+
+
+def test_match_metrics():
+    """Put a placeholder."""
+    definitions = [{"Name": "loss", "Regex": r"loss=(\S+)"}, {"Name": "acc", "Regex": r"acc=(\S+)"}]
+    metrics = tune._match_metrics("loss=0.5 acc=0.7\nloss=nan% acc=0.9\n", definitions)
+    assert math.isnan(metrics["loss"]) and metrics["acc"] == 0.9
+    assert tune._match_metrics("loss=0.25", definitions) == {"loss": 0.25}
+
+    trials = [tune.Trial(i, {}, [], 0, 1.0, None, None, {"loss": loss}) for i, loss in enumerate([math.nan, 0.5, 0.1])]
+    assert tune.best(trials, "loss", mode="min") is trials[2]
+    assert tune.best(trials, "loss") is trials[1]
+    assert tune.best(trials[:1], "loss") is None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork()")
+def test_tune_bool_and_list(tmp_path):
+    """Put a placeholder."""
+    script = tmp_path / "entrypoint.py"
+    script.write_text(
+        "import json, os, sys\n"
+        "import smepu\n"
+        "kwargs = smepu.argparse.to_kwargs(sys.argv[1:])\n"
+        "with open(os.path.join(os.environ['SM_OUTPUT_DATA_DIR'], 'kwargs.json'), 'w') as f:\n"
+        "    json.dump(kwargs, f)\n"
+    )
+    space = {"--copy_x": [True, False], "--layers": [[1, 2], [[3], {"a": 4}]], "--n": [5]}
+
+    trials = tune.tune(str(script), space, ["--verbose", "False"], max_workers=2, output_dir=tmp_path / "tune")
+    assert [t.exit_code for t in trials] == [0] * 4
+    received = [json.loads((t.output_data_dir / "kwargs.json").read_text()) for t in trials]
+    assert received == [
+        {"verbose": False, "copy_x": copy_x, "layers": layers, "n": 5}
+        for copy_x in (True, False)
+        for layers in ([1, 2], [[3], {"a": 4}])
+    ]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork()")
+def test_main_fixed_args(tmp_path, capsys):
+    """Put a placeholder."""
+    script = tmp_path / "entrypoint.py"
+    script.write_text("import sys\nprint('argv=' + ' '.join(sys.argv[1:]))\n")
+    (tmp_path / "space.json").write_text(json.dumps({"--x": [1]}))
+
+    # Prefixes of --n-trials and --max-workers are args of the script.
+    argv = [str(script), "--space", str(tmp_path / "space.json"), "--n", "5", "--max", "6"]
+    argv += ["--tune-output-dir", str(tmp_path / "tune"), "--max-workers", "1"]
+    assert tune.main(argv) == 0
+    assert (tmp_path / "tune" / "trial-0000" / "trial.log").read_text() == "argv=--n 5 --max 6 --x 1\n"